@@ -62,13 +62,28 @@ module "ingestion_lambda" {
           "sqs:DeleteMessage",
           "sqs:GetQueueAttributes",
           "secretsmanager:GetSecretValue",
-          "s3:PutObject"
+          "s3:PutObject",
+          "s3:GetObject",
+          "s3:AbortMultipartUpload"
         ]
         Resource = [
           module.sqs.queue_arn,
           module.db.db_instance_master_user_secret_arn,
           "${aws_s3_bucket.raw_data.arn}/*"
         ]
+      },
+      {
+        # Without ListBucket a missing manifest is a 403 instead of a 404,
+        # which a resumed run would treat as fatal
+        Effect   = "Allow"
+        Action   = ["s3:ListBucket"]
+        Resource = [aws_s3_bucket.raw_data.arn]
+      },
+      {
+        # Backfills re-invoke the function to continue past the timeout
+        Effect   = "Allow"
+        Action   = ["lambda:InvokeFunction"]
+        Resource = ["arn:aws:lambda:*:*:function:gov-graph-ingestion"]
       }
     ]
   })
@@ -108,6 +123,8 @@ module "processing_lambda" {
     BEDROCK_MODEL_ID       = "us.anthropic.claude-3-haiku-20240307-v1:0"
     REGION_NAME            = "us-east-1"
     SAM_API_KEY_SECRET_ARN = aws_secretsmanager_secret.sam_api_key.arn
+    # Built by src/processing/build_name_index.py; resolver falls back to RDS when absent
+    VENDOR_INDEX_S3_URI = "s3://${aws_s3_bucket.raw_data.id}/indexes/vendor_names.idx"
   }
 
   attach_policy_json = true
@@ -123,7 +140,9 @@ module "processing_lambda" {
           "secretsmanager:GetSecretValue",
           "dynamodb:GetItem",
           "dynamodb:PutItem",
-          "dynamodb:UpdateItem"
+          "dynamodb:UpdateItem",
+          "dynamodb:BatchGetItem",
+          "dynamodb:BatchWriteItem"
         ]
         Resource = [
           module.sqs.queue_arn,
@@ -132,6 +151,11 @@ module "processing_lambda" {
           aws_secretsmanager_secret.sam_api_key.arn
         ]
       },
+      {
+        Effect   = "Allow"
+        Action   = ["s3:GetObject"]
+        Resource = ["${aws_s3_bucket.raw_data.arn}/indexes/*"]
+      },
       {
         Effect = "Allow"
         Action = ["bedrock:InvokeModel"]
@@ -154,6 +178,8 @@ module "processing_lambda" {
     sqs = {
       event_source_arn = module.sqs.queue_arn
       batch_size       = 10
+      # The handler returns batchItemFailures so only failed messages are retried
+      function_response_types = ["ReportBatchItemFailures"]
       scaling_config = {
         maximum_concurrency = 10
       }
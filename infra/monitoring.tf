@@ -85,6 +85,51 @@ resource "aws_cloudwatch_dashboard" "main" {
           region = var.aws_region
           title  = "SQS Queue Depth"
         }
+      },
+      {
+        type   = "metric"
+        x      = 0
+        y      = 6
+        width  = 12
+        height = 6
+        properties = {
+          # Embedded metric format documents the resolver prints once per invocation
+          metrics = [
+            ["GovGraph/EntityResolution", "Hits", "Tier", "cache"],
+            [".", ".", ".", "id"],
+            [".", ".", ".", "exact_name"],
+            [".", ".", ".", "sam"],
+            [".", ".", ".", "normalized"],
+            [".", ".", ".", "fuzzy"],
+            [".", ".", ".", "llm"]
+          ]
+          period = 3600
+          stat   = "Sum"
+          region = var.aws_region
+          title  = "Vendor Resolutions by Tier"
+        }
+      },
+      {
+        type   = "metric"
+        x      = 12
+        y      = 6
+        width  = 12
+        height = 6
+        properties = {
+          metrics = [
+            ["GovGraph/EntityResolution", "LatencyMs", "Tier", "cache"],
+            [".", ".", ".", "id"],
+            [".", ".", ".", "exact_name"],
+            [".", ".", ".", "sam"],
+            [".", ".", ".", "normalized"],
+            [".", ".", ".", "fuzzy"],
+            [".", ".", ".", "llm"]
+          ]
+          period = 3600
+          stat   = "Sum"
+          region = var.aws_region
+          title  = "Time Spent per Resolution Tier (ms)"
+        }
       }
     ]
   })
@@ -71,6 +71,19 @@ resource "aws_s3_bucket_lifecycle_configuration" "raw_data" {
       storage_class = "GLACIER"
     }
   }
+
+  rule {
+    # Parts of archive chunks left open by an ingestion run that was killed
+    # mid-chunk (e.g. a Lambda timeout) are billed until aborted
+    id     = "abort_incomplete_uploads"
+    status = "Enabled"
+
+    filter {}
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 1
+    }
+  }
 }
 
 output "raw_data_bucket_name" {
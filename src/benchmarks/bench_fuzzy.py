@@ -0,0 +1,123 @@
+"""Tier 5 fuzzy matching: trigram blocking index vs. a full process.extractOne scan.
+
+Builds a synthetic vendor table, runs messy variants of its names (typos,
+case, suffix changes) plus unrelated names through both paths, and reports
+per-lookup latency and whether every >= 90 match agrees:
+
+    python -m src.benchmarks.bench_fuzzy --vendors 300000 --queries 300
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+from typing import Any, Dict, List, Optional
+
+from rapidfuzz import process, fuzz
+
+from src.processing.name_index import NameBlockingIndex
+
+# Tier 5's automatic match threshold in resolve_vendor
+MATCH_THRESHOLD = 90
+
+WORDS = [
+    "ACME", "GLOBAL", "SYSTEMS", "TECHNOLOGIES", "SOLUTIONS", "DEFENSE", "AEROSPACE", "MEDICAL",
+    "CONSULTING", "GROUP", "SERVICES", "INTERNATIONAL", "FEDERAL", "ENGINEERING", "ANALYTICS",
+    "HEALTH", "PARTNERS", "LOGISTICS", "CONSTRUCTION", "ENERGY", "RESEARCH", "LABS", "NETWORKS",
+    "SECURITY", "DYNAMICS", "GENERAL", "MANAGEMENT", "ASSOCIATES", "ENTERPRISES", "INDUSTRIES",
+]
+SUFFIXES = ["INC", "LLC", "CORPORATION", "CORP", "CO", "LTD", "", ""]
+LETTERS = "ABCDEFGHIJKLMNOPRSTUVW"
+
+
+def synthetic_names(count: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+
+    def name() -> str:
+        parts = [rng.choice(WORDS) if rng.random() < 0.6 else
+                 "".join(rng.choice(LETTERS) for _ in range(rng.randint(4, 9)))
+                 for _ in range(rng.randint(1, 4))]
+        suffix = rng.choice(SUFFIXES)
+        return " ".join(parts + ([suffix] if suffix else []))
+
+    return list(dict.fromkeys(name() for _ in range(count)))
+
+
+def messy_queries(names: List[str], count: int, seed: int = 2) -> List[str]:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        base = rng.choice(names)
+        roll = rng.random()
+        if roll < 0.3:
+            chars = list(base)
+            for _ in range(rng.randint(1, 2)):
+                chars[rng.randrange(len(chars))] = rng.choice(LETTERS)
+            queries.append("".join(chars))
+        elif roll < 0.5:
+            queries.append(base.title())
+        elif roll < 0.7:
+            queries.append(" ".join(base.split()[:-1]) or base)
+        elif roll < 0.8:
+            queries.append(base + " INC")
+        else:
+            queries.append(rng.choice(synthetic_names(1, seed=rng.random())) + " HOLDINGS")
+    return queries
+
+
+def _accepted(match: Optional[tuple]) -> Optional[tuple]:
+    return (match[0], match[1]) if match and match[1] >= MATCH_THRESHOLD else None
+
+
+def run_benchmark(vendor_count: int, query_count: int) -> Dict[str, Any]:
+    names = synthetic_names(vendor_count)
+    queries = messy_queries(names, query_count)
+
+    started = time.perf_counter()
+    index = NameBlockingIndex(names)
+    build_seconds = time.perf_counter() - started
+
+    brute_seconds = index_seconds = 0.0
+    matches = mismatches = candidates = 0
+    for query in queries:
+        started = time.perf_counter()
+        brute = _accepted(process.extractOne(query, names, scorer=fuzz.WRatio))
+        brute_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        blocked = _accepted(index.extract_one(query, scorer=fuzz.WRatio))
+        index_seconds += time.perf_counter() - started
+
+        candidates += len(index.candidates(query))
+        matches += brute is not None
+        mismatches += brute != blocked
+
+    return {
+        "vendors": len(names),
+        "queries": len(queries),
+        "matches": matches,
+        "mismatches": mismatches,
+        "index_build_seconds": round(build_seconds, 3),
+        "brute_ms_per_lookup": round(brute_seconds / len(queries) * 1000, 3),
+        "index_ms_per_lookup": round(index_seconds / len(queries) * 1000, 3),
+        "avg_candidates": round(candidates / len(queries), 1),
+        "speedup": round(brute_seconds / index_seconds, 1) if index_seconds else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vendors", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args.vendors, args.queries)
+    print(json.dumps(result, indent=2))
+    if result["mismatches"]:
+        sys.exit(1)
+    return result
+
+
+if __name__ == "__main__":
+    main()
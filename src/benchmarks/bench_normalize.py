@@ -0,0 +1,104 @@
+"""Vendor name normalization: per-call regexes vs. the compiled NameNormalizer.
+
+Normalizes a synthetic vendor table the way a full cache refresh does, with
+the resolver's original normalize_vendor_name (module-level re.sub per
+call), NameNormalizer.normalize and NameNormalizer.normalize_many, checks
+that all three agree and reports names/sec. A stream of incoming names that
+repeat, as in an SQS batch, shows the memo's hit rate:
+
+    python -m src.benchmarks.bench_normalize --names 1000000
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+from typing import Any, Callable, Dict, List, Optional
+
+from src.processing.name_normalizer import NameNormalizer
+from src.benchmarks.bench_fuzzy import synthetic_names
+
+
+def regex_per_call(name: Optional[str]) -> str:
+    """normalize_vendor_name as it was before NameNormalizer."""
+    if not name:
+        return ""
+    name = name.upper()
+    name = re.sub(r"[.,\/#!$%\^&\*;:{}=\-_~()]", " ", name)
+    name = re.sub(
+        r"\b(CORP|CORPORATION|INC|INCORPORATED|LLC|LTD|LIMITED|CO|COMPANY|PLC)\b", "", name)
+    return " ".join(name.split())
+
+
+def _timed(fn: Callable[[], List[str]], count: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    return {"result": result, "seconds": round(elapsed, 3),
+            "names_per_sec": round(count / elapsed) if elapsed else None}
+
+
+def run_benchmark(name_count: int = 1000000, incoming_count: int = 100000, seed: int = 1) -> Dict[str, Any]:
+    # Numbered so every name is distinct, as in the vendors table, with the
+    # punctuation real names carry
+    styles = ["", ", Inc.", " L.L.C.", " (USA)", " & Sons Co."]
+    base = synthetic_names(min(name_count, 200000), seed)
+    names = [f"{base[i % len(base)]} {i}{styles[i % len(styles)]}" for i in range(name_count)]
+    normalizer = NameNormalizer()
+    unmemoized = NameNormalizer(memo_size=0)
+
+    modes = {
+        "regex_per_call": _timed(lambda: [regex_per_call(name) for name in names], len(names)),
+        "compiled": _timed(lambda: [unmemoized.normalize(name) for name in names], len(names)),
+        "batch": _timed(lambda: normalizer.normalize_many(names), len(names)),
+    }
+    expected = modes["regex_per_call"]["result"]
+    mismatches = sum(mode["result"] != expected for mode in modes.values())
+
+    rng = random.Random(seed)
+    incoming = [rng.choice(names[:max(1, name_count // 100)]) for _ in range(incoming_count)]
+    memo = _timed(lambda: [normalizer.normalize(name) for name in incoming], len(incoming))
+
+    results = [{"mode": mode, "names": len(names), "seconds": r["seconds"], "names_per_sec": r["names_per_sec"]}
+               for mode, r in modes.items()]
+    results.append({"mode": "memoized", "names": len(incoming), "seconds": memo["seconds"],
+                    "names_per_sec": memo["names_per_sec"]})
+    baseline = modes["regex_per_call"]["names_per_sec"]
+    return {
+        "results": results,
+        "mismatches": mismatches,
+        "batch_speedup": round(modes["batch"]["names_per_sec"] / baseline, 2),
+        "memo": normalizer.metrics(),
+    }
+
+
+def format_table(report: Dict[str, Any]) -> str:
+    lines = [f"{'mode':<16} {'names':>9} {'seconds':>8} {'names/s':>10}"]
+    for r in report["results"]:
+        lines.append(f"{r['mode']:<16} {r['names']:>9} {r['seconds']:>8} {r['names_per_sec']:>10}")
+    lines.append(f"batch speedup: {report['batch_speedup']}x, mismatched modes: {report['mismatches']}, "
+                 f"memo: {report['memo']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--names", type=int, default=1000000)
+    parser.add_argument("--incoming", type=int, default=100000)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.names, args.incoming)
+    print(format_table(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if report["mismatches"]:
+        sys.exit(1)
+    return report
+
+
+if __name__ == "__main__":
+    main()
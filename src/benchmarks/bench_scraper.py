@@ -0,0 +1,137 @@
+"""Throughput benchmark for the USAspending scraper against the local replay server.
+
+Runs each ingestion mode over the same replayed (or synthetic) search and
+reports pages/sec, records/sec and peak traced memory. No network access is
+needed, so results can be compared between commits in CI:
+
+    python -m src.benchmarks.bench_scraper --synthetic-pages 40 --latency 0.05
+    python -m src.benchmarks.bench_scraper --record-dir recordings/ --start 2024-01-01 --end 2024-01-03
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from unittest import mock
+
+# The scraper creates its boto3 clients at import time; none are used here
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from src.ingestion import scraper  # noqa: E402
+from src.ingestion.scraper import AdaptiveRateController, RateLimiter  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+
+# name -> (max_workers, limiter factory, keep all records in one list)
+MODES: Dict[str, Tuple[int, Callable[[], RateLimiter], bool]] = {
+    "serial": (1, lambda: RateLimiter(interval=0), True),
+    "concurrent": (4, lambda: RateLimiter(interval=0), True),
+    "streaming": (4, lambda: RateLimiter(interval=0), False),
+    "adaptive": (4, lambda: AdaptiveRateController(initial_rate=20.0, max_rate=200.0,
+                                                   initial_concurrency=2, max_concurrency=8), False),
+}
+
+
+def spawn_replay_server(server_args: List[str]) -> Tuple[subprocess.Popen, str]:
+    """Starts the replay server in its own process so it does not skew timing or memory."""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "src.benchmarks.replay_server", *server_args],
+        cwd=REPO_ROOT, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline().strip()
+    if not line.startswith("REPLAY_URL="):
+        proc.kill()
+        raise RuntimeError(f"Replay server failed to start: {line!r}")
+    return proc, line.split("=", 1)[1]
+
+
+def run_mode(name: str, base_url: str, start_date: str, end_date: str, spending_level: str = "awards") -> Dict[str, Any]:
+    max_workers, make_limiter, materialize = MODES[name]
+    limiter = make_limiter()
+    pages = records = 0
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    with mock.patch.object(scraper, "API_BASE_URL", base_url):
+        if materialize:
+            results = scraper.fetch_contracts(
+                start_date, end_date, spending_level=spending_level,
+                max_workers=max_workers, rate_limiter=limiter)
+            records = len(results)
+            pages = -(-records // 100)
+        else:
+            for page in scraper.iter_contract_pages(
+                    start_date, end_date, spending_level=spending_level,
+                    max_workers=max_workers, rate_limiter=limiter):
+                pages += 1
+                records += len(page)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "mode": name,
+        "pages": pages,
+        "records": records,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(pages / elapsed, 2) if elapsed else None,
+        "records_per_sec": round(records / elapsed, 1) if elapsed else None,
+        "peak_memory_mb": round(peak / (1024 * 1024), 2),
+    }
+    if isinstance(limiter, AdaptiveRateController):
+        metrics = limiter.metrics()
+        result["final_rate"] = metrics["rate"]
+        result["backoffs"] = metrics["backoffs"]
+    return result
+
+
+def run_benchmarks(server_args: List[str], modes: Optional[List[str]] = None, start_date: str = "2024-01-01", end_date: str = "2024-01-03") -> List[Dict[str, Any]]:
+    proc, base_url = spawn_replay_server(server_args)
+    try:
+        return [run_mode(name, base_url, start_date, end_date) for name in (modes or list(MODES))]
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    lines = [f"{'mode':<12} {'pages':>6} {'records':>8} {'pages/s':>9} {'records/s':>10} {'peak MB':>8}"]
+    for r in results:
+        lines.append(
+            f"{r['mode']:<12} {r['pages']:>6} {r['records']:>8} {r['pages_per_sec']:>9} "
+            f"{r['records_per_sec']:>10} {r['peak_memory_mb']:>8}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record-dir", help="Replay recordings from this directory")
+    parser.add_argument("--synthetic-pages", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--start", default="2024-01-01")
+    parser.add_argument("--end", default="2024-01-03")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES))
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args(argv)
+
+    server_args = ["--synthetic-pages", str(args.synthetic_pages), "--latency", str(args.latency),
+                   "--throttle-rate", str(args.throttle_rate), "--error-rate", str(args.error_rate)]
+    if args.record_dir:
+        server_args += ["--record-dir", args.record_dir]
+
+    results = run_benchmarks(server_args, args.modes, args.start, args.end)
+    print(format_table(results))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
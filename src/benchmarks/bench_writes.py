@@ -0,0 +1,155 @@
+"""Prime award writes: per-record statements vs. the set-based bulk path.
+
+Applies src/db/schema.sql to a scratch PostgreSQL database, then writes the
+same synthetic prime awards through process_prime_award (three statements
+per record) and process_prime_awards (COPY to a staging table and one merge
+per SQS batch) and reports rows/sec for each. Vendor resolution is stubbed
+and agencies are prefetched, so only the write path is timed:
+
+    createdb govgraph_bench
+    python -m src.benchmarks.bench_writes --dsn postgresql://localhost/govgraph_bench --records 5000
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+REPO_ROOT = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+SCHEMA_PATH = os.path.join(REPO_ROOT, "src", "db", "schema.sql")
+
+# The resolver is packaged flat in its Lambda and imports its siblings that way
+sys.path.insert(0, os.path.join(REPO_ROOT, "src", "processing"))
+
+from src.processing import entity_resolver  # noqa: E402
+from src.benchmarks.bench_fuzzy import synthetic_names  # noqa: E402
+
+# One SQS batch: the event source mapping's batch_size (10) times the
+# scraper's SQS_RECORDS_PER_MESSAGE default (50)
+BATCH_SIZE = 500
+AGENCIES = [("097", "DEPT OF DEFENSE", "2100", "DEPT OF THE ARMY"),
+            ("075", "DEPT OF HEALTH AND HUMAN SERVICES", "7529", "NATIONAL INSTITUTES OF HEALTH"),
+            ("080", "NASA", "8000", "NASA")]
+
+
+def synthetic_awards(count: int, vendors: List[str], prefix: str, seed: int = 1) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    awards = []
+    for i in range(count):
+        agency_code, agency, sub_code, sub_agency = rng.choice(AGENCIES)
+        awards.append({
+            "Award ID": f"{prefix}-{i:07d}",
+            "Recipient Name": rng.choice(vendors),
+            "Awarding Agency": agency, "Awarding Agency Code": agency_code,
+            "Awarding Sub Agency": sub_agency, "Awarding Sub Agency Code": sub_code,
+            "Funding Agency": agency, "Funding Agency Code": agency_code,
+            "Award Amount": round(rng.uniform(1e3, 1e7), 2),
+            "Start Date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "Contract Award Type": "DEFINITIVE CONTRACT",
+            "Description": "SYNTHETIC BENCHMARK AWARD",
+        })
+    return awards
+
+
+def prepare_database(conn: psycopg2.extensions.connection, vendor_count: int) -> Dict[str, str]:
+    """Applies the schema and inserts the vendors awards are attributed to; returns name -> id."""
+    with open(SCHEMA_PATH) as f:
+        schema = f.read()
+    with conn.cursor() as cur:
+        cur.execute(schema)
+        names = [f"{name} {i}" for i, name in enumerate(synthetic_names(vendor_count))]
+        rows = execute_values(
+            cur,
+            """
+            INSERT INTO vendors (id, canonical_name) VALUES %s
+            ON CONFLICT (canonical_name) DO UPDATE SET canonical_name = EXCLUDED.canonical_name
+            RETURNING canonical_name, id
+            """,
+            [(str(uuid.uuid4()), name) for name in names],
+            fetch=True
+        )
+    return {name: str(vendor_id) for name, vendor_id in rows}
+
+
+def run_mode(name: str, conn: psycopg2.extensions.connection, awards: List[Dict[str, Any]]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    if name == "per_record":
+        written = sum(entity_resolver.process_prime_award(award, conn) for award in awards)
+    else:
+        written = sum(entity_resolver.process_prime_awards(awards[i:i + BATCH_SIZE], conn)
+                      for i in range(0, len(awards), BATCH_SIZE))
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": name,
+        "records": len(awards),
+        "written": written,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(written / elapsed, 1) if elapsed else None,
+    }
+
+
+def run_benchmark(dsn: str, record_count: int = 2000, vendor_count: int = 200) -> Dict[str, Any]:
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    try:
+        vendor_ids = prepare_database(conn, vendor_count)
+        vendors = list(vendor_ids)
+
+        def resolve(vendor_name, duns=None, uei=None, conn=None):
+            return vendor_ids[vendor_name], vendor_name, "EXACT_MATCH", 1.0
+
+        run_id = uuid.uuid4().hex[:8]
+        results = []
+        with mock.patch.object(entity_resolver, "resolve_vendor", resolve):
+            for mode in ("per_record", "bulk"):
+                awards = synthetic_awards(record_count, vendors, f"BENCH-{run_id}-{mode}")
+                entity_resolver.prefetch_agencies(awards, conn)
+                results.append(run_mode(mode, conn, awards))
+    finally:
+        conn.close()
+
+    per_record, bulk = results
+    return {
+        "results": results,
+        "speedup": round(bulk["rows_per_sec"] / per_record["rows_per_sec"], 1),
+    }
+
+
+def format_table(report: Dict[str, Any]) -> str:
+    lines = [f"{'mode':<12} {'records':>8} {'seconds':>8} {'rows/s':>10}"]
+    for r in report["results"]:
+        lines.append(f"{r['mode']:<12} {r['records']:>8} {r['seconds']:>8} {r['rows_per_sec']:>10}")
+    lines.append(f"bulk speedup: {report['speedup']}x")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", default=os.environ.get("BENCH_DATABASE_URL"),
+                        help="Scratch database to write to (default: $BENCH_DATABASE_URL)")
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--vendors", type=int, default=200)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args(argv)
+    if not args.dsn:
+        parser.error("--dsn or BENCH_DATABASE_URL is required")
+
+    report = run_benchmark(args.dsn, args.records, args.vendors)
+    print(format_table(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
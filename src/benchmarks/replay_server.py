@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+# The scraper creates its boto3 clients at import time; none are used here
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from src.ingestion.scraper import SEARCH_ENDPOINT, recording_path  # noqa: E402
+
+
+class ReplayServer:
+    """
+    Local stand-in for the USAspending spending_by_award endpoint.
+
+    Serves page responses captured with the scraper's recording mode
+    (USASPENDING_RECORD_DIR), keyed by the same search hash, so a recorded
+    run can be replayed without network access. Searches with no recording
+    get `synthetic_pages` deterministic pages instead. Latency, 429s and
+    5xx errors can be injected to exercise the client's backoff.
+    """
+
+    def __init__(self, record_dir: Optional[str] = None, synthetic_pages: int = 0, page_size: int = 100,
+                 latency: float = 0.0, throttle_rate: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0, port: int = 0):
+        self.record_dir = record_dir
+        self.synthetic_pages = synthetic_pages
+        self.page_size = page_size
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.stats = {"requests": 0, "served": 0, "throttled": 0, "errors": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _ReplayHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.replay = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """Value for scraper.API_BASE_URL / USASPENDING_API_BASE_URL."""
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/api/v2"
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "ReplayServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def respond(self, payload: Dict[str, Any]) -> tuple:
+        """Returns (status, body) for one search request."""
+        with self._lock:
+            self.stats["requests"] += 1
+            roll = self._random.random()
+        if self.latency:
+            time.sleep(self.latency)
+
+        if roll < self.throttle_rate:
+            with self._lock:
+                self.stats["throttled"] += 1
+            return 429, {"detail": "Request was throttled."}
+        if roll < self.throttle_rate + self.error_rate:
+            with self._lock:
+                self.stats["errors"] += 1
+            return 503, {"detail": "Service unavailable."}
+
+        page = payload.get("page", 1)
+        data = self._recorded_page(payload, page)
+        if data is None:
+            data = self._synthetic_page(payload, page)
+        with self._lock:
+            self.stats["served"] += 1
+        return 200, data
+
+    def _recorded_page(self, payload: Dict[str, Any], page: int) -> Optional[Dict[str, Any]]:
+        if not self.record_dir:
+            return None
+        path = recording_path(self.record_dir, payload, page)
+        if not os.path.exists(path):
+            # Past the last recorded page of a recorded search: end of data
+            if os.path.isdir(os.path.dirname(path)):
+                return {"page_metadata": {"page": page, "hasNext": False}, "results": []}
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _synthetic_page(self, payload: Dict[str, Any], page: int) -> Dict[str, Any]:
+        if page > self.synthetic_pages:
+            return {"page_metadata": {"page": page, "hasNext": False}, "results": []}
+        return {
+            "page_metadata": {"page": page, "hasNext": page < self.synthetic_pages},
+            "results": [synthetic_record(payload.get("spending_level", "awards"), page, i)
+                        for i in range(self.page_size)],
+        }
+
+
+def synthetic_record(spending_level: str, page: int, index: int) -> Dict[str, Any]:
+    """A deterministic record roughly the size and shape of a real API result."""
+    n = (page - 1) * 1000 + index
+    vendor = f"SYNTHETIC VENDOR {n % 997} INC"
+    if spending_level == "subawards":
+        return {
+            "Sub-Award ID": f"SUB-{page}-{index}", "Sub-Awardee Name": vendor,
+            "Sub-Award Amount": float(n % 50000), "Sub-Award Date": "2024-01-02",
+            "Sub-Award Description": "SYNTHETIC SUBCONTRACT " + "X" * 120,
+            "Sub-Recipient UEI": f"SUBUEI{n:06d}", "Sub-Recipient DUNS": None,
+            "Prime Award ID": f"PRIME-{n % 500}", "Prime Recipient Name": f"SYNTHETIC PRIME {n % 50}",
+            "Prime Award Recipient UEI": f"PRIMEUEI{n % 50:04d}",
+            "Awarding Agency": "Department of Defense", "Awarding Agency Code": "097",
+            "Awarding Sub Agency": "Department of the Army", "Awarding Sub Agency Code": "2100",
+        }
+    return {
+        "internal_id": n, "Award ID": f"AWD-{page}-{index}", "Recipient Name": vendor,
+        "Award Amount": float(n % 100000), "Awarding Agency": "Department of Defense",
+        "Awarding Agency Code": "097", "Awarding Sub Agency": "Department of the Army",
+        "Awarding Sub Agency Code": "2100", "Funding Agency": "Department of Defense",
+        "Funding Agency Code": "097", "Funding Sub Agency": "Department of the Army",
+        "Funding Sub Agency Code": "2100", "Start Date": "2024-01-02", "End Date": "2025-01-01",
+        "Contract Award Type": "DEFINITIVE CONTRACT", "Recipient UEI": f"UEI{n % 997:08d}",
+        "Recipient DUNS": None, "Description": "SYNTHETIC AWARD " + "X" * 200,
+    }
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.path.endswith(SEARCH_ENDPOINT):
+            self._send(404, {"detail": "Not found"})
+            return
+        status, data = self.server.replay.respond(json.loads(body or b"{}"))
+        self._send(status, data)
+
+    def _send(self, status: int, data: Dict[str, Any]) -> None:
+        encoded = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Replay recorded USAspending responses on a local port.")
+    parser.add_argument("--record-dir")
+    parser.add_argument("--synthetic-pages", type=int, default=0)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = ReplayServer(
+        record_dir=args.record_dir, synthetic_pages=args.synthetic_pages,
+        page_size=args.page_size, latency=args.latency, throttle_rate=args.throttle_rate,
+        error_rate=args.error_rate, seed=args.seed, port=args.port)
+    # The benchmark runner reads this line to find the port
+    print(f"REPLAY_URL={server.base_url}", flush=True)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,9 +10,11 @@ CREATE TABLE IF NOT EXISTS raw_contracts (
     raw_payload JSONB NOT NULL,
     ingested_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     processed BOOLEAN DEFAULT FALSE,
-    processing_errors TEXT
+    processing_errors TEXT,
+    content_hash CHAR(64) -- SHA-256 of the normalized payload, used to skip unchanged re-pulls
 );
 CREATE INDEX IF NOT EXISTS idx_raw_contracts_processed ON raw_contracts(processed) WHERE processed = FALSE;
+ALTER TABLE raw_contracts ADD COLUMN IF NOT EXISTS content_hash CHAR(64);
 
 -- 2. Vendors (Canonical Records)
 CREATE TABLE IF NOT EXISTS vendors (
@@ -50,6 +52,8 @@ CREATE TABLE IF NOT EXISTS vendors (
 CREATE INDEX IF NOT EXISTS idx_vendors_canonical_name ON vendors (canonical_name);
 CREATE INDEX IF NOT EXISTS idx_vendors_duns ON vendors (duns) WHERE duns IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_vendors_uei ON vendors (uei) WHERE uei IS NOT NULL;
+-- Delta refresh of the resolver's in-memory name cache
+CREATE INDEX IF NOT EXISTS idx_vendors_updated_at ON vendors (updated_at);
 
 -- 3. Agencies
 CREATE TABLE IF NOT EXISTS agencies (
@@ -185,3 +189,25 @@ CREATE TABLE IF NOT EXISTS etl_runs (
     error_message TEXT,
     metadata JSONB
 );
+CREATE INDEX IF NOT EXISTS idx_etl_runs_type_status ON etl_runs (run_type, status, started_at DESC);
+
+-- 10. SAM.gov Entity Extract (local Tier 4 lookup, loaded by load_sam_extract.py)
+CREATE TABLE IF NOT EXISTS sam_extract_loads (
+    id UUID PRIMARY KEY,
+    file_name VARCHAR(255) UNIQUE NOT NULL,
+    extract_type VARCHAR(10) NOT NULL, -- 'full' (monthly) or 'delta' (daily)
+    rows_upserted INTEGER,
+    rows_deleted INTEGER,
+    loaded_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS sam_entities (
+    uei VARCHAR(20) PRIMARY KEY,
+    duns VARCHAR(20),
+    legal_business_name VARCHAR(500) NOT NULL,
+    normalized_name VARCHAR(500), -- normalize_vendor_name(legal_business_name)
+    load_id UUID, -- sam_extract_loads.id of the file that last wrote the row
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_sam_entities_duns ON sam_entities (duns) WHERE duns IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_sam_entities_normalized_name ON sam_entities (normalized_name);
@@ -0,0 +1,201 @@
+import os
+import io
+import csv
+import sys
+import gzip
+import json
+import zipfile
+import argparse
+import logging
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+from scraper import ArchiveWriter, ingest_stream
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Records handed to the pipeline at a time (same as one API page)
+PAGE_SIZE = 100
+
+# Bulk download columns for each field of the API record shape, in order of
+# preference. Award summary files and transaction files name a few of them
+# differently, so the first non-empty column wins.
+PRIME_COLUMNS = {
+    "Award ID": ("award_id_piid", "award_id_fain", "award_id_uri"),
+    "Recipient Name": ("recipient_name", "recipient_name_raw"),
+    "Award Amount": ("total_obligated_amount", "federal_action_obligation"),
+    "Awarding Agency": ("awarding_agency_name",),
+    "Awarding Agency Code": ("awarding_agency_code",),
+    "Awarding Sub Agency": ("awarding_sub_agency_name",),
+    "Awarding Sub Agency Code": ("awarding_sub_agency_code",),
+    "Funding Agency": ("funding_agency_name",),
+    "Funding Agency Code": ("funding_agency_code",),
+    "Funding Sub Agency": ("funding_sub_agency_name",),
+    "Funding Sub Agency Code": ("funding_sub_agency_code",),
+    "Start Date": ("period_of_performance_start_date", "action_date"),
+    "End Date": ("period_of_performance_current_end_date",),
+    "Contract Award Type": ("award_type", "idv_type"),
+    "Recipient UEI": ("recipient_uei",),
+    "Recipient DUNS": ("recipient_duns",),
+    "Description": ("prime_award_base_transaction_description", "transaction_description"),
+}
+
+SUBAWARD_COLUMNS = {
+    "Sub-Award ID": ("subaward_number",),
+    "Sub-Awardee Name": ("subawardee_name",),
+    "Sub-Award Amount": ("subaward_amount",),
+    "Sub-Award Date": ("subaward_action_date",),
+    "Sub-Award Description": ("subaward_description",),
+    "Sub-Recipient UEI": ("subawardee_uei",),
+    "Sub-Recipient DUNS": ("subawardee_duns",),
+    "Prime Award ID": ("prime_award_piid", "prime_award_fain", "prime_award_unique_key"),
+    "Prime Recipient Name": ("prime_awardee_name",),
+    "Prime Award Recipient UEI": ("prime_awardee_uei",),
+    "Awarding Agency": ("prime_award_awarding_agency_name",),
+    "Awarding Agency Code": ("prime_award_awarding_agency_code",),
+    "Awarding Sub Agency": ("prime_award_awarding_sub_agency_name",),
+    "Awarding Sub Agency Code": ("prime_award_awarding_sub_agency_code",),
+}
+
+AMOUNT_FIELDS = {"Award Amount", "Sub-Award Amount"}
+
+
+def _map_row(row: Dict[str, str], columns: Dict[str, Tuple[str, ...]]) -> Dict[str, Any]:
+    record = {}
+    for field, candidates in columns.items():
+        value = None
+        for column in candidates:
+            raw = row.get(column)
+            if raw is not None and raw.strip():
+                value = raw.strip()
+                break
+        if value is not None and field in AMOUNT_FIELDS:
+            try:
+                value = float(value)
+            except ValueError:
+                value = None
+        record[field] = value
+    return record
+
+
+def _detect_type(header: List[str]) -> str:
+    return "subaward" if "subaward_number" in header else "prime"
+
+
+def _iter_csv_streams(path: str) -> Iterator[Tuple[str, IO[str]]]:
+    """Yields (name, text stream) for a CSV file or each CSV member of a ZIP, decompressing lazily."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                if not member.lower().endswith(".csv"):
+                    continue
+                with archive.open(member) as raw:
+                    yield member, io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    else:
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            yield os.path.basename(path), stream
+
+
+def iter_bulk_records(path: str, data_type: Optional[str] = None, only_type: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream-parses a USAspending bulk award CSV (or a ZIP of them).
+
+    Yields (data_type, record) with records in the same shape as the
+    spending_by_award API results, so they can go straight to
+    process_prime_award / process_sub_award. The type is detected per file
+    from its header unless given; with only_type, files of any other type
+    are skipped without reading their rows. Rows are read one at a time;
+    nothing is extracted to disk or held in memory beyond the current row.
+    """
+    csv.field_size_limit(sys.maxsize)
+    for name, stream in _iter_csv_streams(path):
+        reader = csv.DictReader(stream)
+        file_type = data_type or _detect_type(reader.fieldnames or [])
+        if only_type and file_type != only_type:
+            continue
+        columns = SUBAWARD_COLUMNS if file_type == "subaward" else PRIME_COLUMNS
+        id_field = "Sub-Award ID" if file_type == "subaward" else "Award ID"
+        logger.info(f"Reading {file_type} records from {name}")
+
+        for row in reader:
+            record = _map_row(row, columns)
+            if record[id_field]:
+                yield file_type, record
+
+
+def iter_bulk_pages(path: str, data_type: Optional[str] = None, page_size: int = PAGE_SIZE, only_type: Optional[str] = None) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """Groups iter_bulk_records into (data_type, page) lists of up to page_size records."""
+    page_type, page = None, []
+    for record_type, record in iter_bulk_records(path, data_type, only_type):
+        if page and (record_type != page_type or len(page) >= page_size):
+            yield page_type, page
+            page = []
+        page_type = record_type
+        page.append(record)
+    if page:
+        yield page_type, page
+
+
+def load_bulk_files(paths: List[str], data_type: Optional[str] = None, archive_prefix: str = "bulk") -> Dict[str, int]:
+    """
+    Feeds bulk files through the regular scraper pipeline (SQS + S3 archive).
+
+    Each type in a file is one ingest_stream run over its pages, so records
+    are grouped by vendor across pages and packed into full messages just
+    like an API stream. Each file is archived under
+    <archive_prefix>/<file name>/<type>/. Returns the record count per type.
+    """
+    counts = {"prime": 0, "subaward": 0}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        for page_type in ([data_type] if data_type else list(counts)):
+            archive = ArchiveWriter(f"{archive_prefix}/{name}/{page_type}")
+            try:
+                pages = (page for _, page in iter_bulk_pages(path, data_type, only_type=page_type))
+                counts[page_type] += ingest_stream(pages, archive, page_type)
+            finally:
+                archive.close()
+        logger.info(f"Loaded {path}: {counts}")
+    return counts
+
+
+def export_bulk_files(paths: List[str], output_path: str, data_type: Optional[str] = None) -> Dict[str, int]:
+    """
+    Writes mapped records as gzip NDJSON to a local file instead of
+    sending them to SQS/S3, e.g. to inspect a mapping before a real load.
+
+    Each line is a {"type", "data"} message, the same body the resolver
+    accepts from SQS; nothing in this repo replays the file.
+    """
+    counts = {"prime": 0, "subaward": 0}
+    with gzip.open(output_path, "wt", encoding="utf-8") as out:
+        for path in paths:
+            for record_type, record in iter_bulk_records(path, data_type):
+                out.write(json.dumps({"type": record_type, "data": record}) + "\n")
+                counts[record_type] += 1
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, int]:
+    parser = argparse.ArgumentParser(
+        description="Ingest locally downloaded USAspending bulk award CSV/ZIP files.")
+    parser.add_argument("paths", nargs="+", help="CSV or ZIP files")
+    parser.add_argument("--type", choices=["prime", "subaward"],
+                        help="Record type (detected from each file's header by default)")
+    parser.add_argument("--output",
+                        help="Write gzip NDJSON locally instead of sending to SQS/S3 (for inspection)")
+    parser.add_argument("--archive-prefix", default="bulk")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        counts = export_bulk_files(args.paths, args.output, args.type)
+    else:
+        counts = load_bulk_files(args.paths, args.type, args.archive_prefix)
+    print(json.dumps(counts))
+    return counts
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
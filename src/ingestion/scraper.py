@@ -1,66 +1,261 @@
 import os
 import time
 import datetime
+import threading
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+import base64
+import gzip
+import hashlib
 import json
+import re
+import uuid
+import zlib
 import boto3
+from botocore.exceptions import ClientError
+import psycopg2
+import psycopg2.extensions
 import logging
-from typing import Any, Dict, List, Optional
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # Configuration
-API_BASE_URL = "https://api.usaspending.gov/api/v2"
+API_BASE_URL = os.environ.get(
+    "USASPENDING_API_BASE_URL", "https://api.usaspending.gov/api/v2")
 SEARCH_ENDPOINT = "/search/spending_by_award/"
+# When set, every successful page response is saved here for offline replay
+RECORD_DIR = os.environ.get("USASPENDING_RECORD_DIR")
+
+# Minimum spacing between USAspending requests, shared by every worker in a run
+REQUEST_INTERVAL_SECONDS = float(
+    os.environ.get("REQUEST_INTERVAL_SECONDS", "0.5"))
+# Concurrent page fetches per award-type stream
+FETCH_WORKERS = int(os.environ.get("FETCH_WORKERS", "4"))
+# Per-page attempts for 429/5xx/connection failures
+MAX_PAGE_ATTEMPTS = 5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRY_AFTER_SECONDS = 30.0
+# Date-range shards ingested concurrently during a backfill
+BACKFILL_PARALLELISM = int(os.environ.get("BACKFILL_PARALLELISM", "2"))
+# Stop starting new shards when less Lambda time than this remains
+BACKFILL_MIN_REMAINING_MS = 120 * 1000
+# Buffered (compressed) archive bytes per S3 multipart part (S3 minimum is 5 MiB)
+ARCHIVE_PART_SIZE = 8 * 1024 * 1024
+# Records per archive chunk object
+ARCHIVE_CHUNK_RECORDS = int(os.environ.get("ARCHIVE_CHUNK_RECORDS", "50000"))
+ARCHIVE_FORMAT = "ndjson+gzip"
+
+# SQS packing: records per message, and the queue's max_message_size (infra/sqs.tf)
+SQS_RECORDS_PER_MESSAGE = int(os.environ.get("SQS_RECORDS_PER_MESSAGE", "50"))
+SQS_COMPRESS_MESSAGES = os.environ.get(
+    "SQS_COMPRESS_MESSAGES", "false").lower() == "true"
+SQS_MAX_MESSAGE_BYTES = 262144
+# Records buffered per stream before sending, so they can be grouped by vendor
+SQS_AFFINITY_RECORDS = int(os.environ.get("SQS_AFFINITY_RECORDS", "1000"))
 
 # AWS Resources
 S3_BUCKET = os.environ.get("S3_BUCKET_NAME")
 SQS_QUEUE_URL = os.environ.get("SQS_QUEUE_URL")
 
+# Checkpoint database (etl_runs). Checkpointing is skipped when unset.
+DB_HOST = os.environ.get("DB_HOST")
+DB_NAME = os.environ.get("DB_NAME")
+DB_USER = os.environ.get("DB_USER")
+DB_SECRET_ARN = os.environ.get("DB_SECRET_ARN")
+RUN_TYPE = "usaspending_ingest"
+
 s3_client = boto3.client('s3')
 sqs_client = boto3.client('sqs')
+lambda_client = None
+
+
+def get_lambda_client() -> Any:
+    global lambda_client
+    if lambda_client is None:
+        lambda_client = boto3.client(service_name="lambda")
+    return lambda_client
+
+
+class RateLimiter:
+    """Spaces requests so that every worker sharing it stays within one rate budget."""
+
+    def __init__(self, interval: float = REQUEST_INTERVAL_SECONDS):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> None:
+        """Blocks until the caller's request slot is due."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def release(self, status: Optional[int], latency: float) -> None:
+        """Reports the outcome of a request started with acquire(). status is None on connection errors."""
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"rate": 1.0 / self.interval if self.interval else None}
+
+
+class AdaptiveRateController(RateLimiter):
+    """
+    AIMD control of the USAspending request rate and concurrency.
+
+    Each fast, successful response raises the rate by `rate_step` req/s and
+    the concurrency limit by 1/limit (so roughly one slot per limit's worth
+    of successes). A 429, 5xx, connection error, or a latency above
+    `latency_factor` x the running baseline multiplies both by
+    `decrease_factor`. Decreases are applied at most once per `cooldown`
+    seconds so a burst of failures from one congested moment counts once.
+
+    The latency baseline is an EWMA of fast responses; slow responses move
+    it too, by the smaller `slow_baseline_weight`, so a lasting rise in the
+    API's normal latency becomes the new baseline within a few dozen
+    requests instead of holding the controller at its minimum forever.
+    """
+
+    def __init__(self, initial_rate: float = 1.0 / REQUEST_INTERVAL_SECONDS, min_rate: float = 0.25, max_rate: float = 10.0,
+                 rate_step: float = 0.1, initial_concurrency: float = 2, max_concurrency: float = 12,
+                 decrease_factor: float = 0.5, latency_factor: float = 2.0, cooldown: float = 1.0,
+                 slow_baseline_weight: float = 0.05):
+        super().__init__(interval=1.0 / initial_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate_step = rate_step
+        self.concurrency = float(initial_concurrency)
+        self.max_concurrency = max_concurrency
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.slow_baseline_weight = slow_baseline_weight
+        self.latency_baseline = None
+        self.backoff_events = deque(maxlen=50)
+        self._counts = {"requests": 0, "throttled": 0,
+                        "errors": 0, "slow": 0, "backoffs": 0}
+        self._in_flight = 0
+        self._last_decrease = float("-inf")
+        self._slots = threading.Condition(self._lock)
+
+    @property
+    def rate(self) -> float:
+        return 1.0 / self.interval
+
+    def acquire(self) -> None:
+        with self._slots:
+            while self._in_flight >= int(self.concurrency):
+                self._slots.wait()
+            self._in_flight += 1
+        super().acquire()
+
+    def release(self, status: Optional[int], latency: float) -> None:
+        with self._slots:
+            self._in_flight -= 1
+            self._counts["requests"] += 1
+
+            reason = None
+            if status is None:
+                reason = "connection_error"
+                self._counts["errors"] += 1
+            elif status == 429:
+                reason = "throttled"
+                self._counts["throttled"] += 1
+            elif status >= 500:
+                reason = f"http_{status}"
+                self._counts["errors"] += 1
+            elif self.latency_baseline is not None and latency > self.latency_factor * self.latency_baseline:
+                reason = "slow"
+                self._counts["slow"] += 1
+
+            if reason == "slow":
+                self._track_latency(latency, self.slow_baseline_weight)
+            if reason:
+                self._decrease(reason, latency)
+            else:
+                self._increase(latency)
+            self._slots.notify_all()
+
+    def _increase(self, latency: float) -> None:
+        rate = min(self.max_rate, self.rate + self.rate_step)
+        self.interval = 1.0 / rate
+        self.concurrency = min(self.max_concurrency,
+                               self.concurrency + 1.0 / self.concurrency)
+        self._track_latency(latency, 0.1)
+
+    def _track_latency(self, latency: float, weight: float) -> None:
+        if self.latency_baseline is None:
+            self.latency_baseline = latency
+        else:
+            self.latency_baseline += weight * (latency - self.latency_baseline)
+
+    def _decrease(self, reason: str, latency: float) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self.interval = 1.0 / rate
+        self.concurrency = max(1.0, self.concurrency * self.decrease_factor)
+        self._counts["backoffs"] += 1
+        self.backoff_events.append({
+            "reason": reason,
+            "latency": round(latency, 3),
+            "rate": round(rate, 3),
+            "concurrency": int(self.concurrency),
+            "at": time.time(),
+        })
+        logger.warning(
+            f"USAspending backoff ({reason}): rate {rate:.2f} req/s, concurrency {int(self.concurrency)}")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rate": round(self.rate, 3),
+                "concurrency": int(self.concurrency),
+                "in_flight": self._in_flight,
+                "latency_baseline": round(self.latency_baseline, 3) if self.latency_baseline else None,
+                **self._counts,
+                "backoff_events": list(self.backoff_events),
+            }
 
 
-def get_session() -> requests.Session:
-    """Configures a requests Session with robust retries and connection pooling."""
+def get_session(pool_size: int = 10) -> requests.Session:
+    """
+    Configures a requests Session with connection retries and pooling.
+
+    HTTP status retries (429/5xx) are left to fetch_page so that the rate
+    controller sees every throttled or failed response.
+    """
     session = requests.Session()
-    # Retry on 429 Too Many Requests, 500, 502, 503, 504
     retry = Retry(
-        total=5,
-        read=5,
-        connect=5,
+        total=3,
+        read=3,
+        connect=3,
+        status=0,
+        # Otherwise urllib3 treats any 429/503 carrying Retry-After as a
+        # status retry and, with status=0, fails it before fetch_page sees it
+        respect_retry_after_header=False,
         backoff_factor=1,
-        status_forcelist=(429, 500, 502, 503, 504),
         allowed_methods=None,  # urllib3 default excludes POST; None retries all methods
-        respect_retry_after_header=True,
     )
     adapter = HTTPAdapter(
-        max_retries=retry, pool_connections=10, pool_maxsize=10)
+        max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
     session.mount('http://', adapter)
     session.mount('https://', adapter)
     return session
 
 
-def fetch_contracts(start_date: str, end_date: str, spending_level: str = "awards", award_type_codes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
-    """
-    Fetches contracts from USAspending API for a given date range and spending level.
-
-    Args:
-        start_date (str): YYYY-MM-DD
-        end_date (str): YYYY-MM-DD
-        spending_level (str): "awards" for prime awards, "subawards" for sub-contracts
-        award_type_codes (list): List of USAspending award type codes (e.g., ['A', 'B'])
-
-    Returns:
-        list: List of contract dictionaries
-    """
-    url = f"{API_BASE_URL}{SEARCH_ENDPOINT}"
-    headers = {"Content-Type": "application/json"}
-
+def build_search_payload(start_date: str, end_date: str, spending_level: str = "awards", award_type_codes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Builds the spending_by_award request body (without the page number)."""
     if award_type_codes is None:
         # Default to contracts if not specified
         award_type_codes = ["A", "B", "C", "D"]
@@ -87,7 +282,7 @@ def fetch_contracts(start_date: str, end_date: str, spending_level: str = "award
             "Awarding Agency", "Awarding Agency Code", "Awarding Sub Agency", "Awarding Sub Agency Code",
         ]
 
-    payload = {
+    return {
         "filters": filters,
         "fields": fields,
         "spending_level": spending_level,
@@ -95,92 +290,621 @@ def fetch_contracts(start_date: str, end_date: str, spending_level: str = "award
         "page": 1
     }
 
-    all_results = []
-    page = 1
-    session = get_session()
 
-    while True:
-        logger.info(f"Fetching {spending_level} page {page}...")
-        payload["page"] = page
+def recording_key(payload: Dict[str, Any]) -> str:
+    """Identifies a search (filters, fields, spending level) independent of the page number."""
+    search = {k: v for k, v in payload.items() if k != "page"}
+    return hashlib.sha1(json.dumps(search, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def recording_path(record_dir: str, payload: Dict[str, Any], page: int) -> str:
+    return os.path.join(record_dir, recording_key(payload), f"page-{page:05d}.json")
+
+
+def save_recording(record_dir: str, payload: Dict[str, Any], page: int, data: Dict[str, Any]) -> None:
+    """Writes one page response (and the search it answers) under record_dir."""
+    path = recording_path(record_dir, payload, page)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    search_path = os.path.join(os.path.dirname(path), "search.json")
+    if not os.path.exists(search_path):
+        with open(search_path, "w") as f:
+            json.dump({k: v for k, v in payload.items() if k != "page"}, f)
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def _retry_after_seconds(response: requests.Response) -> float:
+    value = response.headers.get("Retry-After")
+    if isinstance(value, str) and value.isdigit():
+        return min(float(value), MAX_RETRY_AFTER_SECONDS)
+    return 0.0
+
 
+def fetch_page(session: requests.Session, payload: Dict[str, Any], page: int, rate_limiter: Optional[RateLimiter] = None) -> Dict[str, Any]:
+    """
+    Fetches a single results page and returns the decoded response body.
+
+    429 and 5xx responses are retried up to MAX_PAGE_ATTEMPTS times, each
+    attempt going back through the rate limiter so its backoff applies.
+    Raises once attempts are exhausted so callers never mistake a failed
+    page for the end of the data.
+    """
+    url = f"{API_BASE_URL}{SEARCH_ENDPOINT}"
+    headers = {"Content-Type": "application/json"}
+    spending_level = payload.get("spending_level")
+    if rate_limiter is None:
+        rate_limiter = RateLimiter(interval=0)
+
+    for attempt in range(1, MAX_PAGE_ATTEMPTS + 1):
+        rate_limiter.acquire()
+        logger.info(f"Fetching {spending_level} page {page}...")
+        status = None
+        started = time.monotonic()
         try:
             response = session.post(
-                url, headers=headers, json=payload, timeout=30)
-
-            if response.status_code != 200:
-                logger.error(f"Error fetching data: {
-                             response.status_code} - {response.text}")
-                break
+                url, headers=headers, json={**payload, "page": page}, timeout=30)
+            status = response.status_code
+        except requests.exceptions.RequestException as e:
+            logger.error(
+                f"Failed to fetch {spending_level} page {page} due to connection error: {e}")
+            if attempt == MAX_PAGE_ATTEMPTS:
+                raise
+            continue
+        finally:
+            rate_limiter.release(status, time.monotonic() - started)
 
+        if status == 200:
             data = response.json()
-            results = data.get("results", [])
-            if not results:
-                break
+            if RECORD_DIR:
+                save_recording(RECORD_DIR, payload, page, data)
+            return data
 
-            all_results.extend(results)
-            if not data.get("page_metadata", {}).get("hasNext", False):
-                break
+        logger.error(f"Error fetching data: {status} - {response.text}")
+        if status in RETRY_STATUSES and attempt < MAX_PAGE_ATTEMPTS:
+            time.sleep(_retry_after_seconds(response))
+            continue
+        raise RuntimeError(
+            f"USAspending returned {status} for {spending_level} page {page}")
 
-            page += 1
-            # Prevent rate limiting and connection drops from USAspending API
-            time.sleep(0.5)
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to fetch {spending_level} page {
-                         page} due to connection error: {e}")
-            break
+def iter_contract_pages(start_date: str, end_date: str, spending_level: str = "awards", award_type_codes: Optional[List[str]] = None, max_workers: int = 1, rate_limiter: Optional[RateLimiter] = None, start_page: int = 1) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yields USAspending results one page at a time, in page order.
+
+    Takes the same arguments as fetch_contracts, plus start_page to resume a
+    partially ingested window. Only the pages currently in flight are held in
+    memory, so callers can process arbitrarily large windows with bounded
+    memory.
+    """
+    payload = build_search_payload(
+        start_date, end_date, spending_level, award_type_codes)
+    if rate_limiter is None:
+        rate_limiter = RateLimiter()
+    session = get_session(pool_size=max(10, max_workers))
+
+    if max_workers <= 1:
+        return _iter_pages_serial(session, payload, rate_limiter, start_page)
+    return _iter_pages_concurrent(session, payload, rate_limiter, max_workers, start_page)
+
+
+def fetch_contracts(start_date: str, end_date: str, spending_level: str = "awards", award_type_codes: Optional[List[str]] = None, max_workers: int = 1, rate_limiter: Optional[RateLimiter] = None) -> List[Dict[str, Any]]:
+    """
+    Fetches contracts from USAspending API for a given date range and spending level.
+
+    Args:
+        start_date (str): YYYY-MM-DD
+        end_date (str): YYYY-MM-DD
+        spending_level (str): "awards" for prime awards, "subawards" for sub-contracts
+        award_type_codes (list): List of USAspending award type codes (e.g., ['A', 'B'])
+        max_workers (int): Pages fetched concurrently. 1 walks pages serially.
+        rate_limiter (RateLimiter): Shared request budget. Defaults to a
+            private limiter using REQUEST_INTERVAL_SECONDS.
 
+    Returns:
+        list: List of contract dictionaries, in page order
+    """
+    all_results = []
+    for page_results in iter_contract_pages(start_date, end_date, spending_level, award_type_codes, max_workers, rate_limiter):
+        all_results.extend(page_results)
     return all_results
 
 
+def _is_last_page(data: Dict[str, Any]) -> bool:
+    return not data.get("page_metadata", {}).get("hasNext", False)
+
+
+def _iter_pages_serial(session: requests.Session, payload: Dict[str, Any], rate_limiter: RateLimiter, start_page: int = 1) -> Iterator[List[Dict[str, Any]]]:
+    page = start_page
+
+    while True:
+        data = fetch_page(session, payload, page, rate_limiter)
+        results = data.get("results", [])
+        if not results:
+            return
+
+        yield results
+        if _is_last_page(data):
+            return
+
+        page += 1
+
+
+def _iter_pages_concurrent(session: requests.Session, payload: Dict[str, Any], rate_limiter: RateLimiter, max_workers: int, start_page: int = 1) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Keeps up to max_workers pages in flight and yields them in page order.
+
+    The total page count is unknown up front, so pages past the end are
+    requested speculatively; their (empty) responses are discarded once an
+    earlier page reports hasNext = False.
+    """
+    in_flight = {}
+    next_page = start_page
+    current = start_page
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        try:
+            while True:
+                while len(in_flight) < max_workers:
+                    in_flight[next_page] = pool.submit(
+                        fetch_page, session, payload, next_page, rate_limiter)
+                    next_page += 1
+
+                data = in_flight.pop(current).result()
+                results = data.get("results", [])
+                if not results:
+                    return
+
+                yield results
+                if _is_last_page(data):
+                    return
+
+                current += 1
+        finally:
+            for future in in_flight.values():
+                future.cancel()
+
+
+class ArchiveWriter:
+    """
+    Streams records into a chunked, gzip-compressed NDJSON archive on S3.
+
+    Layout under s3://<bucket>/<date_str>/:
+        part-00000.ndjson.gz, part-00001.ndjson.gz, ...   one JSON record per line
+        manifest.json   {"format", "record_count", "chunks": [{"key", "records", "bytes"}]}
+
+    Each chunk is compressed as records arrive and uploaded in multipart
+    parts of ARCHIVE_PART_SIZE bytes, so memory stays bounded by the part
+    size. A chunk is sealed after ARCHIVE_CHUNK_RECORDS records and the
+    manifest is rewritten, so readers only ever see complete chunks. Chunks
+    small enough to fit one part are written with a plain put_object.
+
+    Records only become durable when their chunk is sealed; parts of an
+    unfinished multipart upload are not readable and are lost with the
+    process. If an upload fails, the open chunk is dropped and its multipart
+    upload aborted; uploads orphaned by a killed process are cleaned up by
+    the bucket's lifecycle rule. write() returns the writer's record count after the write, and
+    a record is durable once sealed_count has reached that position.
+
+    With resume=True the existing manifest is loaded and new chunks are
+    appended after it, which is how a resumed ingestion run adds its
+    remaining pages. Safe to share between threads.
+    """
+
+    def __init__(self, date_str: str, resume: bool = False):
+        self.prefix = date_str
+        self.manifest_key = f"{date_str}/manifest.json"
+        self.manifest = (read_archive_manifest(date_str) if resume else None) or {
+            "format": ARCHIVE_FORMAT, "record_count": 0, "chunks": []}
+        self.record_count = 0
+        self.sealed_count = 0
+        self._lock = threading.Lock()
+        self._reset_chunk()
+
+    def write(self, records: List[Dict[str, Any]]) -> int:
+        with self._lock:
+            for record in records:
+                line = json.dumps(record).encode("utf-8") + b"\n"
+                self._buffer += self._compressor.compress(line)
+                self._chunk_records += 1
+                self._chunk_bytes += len(line)
+                self.record_count += 1
+                if len(self._buffer) >= ARCHIVE_PART_SIZE:
+                    self._upload_part()
+                if self._chunk_records >= ARCHIVE_CHUNK_RECORDS:
+                    self._seal_chunk()
+            return self.record_count
+
+    def seal(self) -> None:
+        """Seals the open chunk so every record written so far is durable."""
+        with self._lock:
+            if self._chunk_records:
+                self._seal_chunk()
+
+    def close(self) -> Optional[str]:
+        """Seals the open chunk. Returns the manifest key, or None if nothing was ever written."""
+        self.seal()
+        with self._lock:
+            if not self.manifest["chunks"]:
+                return None
+            logger.info(
+                f"Archived {self.record_count} contracts to s3://{S3_BUCKET}/{self.manifest_key}")
+            return self.manifest_key
+
+    def _reset_chunk(self) -> None:
+        self._compressor = zlib.compressobj(wbits=31)  # gzip container
+        self._buffer = bytearray()
+        self._chunk_key = f"{self.prefix}/part-{len(self.manifest['chunks']):05d}.ndjson.gz"
+        self._chunk_records = 0
+        self._chunk_bytes = 0
+        self._compressed_bytes = 0
+        self._upload_id = None
+        self._parts = []
+
+    def _abort_chunk(self) -> None:
+        """Drops the open chunk after a failed upload, aborting its multipart upload so no parts are left billed."""
+        if self._upload_id is not None:
+            try:
+                s3_client.abort_multipart_upload(
+                    Bucket=S3_BUCKET, Key=self._chunk_key, UploadId=self._upload_id)
+            except Exception as e:
+                logger.warning(f"Failed to abort multipart upload of {self._chunk_key}: {e}")
+        logger.error(f"Dropped {self._chunk_records} unsealed records of {self._chunk_key}")
+        self._reset_chunk()
+
+    def _upload_part(self) -> None:
+        try:
+            if self._upload_id is None:
+                self._upload_id = s3_client.create_multipart_upload(
+                    Bucket=S3_BUCKET, Key=self._chunk_key,
+                    ContentType='application/x-ndjson', ContentEncoding='gzip')['UploadId']
+            part_number = len(self._parts) + 1
+            response = s3_client.upload_part(
+                Bucket=S3_BUCKET,
+                Key=self._chunk_key,
+                UploadId=self._upload_id,
+                PartNumber=part_number,
+                Body=bytes(self._buffer)
+            )
+        except Exception:
+            self._abort_chunk()
+            raise
+        self._parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+        self._compressed_bytes += len(self._buffer)
+        self._buffer = bytearray()
+
+    def _seal_chunk(self) -> None:
+        self._buffer += self._compressor.flush()
+        try:
+            if self._upload_id is None:
+                s3_client.put_object(
+                    Bucket=S3_BUCKET,
+                    Key=self._chunk_key,
+                    Body=bytes(self._buffer),
+                    ContentType='application/x-ndjson',
+                    ContentEncoding='gzip'
+                )
+                self._compressed_bytes += len(self._buffer)
+            else:
+                self._upload_part()
+                s3_client.complete_multipart_upload(
+                    Bucket=S3_BUCKET,
+                    Key=self._chunk_key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={"Parts": self._parts}
+                )
+        except Exception:
+            self._abort_chunk()
+            raise
+
+        self.manifest["chunks"].append({
+            "key": self._chunk_key,
+            "records": self._chunk_records,
+            "bytes": self._compressed_bytes,
+            "uncompressed_bytes": self._chunk_bytes,
+        })
+        self.manifest["record_count"] += self._chunk_records
+        self.sealed_count += self._chunk_records
+        s3_client.put_object(
+            Bucket=S3_BUCKET,
+            Key=self.manifest_key,
+            Body=json.dumps(self.manifest),
+            ContentType='application/json'
+        )
+        self._reset_chunk()
+
+
+def read_archive_manifest(date_str: str) -> Optional[Dict[str, Any]]:
+    """Returns the archive manifest for a prefix, or None if there is none."""
+    try:
+        response = s3_client.get_object(
+            Bucket=S3_BUCKET, Key=f"{date_str}/manifest.json")
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return None
+        raise
+    return json.loads(response['Body'].read())
+
+
+def iter_archive_records(date_str: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yields every record in an archive, one chunk stream at a time.
+
+    Falls back to the legacy single contracts.json object for prefixes that
+    were archived before the chunked format existed.
+    """
+    manifest = read_archive_manifest(date_str)
+    if manifest is None:
+        response = s3_client.get_object(
+            Bucket=S3_BUCKET, Key=f"{date_str}/contracts.json")
+        yield from json.loads(response['Body'].read())
+        return
+
+    for chunk in manifest["chunks"]:
+        body = s3_client.get_object(Bucket=S3_BUCKET, Key=chunk["key"])['Body']
+        with gzip.GzipFile(fileobj=body) as stream:
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+
+
 def archive_to_s3(contracts: List[Dict[str, Any]], date_str: str) -> str:
-    """Archives raw contract data to S3."""
-    file_key = f"{date_str}/contracts.json"
-    logger.info(f"Archiving {len(contracts)
-                             } contracts to s3://{S3_BUCKET}/{file_key}")
-
-    s3_client.put_object(
-        Bucket=S3_BUCKET,
-        Key=file_key,
-        Body=json.dumps(contracts),
-        ContentType='application/json'
+    """Archives raw contract data to S3. Returns the manifest key."""
+    archive = ArchiveWriter(date_str)
+    archive.write(contracts)
+    return archive.close() or archive.manifest_key
+
+
+def get_db_connection() -> psycopg2.extensions.connection:
+    client = boto3.client('secretsmanager')
+    response = client.get_secret_value(SecretId=DB_SECRET_ARN)
+    db_creds = json.loads(response['SecretString'])
+    return psycopg2.connect(
+        host=DB_HOST,
+        database=DB_NAME,
+        user=db_creds.get('username', DB_USER),
+        password=db_creds['password'],
+        connect_timeout=10
     )
-    return file_key
+
+
+class IngestionInterrupted(Exception):
+    """Raised when a stream stops early because the Lambda is running out of time."""
+
+
+class IngestionCheckpoint:
+    """
+    Per-stream page checkpoints for one ingestion window, kept in etl_runs.
+
+    metadata layout:
+        {"start_date": ..., "end_date": ..., "attempts": n,
+         "streams": {"<stream>": {"last_page": n, "records": n, "complete": bool}}}
+
+    A window whose latest run is still 'running' (timed out) or 'failed' is
+    resumed from the page after each stream's last completed page.
+    """
+
+    def __init__(self, conn: psycopg2.extensions.connection, run_id: str, metadata: Dict[str, Any]):
+        self.conn = conn
+        self.run_id = run_id
+        self.metadata = metadata
+        self._lock = threading.Lock()
+
+    @classmethod
+    def start(cls, conn: psycopg2.extensions.connection, start_date: str, end_date: str, resume: bool = True) -> "IngestionCheckpoint":
+        """Resumes the latest unfinished run for the window, or records a new one."""
+        with conn.cursor() as cur:
+            row = None
+            if resume:
+                cur.execute(
+                    """
+                    SELECT id, metadata FROM etl_runs
+                    WHERE run_type = %s AND status IN ('running', 'failed')
+                      AND metadata->>'start_date' = %s AND metadata->>'end_date' = %s
+                    ORDER BY started_at DESC
+                    LIMIT 1
+                    """,
+                    (RUN_TYPE, start_date, end_date)
+                )
+                row = cur.fetchone()
+
+            if row:
+                run_id, metadata = str(row[0]), row[1]
+                metadata["attempts"] = metadata.get("attempts", 1) + 1
+                logger.info(
+                    f"Resuming ingestion run {run_id} (attempt {metadata['attempts']})")
+                cur.execute(
+                    "UPDATE etl_runs SET status = 'running', error_message = NULL, metadata = %s WHERE id = %s",
+                    (json.dumps(metadata), run_id)
+                )
+            else:
+                run_id = str(uuid.uuid4())
+                metadata = {"start_date": start_date, "end_date": end_date,
+                            "attempts": 1, "streams": {}}
+                cur.execute(
+                    """
+                    INSERT INTO etl_runs (id, run_type, status, records_fetched, started_at, metadata)
+                    VALUES (%s, %s, 'running', 0, NOW(), %s)
+                    """,
+                    (run_id, RUN_TYPE, json.dumps(metadata))
+                )
+        return cls(conn, run_id, metadata)
+
+    @property
+    def attempt(self) -> int:
+        return self.metadata.get("attempts", 1)
+
+    def stream_state(self, stream: str) -> Dict[str, Any]:
+        return self.metadata["streams"].setdefault(
+            stream, {"last_page": 0, "records": 0, "complete": False})
+
+    def next_page(self, stream: str) -> int:
+        return self.stream_state(stream)["last_page"] + 1
+
+    def is_complete(self, stream: str) -> bool:
+        return self.stream_state(stream)["complete"]
+
+    def page_done(self, stream: str, page: int, record_count: int) -> None:
+        with self._lock:
+            state = self.stream_state(stream)
+            state["last_page"] = page
+            state["records"] += record_count
+            self._save()
+
+    def stream_done(self, stream: str) -> None:
+        with self._lock:
+            self.stream_state(stream)["complete"] = True
+            self._save()
+
+    def finish(self, status: str, error_message: Optional[str] = None) -> None:
+        with self._lock, self.conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE etl_runs
+                SET status = %s, error_message = %s, records_fetched = %s,
+                    metadata = %s, completed_at = NOW()
+                WHERE id = %s
+                """,
+                (status, error_message, self.records_fetched,
+                 json.dumps(self.metadata), self.run_id)
+            )
+
+    @property
+    def records_fetched(self) -> int:
+        return sum(state["records"] for state in self.metadata["streams"].values())
+
+    def _save(self) -> None:
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "UPDATE etl_runs SET metadata = %s, records_fetched = %s WHERE id = %s",
+                (json.dumps(self.metadata), self.records_fetched, self.run_id)
+            )
+
+
+def _encode_envelope(records: List[Dict[str, Any]], data_type: str, compress: bool) -> List[str]:
+    """Encodes records as one message body, splitting the group if it is over the size limit."""
+    if compress:
+        packed = base64.b64encode(gzip.compress(
+            json.dumps(records).encode("utf-8"))).decode("ascii")
+        envelope = {"type": data_type, "encoding": "gzip", "count": len(records), "payload": packed}
+    else:
+        envelope = {"type": data_type, "count": len(records), "records": records}
+
+    body = json.dumps(envelope)
+    if len(body) <= SQS_MAX_MESSAGE_BYTES:
+        return [body]
+    if len(records) == 1:
+        raise ValueError(
+            f"Single {data_type} record exceeds the SQS message size limit")
+    middle = len(records) // 2
+    return (_encode_envelope(records[:middle], data_type, compress)
+            + _encode_envelope(records[middle:], data_type, compress))
+
+
+def normalize_vendor_name(name: Optional[str]) -> str:
+    """Same rules as entity_resolver.normalize_vendor_name (separate Lambda package; kept in sync by tests)."""
+    if not name:
+        return ""
+    name = name.upper()
+    name = re.sub(r"[.,\/#!$%\^&\*;:{}=\-_~()]", " ", name)
+    name = re.sub(
+        r"\b(CORP|CORPORATION|INC|INCORPORATED|LLC|LTD|LIMITED|CO|COMPANY|PLC)\b", "", name)
+    return " ".join(name.split())
+
+
+def vendor_affinity_key(contract: Dict[str, Any], data_type: str = "prime") -> Tuple[str, str]:
+    """
+    Sort key that puts records for the same vendor next to each other.
+
+    Uses the resolver's normalized name, so spelling variants of one vendor
+    ("ACME CORP", "Acme Corporation") cluster too. Sub-awards cluster by
+    sub-awardee, then by prime recipient.
+    """
+    if data_type == "subaward":
+        return (normalize_vendor_name(contract.get('Sub-Awardee Name')) or (contract.get('Sub-Recipient UEI') or ""),
+                normalize_vendor_name(contract.get('Prime Recipient Name')))
+    return (normalize_vendor_name(contract.get('Recipient Name')) or (contract.get('Recipient UEI') or ""), "")
+
+
+def pack_messages(contracts: List[Dict[str, Any]], data_type: str = "prime", max_records: Optional[int] = None, compress: Optional[bool] = None) -> List[str]:
+    """
+    Packs contracts into as few SQS message bodies as possible.
+
+    Envelope: {"type", "count", "records": [...]} or, when compressed,
+    {"type", "count", "encoding": "gzip", "payload": <base64 gzip of the records array>}.
+    Each body holds at most max_records records and SQS_MAX_MESSAGE_BYTES bytes.
+    """
+    if max_records is None:
+        max_records = SQS_RECORDS_PER_MESSAGE
+    if compress is None:
+        compress = SQS_COMPRESS_MESSAGES
+    # Compressed payloads fit several times more raw JSON per message; the
+    # exact size is checked (and the group split) after encoding.
+    budget = SQS_MAX_MESSAGE_BYTES * (4 if compress else 1)
+
+    bodies = []
+    group, group_bytes = [], 0
+    for contract in contracts:
+        size = len(json.dumps(contract)) + 2
+        if group and (len(group) >= max_records or group_bytes + size > budget):
+            bodies.extend(_encode_envelope(group, data_type, compress))
+            group, group_bytes = [], 0
+        group.append(contract)
+        group_bytes += size
+    if group:
+        bodies.extend(_encode_envelope(group, data_type, compress))
+    return bodies
 
 
 def send_to_queue(contracts: List[Dict[str, Any]], data_type: str = "prime") -> None:
-    """Sends individual contracts to SQS in batches."""
-    logger.info(f"Sending {len(contracts)} {
-                data_type} messages to SQS queue...")
-
-    # SQS SendMessageBatch supports up to 10 messages
-    for i in range(0, len(contracts), 10):
-        batch = contracts[i:i+10]
-        entries = []
-        for j, contract in enumerate(batch):
-            # Include type for the processor to differentiate
-            message_body = {
-                "type": data_type,
-                "data": contract
-            }
-            entries.append({
-                'Id': str(j),
-                'MessageBody': json.dumps(message_body)
-            })
+    """
+    Sends contracts to SQS, packed many records per message.
 
+    Records are grouped by vendor first, so each message (and so each
+    resolver invocation) sees a handful of vendors many times instead of many
+    vendors once, and can resolve each of them once.
+    """
+    contracts = sorted(
+        contracts, key=lambda contract: vendor_affinity_key(contract, data_type))
+    bodies = pack_messages(contracts, data_type)
+    logger.info(
+        f"Sending {len(contracts)} {data_type} records to SQS in {len(bodies)} messages...")
+
+    # SQS SendMessageBatch supports up to 10 messages and SQS_MAX_MESSAGE_BYTES in total
+    batches, batch, batch_bytes = [], [], 0
+    for body in bodies:
+        if batch and (len(batch) == 10 or batch_bytes + len(body) > SQS_MAX_MESSAGE_BYTES):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(body)
+        batch_bytes += len(body)
+    if batch:
+        batches.append(batch)
+
+    for batch in batches:
+        entries = [{'Id': str(j), 'MessageBody': body}
+                   for j, body in enumerate(batch)]
         response = sqs_client.send_message_batch(
             QueueUrl=SQS_QUEUE_URL,
             Entries=entries
         )
         if response.get('Failed'):
-            failed_ids = [f['id'] for f in response['Failed']]
+            failed_ids = [f['Id'] for f in response['Failed']]
             logger.error(f"Failed to send messages: {failed_ids}")
-            raise RuntimeError(f"SQS batch send partially failed: {
-                               len(response['Failed'])} messages")
+            raise RuntimeError(
+                f"SQS batch send partially failed: {len(response['Failed'])} messages")
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """Main Lambda Entry Point."""
+    # Long ranges: {"backfill": {"start_date": ..., "end_date": ..., "shard": "day"|"week"}}
+    backfill = event.get('backfill')
+    if backfill:
+        return run_backfill(
+            backfill['start_date'], backfill['end_date'],
+            shard=backfill.get('shard', 'week'),
+            parallelism=backfill.get('parallelism', BACKFILL_PARALLELISM),
+            context=context, event=event)
+
     # Get configuration from event
     days_back = event.get('days', 3)  # Default to 3 days to handle lag
     target_date = event.get('date')
@@ -197,41 +921,275 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                       ).strftime("%Y-%m-%d")
         end_date = today.strftime("%Y-%m-%d")
 
+    counts = ingest_window(start_date, end_date,
+                           resume=event.get('resume', True))
+
+    prime_count = counts["prime_contracts"] + counts["prime_idvs"]
+    sub_count = counts["sub_awards"]
+    if not prime_count:
+        logger.info("No prime contracts or IDVs found.")
+    if not sub_count:
+        logger.info("No sub-awards found.")
+
+    total_count = prime_count + sub_count
+    return {
+        "statusCode": 200,
+        "body": f"Ingested {total_count} records (Primes: {prime_count}, Subs: {sub_count})."
+    }
+
+
+def ingest_window(start_date: str, end_date: str, rate_limiter: Optional[RateLimiter] = None, resume: bool = True, context: Any = None) -> Dict[str, int]:
+    """
+    Ingests every award stream for one date window.
+
+    Returns the record count per stream, including pages ingested by earlier
+    attempts when a checkpointed run is resumed. With a Lambda context, the
+    streams stop between pages once the remaining time drops below
+    BACKFILL_MIN_REMAINING_MS and IngestionInterrupted is raised; the run is
+    left 'running' so the next invocation resumes it from its checkpoints.
+    """
     logger.info(f"Starting ingestion: {start_date} to {end_date}")
 
-    # 1. Fetch Prime Awards (Split into groups to avoid 422 error)
+    # Prime awards are split into groups to avoid 422 error
     contract_types = ["A", "B", "C", "D"]
     idv_types = ["IDV_A", "IDV_B", "IDV_C", "IDV_D", "IDV_E"]
 
-    logger.info("Fetching Prime Contracts (A, B, C, D)...")
-    prime_contracts = fetch_contracts(
-        start_date, end_date, spending_level="awards", award_type_codes=contract_types)
+    # Sub-awards generally only apply to contracts, not IDVs
+    streams = {
+        "prime_contracts": ("awards", contract_types, "prime"),
+        "prime_idvs": ("awards", idv_types, "prime"),
+        "sub_awards": ("subawards", contract_types, "subaward"),
+    }
 
-    logger.info("Fetching Prime IDVs (IDV_A, IDV_B, IDV_C, IDV_D, IDV_E)...")
-    prime_idvs = fetch_contracts(
-        start_date, end_date, spending_level="awards", award_type_codes=idv_types)
+    # Checkpoint every page so a failed or timed-out run can pick up where it stopped
+    conn = None
+    checkpoint = None
+    if DB_SECRET_ARN:
+        conn = get_db_connection()
+        conn.autocommit = True
+        checkpoint = IngestionCheckpoint.start(
+            conn, start_date, end_date, resume=resume)
+    else:
+        logger.warning(
+            "DB_SECRET_ARN not configured. Running without checkpoints.")
+    resumed = checkpoint is not None and checkpoint.attempt > 1
 
-    all_primes = prime_contracts + prime_idvs
+    # All streams run side by side but share one request-rate budget
+    if rate_limiter is None:
+        rate_limiter = AdaptiveRateController()
+    archives: Dict[str, ArchiveWriter] = {}
+    try:
+        # Contracts and IDVs share the prime archive, sub-awards get their own.
+        # A resumed run appends its chunks to the earlier attempt's manifest,
+        # so reading it is part of the run and a failure is recorded.
+        for data_type in ("prime", "subaward"):
+            archives[data_type] = ArchiveWriter(
+                f"{start_date}_to_{end_date}/{data_type}", resume=resumed)
 
-    if all_primes:
-        archive_to_s3(all_primes, f"{start_date}_to_{end_date}/prime")
-        send_to_queue(all_primes, data_type="prime")
+        with ThreadPoolExecutor(max_workers=len(streams)) as pool:
+            futures = {}
+            for name, (spending_level, award_type_codes, data_type) in streams.items():
+                if checkpoint and checkpoint.is_complete(name):
+                    logger.info(f"Skipping {name}: completed by an earlier attempt")
+                    continue
+                start_page = checkpoint.next_page(name) if checkpoint else 1
+                pages = iter_contract_pages(
+                    start_date, end_date, spending_level=spending_level,
+                    award_type_codes=award_type_codes, max_workers=FETCH_WORKERS,
+                    rate_limiter=rate_limiter, start_page=start_page)
+                futures[name] = pool.submit(
+                    ingest_stream, pages, archives[data_type], data_type,
+                    checkpoint=checkpoint, stream=name, start_page=start_page,
+                    context=context)
+            counts = {name: future.result() for name, future in futures.items()}
+    except IngestionInterrupted:
+        logger.warning(f"Ingestion for {start_date} to {end_date} stopped early, out of time")
+        raise
+    except Exception as e:
+        logger.error(f"Ingestion failed for {start_date} to {end_date}: {e}")
+        if checkpoint:
+            checkpoint.finish("failed", str(e))
+        raise
     else:
-        logger.info("No prime contracts or IDVs found.")
+        if checkpoint:
+            checkpoint.finish("completed")
+    finally:
+        logger.info(
+            f"METRICS: usaspending_client {json.dumps(rate_limiter.metrics())}")
+        # Keep whatever was enqueued archived, even on failure; a resumed
+        # attempt appends its remaining pages to the same manifest.
+        for archive in archives.values():
+            archive.close()
+        if conn:
+            conn.close()
 
-    # 2. Fetch Sub-Awards (Sub-awards generally only apply to contracts, not IDVs)
-    sub_awards = fetch_contracts(
-        start_date, end_date, spending_level="subawards", award_type_codes=contract_types)
-    if sub_awards:
-        archive_to_s3(sub_awards, f"{start_date}_to_{end_date}/subaward")
-        send_to_queue(sub_awards, data_type="subaward")
-    else:
-        logger.info("No sub-awards found.")
+    if checkpoint:
+        # Include pages ingested by earlier attempts of a resumed run
+        counts = {name: checkpoint.stream_state(name)["records"] for name in streams}
+    return counts
+
+
+def ingest_stream(pages: Iterable[List[Dict[str, Any]]], archive: ArchiveWriter, data_type: str, checkpoint: Optional[IngestionCheckpoint] = None, stream: Optional[str] = None, start_page: int = 1, context: Any = None) -> int:
+    """
+    Archives each page as it arrives and enqueues pages in vendor-grouped
+    batches of about SQS_AFFINITY_RECORDS records. Returns the record count.
+
+    With a checkpoint, pages are recorded only after they have been enqueued
+    and their archive chunk has been sealed, so a resumed run may repeat up
+    to one chunk of pages but never skips any. The open chunk is sealed when
+    the stream ends. Buffered pages are still sent if the page iterator fails.
+
+    With a Lambda context the remaining time is checked after every page;
+    when it runs low the buffered pages are sent and checkpointed and
+    IngestionInterrupted is raised.
+    """
+    count = 0
+    page = start_page
+    pending: List[Tuple[int, int, List[Dict[str, Any]]]] = []
+    # (archive position, page, record count) of pages sent but not yet checkpointed
+    sent: Deque[Tuple[int, int, int]] = deque()
+
+    def flush() -> None:
+        batch = pending[:]
+        pending.clear()
+        send_to_queue([r for _, _, results in batch for r in results], data_type=data_type)
+        if checkpoint:
+            sent.extend((position, done_page, len(results)) for position, done_page, results in batch)
+            checkpoint_durable()
+
+    def checkpoint_durable() -> None:
+        while sent and sent[0][0] <= archive.sealed_count:
+            _, done_page, record_count = sent.popleft()
+            checkpoint.page_done(stream, done_page, record_count)
+
+    try:
+        for page_results in pages:
+            position = archive.write(page_results)
+            pending.append((position, page, page_results))
+            count += len(page_results)
+            page += 1
+            if sum(len(results) for _, _, results in pending) >= SQS_AFFINITY_RECORDS:
+                flush()
+            if not _has_time_left(context):
+                raise IngestionInterrupted(f"{stream or data_type} stopped before page {page}")
+    finally:
+        if pending:
+            flush()
+        if sent:
+            archive.seal()
+            checkpoint_durable()
+    if checkpoint:
+        checkpoint.stream_done(stream)
+    return count
+
+
+def split_date_range(start_date: str, end_date: str, shard: str = "week") -> List[Tuple[str, str]]:
+    """Splits an inclusive date range into consecutive day- or week-sized windows."""
+    if shard not in ("day", "week"):
+        raise ValueError(f"Unknown shard size: {shard}")
+    step = datetime.timedelta(days=1 if shard == "day" else 7)
+    start = datetime.date.fromisoformat(start_date)
+    end = datetime.date.fromisoformat(end_date)
+
+    windows = []
+    while start <= end:
+        window_end = min(start + step - datetime.timedelta(days=1), end)
+        windows.append((start.isoformat(), window_end.isoformat()))
+        start = window_end + datetime.timedelta(days=1)
+    return windows
+
+
+def completed_windows(start_date: str, end_date: str) -> Set[Tuple[str, str]]:
+    """Returns the windows in the range that already have a completed etl_runs row."""
+    if not DB_SECRET_ARN:
+        return set()
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT metadata->>'start_date', metadata->>'end_date' FROM etl_runs
+                WHERE run_type = %s AND status = 'completed'
+                  AND metadata->>'start_date' >= %s AND metadata->>'end_date' <= %s
+                """,
+                (RUN_TYPE, start_date, end_date)
+            )
+            return {(row[0], row[1]) for row in cur.fetchall()}
+    finally:
+        conn.close()
+
+
+def _has_time_left(context: Any) -> bool:
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return True
+    return context.get_remaining_time_in_millis() > BACKFILL_MIN_REMAINING_MS
+
+
+def run_backfill(start_date: str, end_date: str, shard: str = "week", parallelism: int = BACKFILL_PARALLELISM, context: Any = None, event: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Ingests a long date range as day- or week-sized shards.
+
+    Up to `parallelism` shards run at once through ingest_window, sharing one
+    request-rate budget. Shards with a completed etl_runs row are skipped and
+    interrupted shards resume from their checkpoints, so the backfill can be
+    restarted at any time. Inside Lambda no new shard is started once the
+    remaining time drops below BACKFILL_MIN_REMAINING_MS, and running shards
+    checkpoint and stop between pages. If shards are left over and this
+    invocation made progress, the function re-invokes itself asynchronously
+    with the same event.
+    """
+    windows = split_date_range(start_date, end_date, shard)
+    done = completed_windows(start_date, end_date)
+    queue = deque(w for w in windows if w not in done)
+    logger.info(
+        f"Backfill {start_date} to {end_date}: {len(windows)} {shard} shards, {len(done)} already complete")
+
+    rate_limiter = AdaptiveRateController()
+    completed, interrupted, failed = [], [], []
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=parallelism) as pool:
+        while queue or in_flight:
+            while queue and len(in_flight) < parallelism and _has_time_left(context):
+                window = queue.popleft()
+                in_flight[pool.submit(
+                    ingest_window, *window, rate_limiter=rate_limiter, context=context)] = window
+            if not in_flight:
+                break
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                window = in_flight.pop(future)
+                try:
+                    future.result()
+                    completed.append(window)
+                    logger.info(f"Backfill shard {window[0]} to {window[1]} complete")
+                except IngestionInterrupted:
+                    interrupted.append(window)
+                    logger.info(f"Backfill shard {window[0]} to {window[1]} checkpointed, out of time")
+                except Exception as e:
+                    failed.append(window)
+                    logger.error(
+                        f"Backfill shard {window[0]} to {window[1]} failed: {e}")
+
+    logger.info(
+        f"METRICS: usaspending_client {json.dumps(rate_limiter.metrics())}")
+    pending = len(queue) + len(interrupted) + len(failed)
+    if pending and (completed or interrupted) and event is not None and context is not None:
+        logger.info(f"{pending} shards left, re-invoking {context.function_name}")
+        get_lambda_client().invoke(
+            FunctionName=context.function_name,
+            InvocationType='Event',
+            Payload=json.dumps(event)
+        )
 
-    total_count = len(all_primes) + len(sub_awards)
     return {
         "statusCode": 200,
-        "body": f"Ingested {total_count} records (Primes: {len(all_primes)}, Subs: {len(sub_awards)})."
+        "body": json.dumps({
+            "shards_total": len(windows),
+            "shards_completed": len(done) + len(completed),
+            "shards_failed": [f"{s}_to_{e}" for s, e in failed],
+            "shards_pending": pending,
+        })
     }
 
 
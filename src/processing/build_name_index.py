@@ -0,0 +1,58 @@
+import json
+import argparse
+import logging
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import boto3
+import psycopg2.extensions
+
+from entity_resolver import get_db_connection, normalize_vendor_name
+from name_index import write_artifact
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def build_vendor_name_artifact(conn: psycopg2.extensions.connection, path: str) -> Dict[str, Any]:
+    """Writes every vendor's canonical name and identifiers, as of now, into a name index artifact at path."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT id, canonical_name, duns, uei, updated_at FROM vendors ORDER BY canonical_name")
+        rows = cur.fetchall()
+    names = [row[1] for row in rows]
+    identifiers = [(row[0], row[2], row[3]) for row in rows]
+    high_water = max((row[4] for row in rows if row[4]), default=None)
+    stats = write_artifact(path, names, normalize_vendor_name, high_water, identifiers)
+    stats["high_water"] = high_water.isoformat() if high_water else None
+    logger.info(f"Built vendor name artifact {path}: {stats}")
+    return stats
+
+
+def upload_artifact(path: str, s3_uri: str) -> None:
+    parsed = urlparse(s3_uri)
+    boto3.client("s3").upload_file(path, parsed.netloc, parsed.path.lstrip("/"))
+    logger.info(f"Uploaded {path} to {s3_uri}")
+
+
+def main(argv: Optional[list] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(
+        description="Build the vendor name index artifact that resolver Lambdas mmap at cold start.")
+    parser.add_argument("--output", default="vendor_names.idx")
+    parser.add_argument("--s3-uri", help="Also upload to this s3://bucket/key")
+    args = parser.parse_args(argv)
+
+    conn = get_db_connection()
+    try:
+        stats = build_vendor_name_artifact(conn, args.output)
+    finally:
+        conn.close()
+    if args.s3_uri:
+        upload_artifact(args.output, args.s3_uri)
+    print(json.dumps(stats))
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
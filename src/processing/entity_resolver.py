@@ -1,36 +1,68 @@
+import io
 import os
-import re
+import csv
 import json
+import gzip
+import base64
+import hashlib
 import uuid
 import boto3
 import psycopg2
 import logging
 import time
 import random
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, date, timedelta
 from rapidfuzz import process, fuzz
 import requests
-from psycopg2.extras import RealDictCursor
-from typing import Any, Dict, List, Optional, Tuple
+from psycopg2.extras import RealDictCursor, execute_values
+from name_index import NameBlockingIndex, MappedNames, VendorDirectory, VendorNameArtifact
+from name_normalizer import NameNormalizer
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import psycopg2.extensions
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Embedded metric format documents, written to stdout as the bare message:
+# CloudWatch only extracts metrics from log events that are plain JSON, so
+# they must bypass the Lambda handler's prefix on the root logger
+metrics_logger = logging.getLogger("govgraph.metrics")
+metrics_logger.setLevel(logging.INFO)
+metrics_logger.propagate = False
+if not metrics_logger.handlers:
+    _metrics_handler = logging.StreamHandler(sys.stdout)
+    _metrics_handler.setFormatter(logging.Formatter("%(message)s"))
+    metrics_logger.addHandler(_metrics_handler)
+
+
+# Incoming names normalized per container are memoized, up to this many
+NORMALIZE_MEMO_SIZE = int(os.environ.get("NORMALIZE_MEMO_SIZE", "65536"))
+VENDOR_NAME_NORMALIZER = NameNormalizer(memo_size=NORMALIZE_MEMO_SIZE)
+
 
 def normalize_vendor_name(name: Optional[str]) -> str:
     """Strips punctuation and common suffixes to create a highly matchable string."""
-    if not name:
-        return ""
-    name = name.upper()
-    name = re.sub(r"[.,\/#!$%\^&\*;:{}=\-_~()]", " ", name)
-    name = re.sub(
-        r"\b(CORP|CORPORATION|INC|INCORPORATED|LLC|LTD|LIMITED|CO|COMPANY|PLC)\b", "", name)
-    return " ".join(name.split())
+    return VENDOR_NAME_NORMALIZER.normalize(name)
+
+
+def normalize_vendor_names(names: List[Optional[str]]) -> List[str]:
+    """normalize_vendor_name for a whole list in one pass, e.g. every name in a cache build."""
+    return VENDOR_NAME_NORMALIZER.normalize_many(names)
+
 
+# (vendor_name, duns, uei) and resolve_vendor's (vendor_id, canonical_name, method, confidence)
+VendorKey = Tuple[Optional[str], Optional[str], Optional[str]]
+VendorResolution = Tuple[Optional[str], Optional[str], str, float]
 
 # Configuration
+# Records of a batch are processed on this many threads, each with its own pooled connection
+RESOLVER_WORKERS = int(os.environ.get("RESOLVER_WORKERS", "4"))
 DB_HOST = os.environ.get("DB_HOST")
 DB_NAME = os.environ.get("DB_NAME")
 DB_USER = os.environ.get("DB_USER")
@@ -38,11 +70,21 @@ DB_SECRET_ARN = os.environ.get("DB_SECRET_ARN")
 DYNAMODB_CACHE_TABLE = os.environ.get("DYNAMODB_CACHE_TABLE")
 BEDROCK_MODEL_ID = os.environ.get(
     "BEDROCK_MODEL_ID", "us.anthropic.claude-3-haiku-20240307-v1:0")
+# Vendor names standardized per Bedrock call when a batch reaches Tier 6
+BEDROCK_BATCH_SIZE = int(os.environ.get("BEDROCK_BATCH_SIZE", "40"))
 
 SAM_API_BASE_URL = "https://api.sam.gov/entity-information/v3/entities"
 SAM_API_KEY_SECRET_ARN = os.environ.get("SAM_API_KEY_SECRET_ARN")
+# Prebuilt vendor name index (build_name_index.py); copied to VENDOR_INDEX_PATH and mmapped
+VENDOR_INDEX_S3_URI = os.environ.get("VENDOR_INDEX_S3_URI")
+VENDOR_INDEX_PATH = os.environ.get("VENDOR_INDEX_PATH", "/tmp/vendor_names.idx")
 
-# Clients (initialized lazily)
+# Set once a SAM extract has been loaded into sam_entities (load_sam_extract.py)
+SAM_INDEX_LOADED = None
+SAM_INDEX_EXPIRY = None
+
+# Clients (initialized lazily; creation is locked because records are processed on several threads)
+_CLIENT_LOCK = threading.RLock()
 bedrock = None
 lambda_client = None
 dynamodb = None
@@ -55,29 +97,320 @@ _secrets_cache: Dict[str, Dict[str, Any]] = {}
 def get_bedrock_client() -> Any:
     global bedrock
     if bedrock is None:
-        bedrock = boto3.client(service_name="bedrock-runtime")
+        with _CLIENT_LOCK:
+            if bedrock is None:
+                bedrock = boto3.client(service_name="bedrock-runtime")
     return bedrock
 
 
 def get_lambda_client() -> Any:
     global lambda_client
     if lambda_client is None:
-        lambda_client = boto3.client(service_name="lambda")
+        with _CLIENT_LOCK:
+            if lambda_client is None:
+                lambda_client = boto3.client(service_name="lambda")
     return lambda_client
 
 
+def get_dynamodb() -> Any:
+    global dynamodb
+    if dynamodb is None:
+        with _CLIENT_LOCK:
+            if dynamodb is None:
+                dynamodb = boto3.resource("dynamodb")
+    return dynamodb
+
+
 def get_cache_table() -> Any:
-    global dynamodb, cache_table
+    global cache_table
     if cache_table is None:
-        dynamodb = boto3.resource("dynamodb")
-        cache_table = dynamodb.Table(DYNAMODB_CACHE_TABLE)
+        with _CLIENT_LOCK:
+            if cache_table is None:
+                cache_table = get_dynamodb().Table(DYNAMODB_CACHE_TABLE)
     return cache_table
 
 
+# In-process layer over the DynamoDB resolution cache
+RESOLUTION_CACHE_SIZE = int(os.environ.get("RESOLUTION_CACHE_SIZE", "20000"))
+RESOLUTION_CACHE_TTL_SECONDS = float(os.environ.get("RESOLUTION_CACHE_TTL_SECONDS", "900"))
+# batch_get_item takes at most 100 keys; queued writes are sent once this many pile up
+CACHE_BATCH_GET_SIZE = 100
+CACHE_WRITE_BATCH_SIZE = 100
+
+
+class ResolutionCache:
+    """
+    Bounded LRU of DynamoDB resolution cache items, in front of the table.
+
+    Entries, misses included, expire after ttl_seconds so writes from other
+    containers show up. get_many() reads all of a batch's local misses with
+    batch_get_item. put() updates the local entry and queues the write;
+    flush() sends queued items through batch_writer, one per name.
+    """
+
+    def __init__(self, max_size: int = RESOLUTION_CACHE_SIZE, ttl_seconds: float = RESOLUTION_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reads = 0
+        self.writes = 0
+
+    def _lookup(self, vendor_name: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(vendor_name)
+            if entry is None or entry[0] <= time.monotonic():
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(vendor_name)
+            self.hits += 1
+            return True, entry[1]
+
+    def _store(self, vendor_name: str, item: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._entries[vendor_name] = (time.monotonic() + self.ttl_seconds, item)
+            self._entries.move_to_end(vendor_name)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, vendor_name: str) -> Optional[Dict[str, Any]]:
+        found, item = self._lookup(vendor_name)
+        if found:
+            return item
+        self.reads += 1
+        RESOLUTION_METRICS.external_call("dynamodb")
+        item = get_cache_table().get_item(Key={'vendor_name': vendor_name}).get('Item')
+        self._store(vendor_name, item)
+        return item
+
+    def get_many(self, vendor_names: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Cached items for the names that have one; local misses cost one batch_get_item per 100 names."""
+        items: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for vendor_name in dict.fromkeys(vendor_names):
+            if not vendor_name:
+                continue
+            found, item = self._lookup(vendor_name)
+            if not found:
+                missing.append(vendor_name)
+            elif item:
+                items[vendor_name] = item
+
+        for start in range(0, len(missing), CACHE_BATCH_GET_SIZE):
+            keys = [{'vendor_name': name} for name in missing[start:start + CACHE_BATCH_GET_SIZE]]
+            self._batch_get(keys, items)
+        return items
+
+    def _batch_get(self, keys: List[Dict[str, str]], items: Dict[str, Dict[str, Any]]) -> None:
+        table_name = get_cache_table().name
+        for attempt in range(3):
+            try:
+                self.reads += 1
+                RESOLUTION_METRICS.external_call("dynamodb")
+                response = get_dynamodb().batch_get_item(RequestItems={table_name: {'Keys': keys}})
+            except Exception as e:
+                logger.warning(f"DynamoDB cache batch lookup failed: {e}")
+                return
+            found = {item['vendor_name']: item for item in response.get('Responses', {}).get(table_name, [])}
+            unprocessed = response.get('UnprocessedKeys', {}).get(table_name, {}).get('Keys', [])
+            retry = {key['vendor_name'] for key in unprocessed}
+            for key in keys:
+                name = key['vendor_name']
+                if name not in retry:
+                    self._store(name, found.get(name))
+                    if name in found:
+                        items[name] = found[name]
+            if not unprocessed:
+                return
+            keys = unprocessed
+            time.sleep(0.05 * (2 ** attempt))
+
+    def put(self, item: Dict[str, Any]) -> None:
+        self._store(item['vendor_name'], item)
+        with self._lock:
+            self._pending[item['vendor_name']] = item
+            full = len(self._pending) >= CACHE_WRITE_BATCH_SIZE
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            with get_cache_table().batch_writer() as batch:
+                for item in pending.values():
+                    batch.put_item(Item=item)
+            self.writes += len(pending)
+            # batch_writer sends up to 25 items per BatchWriteItem
+            RESOLUTION_METRICS.external_call("dynamodb", -(-len(pending) // 25))
+        except Exception as e:
+            logger.warning(f"Failed to update DynamoDB cache: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "dynamodb_reads": self.reads,
+            "dynamodb_writes": self.writes,
+            "size": len(self._entries),
+        }
+
+
+# Persists across warm Lambda invocations
+RESOLUTION_CACHE = ResolutionCache()
+
+RESOLUTION_METRICS_NAMESPACE = os.environ.get("RESOLUTION_METRICS_NAMESPACE", "GovGraph/EntityResolution")
+# resolve_vendor methods and the tier each comes from; LLM_RESOLUTION_FAILED is Tier 6 without an answer
+METHOD_TIERS = {
+    "CACHE_MATCH": "cache",
+    "DUNS_UEI_MATCH": "id",
+    "EXACT_NAME_MATCH": "exact_name",
+    "SAM_API_MATCH": "sam",
+    "NORMALIZED_EXACT_MATCH": "normalized",
+    "FUZZY_MATCH": "fuzzy",
+    "LLM_RESOLUTION": "llm",
+}
+
+
+class ResolutionMetrics:
+    """
+    Vendor resolution counters for one invocation: how often each tier was
+    tried and answered, the time spent in it, which method answered each
+    resolution, and calls made to DynamoDB, SAM.gov and Bedrock.
+
+    Tiers tried for a whole batch (resolve_vendors_batch) count one attempt
+    per key, so latency per attempt is amortized over the batch. snapshot()
+    returns the totals; flush() emits them once as CloudWatch embedded
+    metric format documents and starts over.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.tiers: Dict[str, Dict[str, float]] = {}
+        self.methods: Dict[str, int] = {}
+        self.external_calls: Dict[str, int] = {}
+        self.resolutions = 0
+        self.seconds = 0.0
+
+    @contextmanager
+    def tier(self, name: str, attempts: int = 1) -> Iterator[None]:
+        """Times one attempt at a tier (or attempts keys tried together)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                tier = self.tiers.setdefault(name, {"attempts": 0, "hits": 0, "seconds": 0.0})
+                tier["attempts"] += attempts
+                tier["seconds"] += elapsed
+
+    def resolved(self, methods: Iterable[str], seconds: float) -> None:
+        """Records the methods of resolutions that took seconds altogether."""
+        with self._lock:
+            for method in methods:
+                self.resolutions += 1
+                self.methods[method] = self.methods.get(method, 0) + 1
+                tier = METHOD_TIERS.get(method)
+                if tier:
+                    self.tiers.setdefault(tier, {"attempts": 0, "hits": 0, "seconds": 0.0})["hits"] += 1
+            self.seconds += seconds
+
+    def external_call(self, service: str, count: int = 1) -> None:
+        with self._lock:
+            self.external_calls[service] = self.external_calls.get(service, 0) + count
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._totals()
+
+    def _totals(self) -> Dict[str, Any]:
+        return {
+            "resolutions": self.resolutions,
+            "latency_ms": round(self.seconds * 1000, 3),
+            "methods": dict(self.methods),
+            "tiers": {
+                name: {
+                    "attempts": tier["attempts"],
+                    "hits": tier["hits"],
+                    "hit_rate": round(tier["hits"] / tier["attempts"], 3) if tier["attempts"] else 0.0,
+                    "latency_ms": round(tier["seconds"] * 1000, 3),
+                }
+                for name, tier in self.tiers.items()
+            },
+            "external_calls": dict(self.external_calls),
+        }
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """
+        Logs the totals as embedded metric format documents (one per tier,
+        one per external service and one overall) and resets them. Returns
+        the documents; nothing is logged if there was nothing to record.
+        """
+        with self._lock:
+            if not (self.resolutions or self.tiers or self.external_calls):
+                return []
+            snapshot = self._totals()
+            self._reset()
+
+        timestamp = int(time.time() * 1000)
+
+        def document(dimension: Optional[str], values: Dict[str, Any], units: Dict[str, str]) -> Dict[str, Any]:
+            return {
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [{
+                        "Namespace": RESOLUTION_METRICS_NAMESPACE,
+                        "Dimensions": [[dimension]] if dimension else [[]],
+                        "Metrics": [{"Name": name, "Unit": unit} for name, unit in units.items()],
+                    }],
+                },
+                **values,
+            }
+
+        documents = [document(None, {"Resolutions": snapshot["resolutions"],
+                                     "ResolutionLatencyMs": snapshot["latency_ms"],
+                                     "Methods": snapshot["methods"]},
+                              {"Resolutions": "Count", "ResolutionLatencyMs": "Milliseconds"})]
+        for name, tier in snapshot["tiers"].items():
+            documents.append(document("Tier", {"Tier": name, "Attempts": tier["attempts"], "Hits": tier["hits"],
+                                               "LatencyMs": tier["latency_ms"]},
+                                      {"Attempts": "Count", "Hits": "Count", "LatencyMs": "Milliseconds"}))
+        for service, count in snapshot["external_calls"].items():
+            documents.append(document("Service", {"Service": service, "Calls": count}, {"Calls": "Count"}))
+        for doc in documents:
+            metrics_logger.info(json.dumps(doc))
+        return documents
+
+
+# Per invocation; flushed by the handlers
+RESOLUTION_METRICS = ResolutionMetrics()
+
+
 # In-memory cache for fuzzy matching (persists across warm Lambda invocations)
 CANONICAL_NAMES_CACHE = None
 NORMALIZED_NAMES_CACHE = None
+FUZZY_INDEX = None
+VENDOR_DIRECTORY = None
 CACHE_EXPIRY = None
+# Held while the structures above are replaced or appended to
+_NAMES_CACHE_LOCK = threading.RLock()
+# Newest vendors.updated_at in the cache, and when the next full reload is due
+CACHE_HIGH_WATER = None
+CACHE_FULL_EXPIRY = None
+CACHE_DELTA_INTERVAL = timedelta(minutes=5)
+CACHE_DELTA_OVERLAP = timedelta(minutes=5)
+CACHE_FULL_RELOAD_INTERVAL = timedelta(hours=6)
 
 # -----------------------------------------------------------------------------
 # Database Utilities
@@ -104,35 +437,348 @@ def get_db_connection() -> psycopg2.extensions.connection:
     )
 
 
+class ConnectionPool:
+    """
+    Up to size connections from get_db_connection, opened on first use and
+    lent to one thread at a time. Closed or broken connections are dropped
+    instead of being handed out again. Connections are in autocommit mode;
+    batch writes open their own transactions (see transaction).
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle: List[psycopg2.extensions.connection] = []
+        self._opened: List[psycopg2.extensions.connection] = []
+        # Slots taken by connections being opened outside the lock
+        self._opening = 0
+        # Signalled whenever a connection is returned or dropped, so a thread
+        # waiting for one can take it or open a replacement in the freed slot
+        self._available = threading.Condition()
+
+    @contextmanager
+    def connection(self) -> Iterator[psycopg2.extensions.connection]:
+        conn = None
+        with self._available:
+            while not self._idle and len(self._opened) + self._opening >= self.size:
+                self._available.wait()
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                self._opening += 1
+        if conn is None:
+            try:
+                conn = get_db_connection()
+                conn.autocommit = True
+            except BaseException:
+                with self._available:
+                    self._opening -= 1
+                    self._available.notify()
+                raise
+            with self._available:
+                self._opening -= 1
+                self._opened.append(conn)
+        try:
+            yield conn
+        finally:
+            with self._available:
+                if conn.closed:
+                    if conn in self._opened:
+                        self._opened.remove(conn)
+                else:
+                    self._idle.append(conn)
+                self._available.notify()
+
+    def close_all(self) -> None:
+        with self._available:
+            opened, self._opened, self._idle = self._opened, [], []
+        for conn in opened:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.warning(f"Failed to close pooled connection: {e}")
+
+
+@contextmanager
+def transaction(conn: psycopg2.extensions.connection) -> Iterator[None]:
+    """
+    Runs the block as one transaction on an autocommit connection, committing
+    once at the end or rolling back if it raises. On a connection that is not
+    in autocommit mode the caller owns the transaction, so this does nothing.
+
+    Resolver connections stay in autocommit outside these blocks: vendors and
+    agencies created during resolution are cached (in process and in
+    DynamoDB) as soon as they exist, so they must not be rolled back.
+    """
+    if not conn.autocommit:
+        yield
+        return
+    conn.autocommit = False
+    try:
+        yield
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        if not conn.closed:
+            conn.autocommit = True
+
+
+@contextmanager
+def savepoint(cur: Any) -> Iterator[None]:
+    """
+    Lets one record's statements fail without aborting the transaction around
+    them: rolls back to a savepoint taken on entry, then re-raises. In
+    autocommit mode a failed statement aborts nothing, so none is taken.
+    """
+    if cur.connection.autocommit:
+        yield
+        return
+    cur.execute("SAVEPOINT record")
+    try:
+        yield
+    except Exception:
+        cur.execute("ROLLBACK TO SAVEPOINT record")
+        raise
+    cur.execute("RELEASE SAVEPOINT record")
+
+
+def load_vendor_name_artifact() -> Optional[VendorNameArtifact]:
+    """
+    Opens the prebuilt vendor name index, downloading it first when
+    VENDOR_INDEX_S3_URI is set. Returns None (full table load) if there is
+    none or it cannot be read.
+    """
+    if not VENDOR_INDEX_S3_URI and not os.path.exists(VENDOR_INDEX_PATH):
+        return None
+    try:
+        if VENDOR_INDEX_S3_URI:
+            bucket, _, key = VENDOR_INDEX_S3_URI.removeprefix("s3://").partition("/")
+            # download_file writes a temp file and renames it, so an older
+            # mapping of the same path stays valid
+            boto3.client("s3").download_file(bucket, key, VENDOR_INDEX_PATH)
+        return VendorNameArtifact(VENDOR_INDEX_PATH)
+    except Exception as e:
+        logger.warning(f"Vendor name artifact unavailable, loading from RDS: {e}")
+        return None
+
+
 def refresh_canonical_names_cache(conn: psycopg2.extensions.connection) -> Tuple[Optional[List[str]], Optional[Dict[str, str]]]:
-    """Fetches all canonical names from the database for fuzzy matching."""
-    global CANONICAL_NAMES_CACHE, NORMALIZED_NAMES_CACHE, CACHE_EXPIRY
+    """
+    Keeps the canonical names (and their normalized map, Tier 5 index and
+    vendor directory) current.
+
+    Loads the whole vendors table on first use and every
+    CACHE_FULL_RELOAD_INTERVAL. In between, every CACHE_DELTA_INTERVAL it pulls
+    only vendors changed since the newest updated_at seen (inserts set it
+    too), so refresh cost follows churn rather than table size. Renamed or
+    deleted vendors keep their old name until the next full reload.
+
+    When a prebuilt artifact is available (VENDOR_INDEX_S3_URI or
+    VENDOR_INDEX_PATH), a full reload maps it instead of reading the table,
+    then applies only the delta since it was built.
+    """
+    global CANONICAL_NAMES_CACHE, NORMALIZED_NAMES_CACHE, FUZZY_INDEX, VENDOR_DIRECTORY, CACHE_EXPIRY, CACHE_FULL_EXPIRY, CACHE_HIGH_WATER
 
-    # Refresh cache every 15 minutes
-    if CANONICAL_NAMES_CACHE is not None and CACHE_EXPIRY > datetime.now():
+    now = datetime.now()
+    if CANONICAL_NAMES_CACHE is not None and CACHE_EXPIRY > now:
         return CANONICAL_NAMES_CACHE, NORMALIZED_NAMES_CACHE
 
-    logger.info("Refreshing canonical names cache...")
-    with conn.cursor() as cur:
-        cur.execute("SELECT canonical_name FROM vendors")
-        CANONICAL_NAMES_CACHE = [row[0] for row in cur.fetchall()]
+    with _NAMES_CACHE_LOCK:
+        if CANONICAL_NAMES_CACHE is not None and CACHE_EXPIRY > now:
+            # Another thread refreshed while this one waited
+            return CANONICAL_NAMES_CACHE, NORMALIZED_NAMES_CACHE
+
+        full_reload = CANONICAL_NAMES_CACHE is None or CACHE_HIGH_WATER is None or CACHE_FULL_EXPIRY <= now
+        artifact = load_vendor_name_artifact() if full_reload else None
+        if artifact is not None and artifact.high_water is not None:
+            # Start from the prebuilt index and catch up with the delta below
+            logger.info(f"Loaded vendor name artifact ({len(artifact.names)} names, built {artifact.meta['built_at']})")
+            CANONICAL_NAMES_CACHE = artifact.names
+            NORMALIZED_NAMES_CACHE = artifact.normalized
+            FUZZY_INDEX = artifact.index
+            VENDOR_DIRECTORY = artifact.directory
+            CACHE_HIGH_WATER = artifact.high_water
+            CACHE_FULL_EXPIRY = now + CACHE_FULL_RELOAD_INTERVAL
+            full_reload = False
+
+        if full_reload:
+            logger.info("Refreshing canonical names cache...")
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, canonical_name, duns, uei, updated_at FROM vendors")
+                rows = cur.fetchall()
+            CANONICAL_NAMES_CACHE = [row[1] for row in rows]
+            CACHE_HIGH_WATER = max((row[4] for row in rows if row[4]), default=None)
+
+            NORMALIZED_NAMES_CACHE = {}
+            for name, norm_name in zip(CANONICAL_NAMES_CACHE, normalize_vendor_names(CANONICAL_NAMES_CACHE)):
+                if norm_name and norm_name not in NORMALIZED_NAMES_CACHE:
+                    NORMALIZED_NAMES_CACHE[norm_name] = name
+
+            VENDOR_DIRECTORY = VendorDirectory()
+            for vendor_id, name, duns, uei, _ in rows:
+                VENDOR_DIRECTORY.add(vendor_id, name, duns, uei)
+
+            FUZZY_INDEX = NameBlockingIndex(CANONICAL_NAMES_CACHE)
+            CACHE_FULL_EXPIRY = now + CACHE_FULL_RELOAD_INTERVAL
+        else:
+            # Re-read a short overlap: updated_at is the writer's transaction
+            # start, so a slow transaction can commit rows older than the mark
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT id, canonical_name, duns, uei, updated_at FROM vendors WHERE updated_at > %s",
+                    (CACHE_HIGH_WATER - CACHE_DELTA_OVERLAP,)
+                )
+                rows = cur.fetchall()
+            added = 0
+            for vendor_id, name, duns, uei, _ in rows:
+                added += _cache_vendor(vendor_id, name, duns, uei)
+            CACHE_HIGH_WATER = max([CACHE_HIGH_WATER] + [row[4] for row in rows if row[4]])
+            logger.info(
+                f"Canonical names delta: {len(rows)} changed, {added} new")
+
+        CACHE_EXPIRY = now + CACHE_DELTA_INTERVAL
+        return CANONICAL_NAMES_CACHE, NORMALIZED_NAMES_CACHE
 
-        NORMALIZED_NAMES_CACHE = {}
-        for name in CANONICAL_NAMES_CACHE:
-            norm_name = normalize_vendor_name(name)
-            if norm_name and norm_name not in NORMALIZED_NAMES_CACHE:
-                NORMALIZED_NAMES_CACHE[norm_name] = name
 
-        CACHE_EXPIRY = datetime.now() + timedelta(minutes=15)
+def _cache_vendor(vendor_id: Any, canonical_name: str, duns: Optional[str], uei: Optional[str]) -> bool:
+    """Adds one vendor to the loaded cache structures; True if its name was new."""
+    if isinstance(CANONICAL_NAMES_CACHE, MappedNames):
+        known = canonical_name in CANONICAL_NAMES_CACHE
+    else:
+        known = canonical_name in VENDOR_DIRECTORY
+    VENDOR_DIRECTORY.add(vendor_id, canonical_name, duns, uei)
+    if known:
+        return False
+    start = len(CANONICAL_NAMES_CACHE)
+    CANONICAL_NAMES_CACHE.extend([canonical_name])
+    norm_name = normalize_vendor_name(canonical_name)
+    if norm_name and norm_name not in NORMALIZED_NAMES_CACHE:
+        NORMALIZED_NAMES_CACHE[norm_name] = canonical_name
+    FUZZY_INDEX.add([canonical_name], start=start)
+    return True
+
+
+def register_vendor(vendor_id: Any, canonical_name: str, duns: Optional[str] = None, uei: Optional[str] = None) -> None:
+    """
+    Records a vendor this process just inserted or updated, so its own
+    later lookups find it in memory before the next delta refresh.
+    """
+    with _NAMES_CACHE_LOCK:
+        if vendor_id and CANONICAL_NAMES_CACHE is not None and VENDOR_DIRECTORY is not None:
+            _cache_vendor(vendor_id, canonical_name, duns, uei)
+
 
-    return CANONICAL_NAMES_CACHE, NORMALIZED_NAMES_CACHE
+def get_vendor_directory(conn: psycopg2.extensions.connection) -> Optional[VendorDirectory]:
+    refresh_canonical_names_cache(conn)
+    return VENDOR_DIRECTORY
 
 # -----------------------------------------------------------------------------
 # Entity Resolution Logic (4-Tier)
 # -----------------------------------------------------------------------------
 
 
-def get_sam_entity(uei: Optional[str] = None, vendor_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+def get_sam_entity(uei: Optional[str] = None, vendor_name: Optional[str] = None, duns: Optional[str] = None, conn: Optional[psycopg2.extensions.connection] = None) -> Optional[Dict[str, Any]]:
+    """
+    Tier 4 lookup. Uses the local SAM extract (sam_entities) when one has
+    been loaded, so there is no per-record network call; the SAM.gov API is
+    only the fallback for deployments without an extract (or no conn).
+    """
+    if conn is not None and sam_index_loaded(conn):
+        return lookup_sam_entity(conn, uei=uei, duns=duns, vendor_name=vendor_name)
+    return fetch_sam_entity(uei=uei, vendor_name=vendor_name)
+
+
+def sam_index_loaded(conn: psycopg2.extensions.connection) -> bool:
+    """Whether any SAM extract has been loaded; rechecked every CACHE_DELTA_INTERVAL."""
+    global SAM_INDEX_LOADED, SAM_INDEX_EXPIRY
+    now = datetime.now()
+    if SAM_INDEX_LOADED is None or SAM_INDEX_EXPIRY <= now:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT EXISTS (SELECT 1 FROM sam_extract_loads)")
+                SAM_INDEX_LOADED = bool(cur.fetchone()[0])
+        except Exception as e:
+            logger.warning(f"SAM extract status check failed: {e}")
+            SAM_INDEX_LOADED = False
+        SAM_INDEX_EXPIRY = now + CACHE_DELTA_INTERVAL
+    return SAM_INDEX_LOADED
+
+
+def lookup_sam_entity(conn: psycopg2.extensions.connection, uei: Optional[str] = None, duns: Optional[str] = None, vendor_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Finds an entity in the local SAM extract. As with the API, a UEI is
+    matched on its own; otherwise DUNS, then the normalized legal name.
+    """
+    if uei:
+        where, params = "uei = %s", (uei,)
+    else:
+        normalized = normalize_vendor_name(vendor_name) or None
+        if not (duns or normalized):
+            return None
+        where, params = "duns = %s OR normalized_name = %s", (duns, normalized)
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(
+            f"SELECT uei, duns, legal_business_name FROM sam_entities WHERE {where} "
+            "ORDER BY (duns IS NOT DISTINCT FROM %s) DESC, uei LIMIT 1",
+            params + (duns,)
+        )
+        row = cur.fetchone()
+    return _sam_entity(row) if row else None
+
+
+def lookup_sam_entities(conn: psycopg2.extensions.connection, keys: Iterable[VendorKey]) -> Dict[VendorKey, Optional[Dict[str, Any]]]:
+    """
+    lookup_sam_entity for many (vendor_name, duns, uei) keys with one query.
+    Each key gets the entity lookup_sam_entity would return for it, or None.
+    """
+    keys = list(dict.fromkeys(keys))
+    normalized = dict(zip(keys, normalize_vendor_names([key[0] for key in keys])))
+    ueis = list({key[2] for key in keys if key[2]})
+    duns_values = list({key[1] for key in keys if key[1] and not key[2]})
+    names = list({normalized[key] for key in keys if normalized[key] and not key[2]})
+    found: Dict[VendorKey, Optional[Dict[str, Any]]] = dict.fromkeys(keys)
+    if not (ueis or duns_values or names):
+        return found
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(
+            "SELECT uei, duns, legal_business_name, normalized_name FROM sam_entities "
+            "WHERE uei = ANY(%s) OR duns = ANY(%s) OR normalized_name = ANY(%s)",
+            (ueis, duns_values, names)
+        )
+        rows = cur.fetchall()
+    by_uei = {row['uei']: row for row in rows}
+    by_duns: Dict[str, List[Dict[str, Any]]] = {}
+    by_name: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        if row['duns']:
+            by_duns.setdefault(row['duns'], []).append(row)
+        if row['normalized_name']:
+            by_name.setdefault(row['normalized_name'], []).append(row)
+
+    for key in keys:
+        _, duns, uei = key
+        if uei:
+            row = by_uei.get(uei)
+        else:
+            # Same preference as lookup_sam_entity: a DUNS match first, then by UEI
+            candidates = by_duns.get(duns, []) + by_name.get(normalized[key], [])
+            row = min(candidates, key=lambda r: (r['duns'] != duns, r['uei']), default=None)
+        found[key] = _sam_entity(row) if row else None
+    return found
+
+
+def _sam_entity(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "canonical_name": row['legal_business_name'],
+        "uei": row['uei'],
+        "duns": row['duns'],
+        "confidence": 1.0
+    }
+
+
+def fetch_sam_entity(uei: Optional[str] = None, vendor_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
     Fetches entity data directly from SAM.gov API.
     """
@@ -152,6 +798,7 @@ def get_sam_entity(uei: Optional[str] = None, vendor_name: Optional[str] = None)
             params["entityName"] = vendor_name
 
         url = SAM_API_BASE_URL
+        RESOLUTION_METRICS.external_call("sam_api")
         response = requests.get(url, params=params, timeout=10)
 
         if response.status_code == 200:
@@ -175,150 +822,212 @@ def resolve_vendor(vendor_name: Optional[str], duns: Optional[str] = None, uei:
     """
     6-Tier Resolution Strategy:
     1. DynamoDB cache lookup (Fast-path for previously resolved messy names)
-    2. DUNS/UEI exact match (RDS)
-    3. Canonical name exact match (RDS)
-    4. SAM entity API match (External truth)
+    2. DUNS/UEI exact match (vendor directory, then RDS)
+    3. Canonical name exact match (vendor directory, then RDS)
+    4. SAM entity match (local extract; SAM.gov API if none loaded)
     5. Fuzzy matching (rapidfuzz)
     6. Bedrock LLM Fallback
+
+    The in-memory vendor directory answers most matches without a query;
+    RDS is only asked about vendors newer than its last refresh. Tier
+    attempts, hits and latency are recorded in RESOLUTION_METRICS.
     """
+    started = time.perf_counter()
+    result = _resolve_vendor(vendor_name, duns, uei, conn)
+    RESOLUTION_METRICS.resolved([result[2]], time.perf_counter() - started)
+    return result
 
-    # Tier 1: DynamoDB Cache
-    try:
-        cache_resp = get_cache_table().get_item(
-            Key={'vendor_name': vendor_name})
-        if 'Item' in cache_resp:
-            item = cache_resp['Item']
-            # Quick verification that the vendor still exists in RDS
-            vendor_id = item['vendor_id']
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(
-                    "SELECT id FROM vendors WHERE id = %s LIMIT 1", (vendor_id,))
-                if cur.fetchone():
+
+def _resolve_vendor(vendor_name: Optional[str], duns: Optional[str], uei: Optional[str], conn: Optional[psycopg2.extensions.connection]) -> VendorResolution:
+    directory = get_vendor_directory(conn)
+
+    # Tier 1: DynamoDB Cache (through the in-process layer)
+    with RESOLUTION_METRICS.tier("cache"):
+        try:
+            item = RESOLUTION_CACHE.get(vendor_name)
+            if item:
+                vendor_id = item['vendor_id']
+                if directory is not None and directory.id_for_name(item.get('canonical_name')) == str(vendor_id):
                     logger.info(f"RESOLVE: Cache Hit for {vendor_name}")
                     return vendor_id, item['canonical_name'], "CACHE_MATCH", float(item.get('confidence', 0.9))
-    except Exception as e:
-        logger.warning(f"DynamoDB cache lookup failed: {e}")
+                # Quick verification that the vendor still exists in RDS
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    cur.execute(
+                        "SELECT id FROM vendors WHERE id = %s LIMIT 1", (vendor_id,))
+                    if cur.fetchone():
+                        logger.info(f"RESOLVE: Cache Hit for {vendor_name}")
+                        return vendor_id, item['canonical_name'], "CACHE_MATCH", float(item.get('confidence', 0.9))
+        except Exception as e:
+            logger.warning(f"DynamoDB cache lookup failed: {e}")
 
     # Tier 2: DUNS/UEI exact match
     if duns or uei:
+        with RESOLUTION_METRICS.tier("id"):
+            match = directory.find_identifier(duns, uei) if directory is not None else None
+            if match:
+                logger.info(f"RESOLVE: ID Match for {vendor_name}")
+                return match[0], match[1], "DUNS_UEI_MATCH", 1.0
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(
+                    "SELECT id, canonical_name FROM vendors WHERE duns = %s OR uei = %s LIMIT 1",
+                    (duns, uei)
+                )
+                result = cur.fetchone()
+                if result:
+                    logger.info(f"RESOLVE: ID Match for {vendor_name}")
+                    return result['id'], result['canonical_name'], "DUNS_UEI_MATCH", 1.0
+
+    # Tier 3: Canonical name exact match
+    with RESOLUTION_METRICS.tier("exact_name"):
+        vendor_id = directory.id_for_name(vendor_name) if directory is not None else None
+        if vendor_id:
+            logger.info(f"RESOLVE: Exact Name Match for {vendor_name}")
+            return vendor_id, vendor_name, "EXACT_NAME_MATCH", 1.0
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute(
-                "SELECT id, canonical_name FROM vendors WHERE duns = %s OR uei = %s LIMIT 1",
-                (duns, uei)
+                "SELECT id, canonical_name FROM vendors WHERE canonical_name = %s LIMIT 1",
+                (vendor_name,)
             )
             result = cur.fetchone()
             if result:
-                logger.info(f"RESOLVE: ID Match for {vendor_name}")
-                return result['id'], result['canonical_name'], "DUNS_UEI_MATCH", 1.0
+                logger.info(f"RESOLVE: Exact Name Match for {vendor_name}")
+                return result['id'], result['canonical_name'], "EXACT_NAME_MATCH", 1.0
 
-    # Tier 3: Canonical name exact match
+    return _resolve_vendor_fallback(vendor_name, duns, uei, conn)
+
+
+def _lookup_vendor_id(canonical_name: Optional[str], conn: psycopg2.extensions.connection) -> Optional[str]:
+    """A canonical name's vendor id from the vendor directory, or from RDS if the directory lacks it."""
+    vendor_id = VENDOR_DIRECTORY.id_for_name(canonical_name) if VENDOR_DIRECTORY is not None else None
+    if vendor_id:
+        return vendor_id
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute(
-            "SELECT id, canonical_name FROM vendors WHERE canonical_name = %s LIMIT 1",
-            (vendor_name,)
+            "SELECT id FROM vendors WHERE canonical_name = %s LIMIT 1",
+            (canonical_name,)
         )
-        result = cur.fetchone()
-        if result:
-            logger.info(f"RESOLVE: Exact Name Match for {vendor_name}")
-            return result['id'], result['canonical_name'], "EXACT_NAME_MATCH", 1.0
+        res = cur.fetchone()
+    return res['id'] if res else None
+
+
+def _resolve_vendor_fallback(vendor_name: Optional[str], duns: Optional[str], uei: Optional[str], conn: psycopg2.extensions.connection) -> VendorResolution:
+    """Tiers 4-6 of resolve_vendor, for a name the cache, ID and exact-name tiers missed."""
+    result = _resolve_vendor_local(vendor_name, duns, uei, conn)
+    if result:
+        return result
+    if not vendor_name:
+        # Nothing to standardize, and a vendor needs a canonical name
+        logger.warning(f"RESOLVE: No name to resolve (DUNS {duns}, UEI {uei})")
+        return None, None, "LLM_RESOLUTION_FAILED", 0.0
+    logger.info(f"RESOLVE: LLM Fallback for {vendor_name}")
+    with RESOLUTION_METRICS.tier("llm"):
+        return _create_llm_vendor(vendor_name, duns, uei, call_bedrock_standardization_with_retry(vendor_name), conn)
 
-    # Tier 4: SAM entity API match
-    sam_result = get_sam_entity(uei=uei, vendor_name=vendor_name)
-    if sam_result:
-        canonical_name = sam_result['canonical_name']
-        sam_uei = sam_result['uei']
-        sam_duns = sam_result['duns']
 
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                "SELECT id FROM vendors WHERE uei = %s OR canonical_name = %s LIMIT 1",
-                (sam_uei, canonical_name)
-            )
-            result = cur.fetchone()
+def _resolve_vendor_local(vendor_name: Optional[str], duns: Optional[str], uei: Optional[str], conn: psycopg2.extensions.connection, sam_entities: Optional[Dict[VendorKey, Optional[Dict[str, Any]]]] = None) -> Optional[VendorResolution]:
+    """
+    Tiers 4-5 of resolve_vendor (SAM, normalized and fuzzy matching); None if
+    the name needs the LLM. sam_entities holds SAM lookups already made for
+    a batch (lookup_sam_entities) and replaces the per-key lookup.
+    """
+    # Tier 4: SAM entity match (local extract, API fallback)
+    with RESOLUTION_METRICS.tier("sam"):
+        if sam_entities is not None:
+            sam_result = sam_entities.get((vendor_name, duns, uei))
+        else:
+            sam_result = get_sam_entity(uei=uei, vendor_name=vendor_name, duns=duns, conn=conn)
+        if sam_result:
+            canonical_name = sam_result['canonical_name']
+            sam_uei = sam_result['uei']
+            sam_duns = sam_result['duns']
+
+            directory = VENDOR_DIRECTORY
+            if directory is not None:
+                match = directory.find_identifier(uei=sam_uei)
+                vendor_id = match[0] if match else directory.id_for_name(canonical_name)
+                if vendor_id:
+                    logger.info(f"RESOLVE: SAM Match (Existing) for {vendor_name}")
+                    return vendor_id, canonical_name, "SAM_API_MATCH", 1.0
 
-            if result:
-                logger.info(f"RESOLVE: SAM Match (Existing) for {vendor_name}")
-                return result['id'], canonical_name, "SAM_API_MATCH", 1.0
-            else:
-                # Create new vendor from SAM data
-                vendor_id = str(uuid.uuid4())
-                with conn.cursor(cursor_factory=RealDictCursor) as insert_cur:
-                    insert_cur.execute(
-                        """
-                        INSERT INTO vendors (id, canonical_name, duns, uei, resolved_by_llm, resolution_confidence)
-                        VALUES (%s, %s, %s, %s, FALSE, 1.0)
-                        ON CONFLICT (canonical_name) DO UPDATE SET 
-                            uei = EXCLUDED.uei,
-                            duns = EXCLUDED.duns,
-                            updated_at = NOW()
-                        RETURNING id
-                        """,
-                        (vendor_id, canonical_name, sam_duns, sam_uei)
-                    )
-                    res = insert_cur.fetchone()
-                    if res:
-                        vendor_id = res['id']
-                logger.info(f"RESOLVE: SAM Match (New) for {vendor_name}")
-                return vendor_id, canonical_name, "SAM_API_MATCH", 1.0
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(
+                    "SELECT id FROM vendors WHERE uei = %s OR canonical_name = %s LIMIT 1",
+                    (sam_uei, canonical_name)
+                )
+                result = cur.fetchone()
 
-    # Tier 4.5: Normalized Exact Match
-    canonical_names, normalized_names_cache = refresh_canonical_names_cache(
-        conn)
+                if result:
+                    logger.info(f"RESOLVE: SAM Match (Existing) for {vendor_name}")
+                    return result['id'], canonical_name, "SAM_API_MATCH", 1.0
+                else:
+                    # Create new vendor from SAM data
+                    vendor_id = str(uuid.uuid4())
+                    with conn.cursor(cursor_factory=RealDictCursor) as insert_cur:
+                        insert_cur.execute(
+                            """
+                            INSERT INTO vendors (id, canonical_name, duns, uei, resolved_by_llm, resolution_confidence)
+                            VALUES (%s, %s, %s, %s, FALSE, 1.0)
+                            ON CONFLICT (canonical_name) DO UPDATE SET 
+                                uei = EXCLUDED.uei,
+                                duns = EXCLUDED.duns,
+                                updated_at = NOW()
+                            RETURNING id
+                            """,
+                            (vendor_id, canonical_name, sam_duns, sam_uei)
+                        )
+                        res = insert_cur.fetchone()
+                        if res:
+                            vendor_id = res['id']
+                    register_vendor(vendor_id, canonical_name, sam_duns, sam_uei)
+                    logger.info(f"RESOLVE: SAM Match (New) for {vendor_name}")
+                    return vendor_id, canonical_name, "SAM_API_MATCH", 1.0
 
-    normalized_incoming = normalize_vendor_name(vendor_name)
-    if normalized_incoming and normalized_incoming in normalized_names_cache:
-        matched_name = normalized_names_cache[normalized_incoming]
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                "SELECT id FROM vendors WHERE canonical_name = %s LIMIT 1",
-                (matched_name,)
-            )
-            res = cur.fetchone()
-            if res:
+    # Tier 4.5: Normalized Exact Match
+    with RESOLUTION_METRICS.tier("normalized"):
+        canonical_names, normalized_names_cache = refresh_canonical_names_cache(
+            conn)
+
+        normalized_incoming = normalize_vendor_name(vendor_name)
+        if normalized_incoming and normalized_incoming in normalized_names_cache:
+            matched_name = normalized_names_cache[normalized_incoming]
+            vendor_id = _lookup_vendor_id(matched_name, conn)
+            if vendor_id:
                 logger.info(f"RESOLVE: Normalized Exact Match for {
                             vendor_name} -> {matched_name}")
-                return res['id'], matched_name, "NORMALIZED_EXACT_MATCH", 1.0
+                return vendor_id, matched_name, "NORMALIZED_EXACT_MATCH", 1.0
 
     # Tier 5: Fuzzy Matching
-    logger.info(f"RESOLVE: Fuzzy Tier - {len(canonical_names)
-                if canonical_names else 0} names in cache")
-    if canonical_names:
-        match = process.extractOne(
-            vendor_name, canonical_names, scorer=fuzz.WRatio)
-        logger.info(f"RESOLVE: Fuzzy match result for {vendor_name}: {match}")
-        if match and match[1] >= 90:  # High threshold for automatic fuzzy matching
-            matched_name = match[0]
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(
-                    "SELECT id FROM vendors WHERE canonical_name = %s LIMIT 1",
-                    (matched_name,)
-                )
-                res = cur.fetchone()
-                if res:
-                    vendor_id = res['id']
+    with RESOLUTION_METRICS.tier("fuzzy"):
+        logger.info(f"RESOLVE: Fuzzy Tier - {len(canonical_names)
+                    if canonical_names else 0} names in cache")
+        if canonical_names:
+            if FUZZY_INDEX is not None and FUZZY_INDEX.names is canonical_names:
+                # Scores only the names that share trigrams with vendor_name
+                match = FUZZY_INDEX.extract_one(vendor_name, scorer=fuzz.WRatio)
+            else:
+                match = process.extractOne(
+                    vendor_name, canonical_names, scorer=fuzz.WRatio)
+            logger.info(f"RESOLVE: Fuzzy match result for {vendor_name}: {match}")
+            if match and match[1] >= 90:  # High threshold for automatic fuzzy matching
+                matched_name = match[0]
+                vendor_id = _lookup_vendor_id(matched_name, conn)
+                if vendor_id:
                     # Store in cache for next time
                     update_cache(vendor_name, matched_name,
                                  vendor_id, float(match[1])/100.0)
                     logger.info(f"RESOLVE: Fuzzy Match Hit for {vendor_name}")
                     return vendor_id, matched_name, "FUZZY_MATCH", float(match[1])/100.0
 
-    # Tier 6: Bedrock LLM Fallback
-    logger.info(f"RESOLVE: LLM Fallback for {vendor_name}")
-    canonical_name = call_bedrock_standardization_with_retry(vendor_name)
+    return None
 
-    # After LLM, check if the NEW canonical name exists in DB
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            "SELECT id, canonical_name FROM vendors WHERE canonical_name = %s LIMIT 1",
-            (canonical_name,)
-        )
-        result = cur.fetchone()
 
-        if result:
-            vendor_id = result['id']
-        else:
+def _create_llm_vendor(vendor_name: Optional[str], duns: Optional[str], uei: Optional[str], canonical_name: str, conn: psycopg2.extensions.connection) -> VendorResolution:
+    """Tier 6 of resolve_vendor, given the LLM's canonical name: finds or creates that vendor."""
+    # After LLM, check if the NEW canonical name exists in DB
+    vendor_id = _lookup_vendor_id(canonical_name, conn)
+    if not vendor_id:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
             # Create new vendor if not found
-            vendor_id = None
             try:
                 new_vendor_id = str(uuid.uuid4())
                 with conn.cursor(cursor_factory=RealDictCursor) as insert_cur:
@@ -335,6 +1044,8 @@ def resolve_vendor(vendor_name: Optional[str], duns: Optional[str] = None, uei:
                     res = insert_cur.fetchone()
                     if res:
                         vendor_id = res['id']
+                        # Name only: on conflict the existing row keeps its own DUNS/UEI
+                        register_vendor(vendor_id, canonical_name)
             except Exception as e:
                 logger.error(f"Failed to create vendor {canonical_name}: {e}")
                 # Fallback to lookup one more time in case of race condition or other constraint failure
@@ -357,18 +1068,199 @@ def resolve_vendor(vendor_name: Optional[str], duns: Optional[str] = None, uei:
     return vendor_id, canonical_name, "LLM_RESOLUTION", 0.95
 
 
+class VendorResolutionMemo:
+    """
+    Vendor resolutions made during one invocation, keyed by (name, DUNS, UEI).
+
+    The scraper groups records by vendor before packing them into messages,
+    so a batch usually repeats a few vendors many times; each is resolved
+    once and the rest are served from here. Failed resolutions are not kept.
+    prefetch() resolves a whole batch's keys up front with resolve_vendors_batch.
+    """
+
+    def __init__(self):
+        self._resolved: Dict[VendorKey, VendorResolution] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+
+    def prefetch(self, keys: Iterable[VendorKey], conn: psycopg2.extensions.connection) -> None:
+        """Resolves every key not already known with one resolve_vendors_batch call."""
+        missing = [key for key in dict.fromkeys(keys) if key not in self._resolved]
+        for key, result in resolve_vendors_batch(missing, conn).items():
+            if result[0]:
+                self._resolved[key] = result
+                self.prefetched += 1
+
+    def resolve(self, vendor_name: Optional[str], duns: Optional[str] = None, uei: Optional[str] = None, conn: Optional[psycopg2.extensions.connection] = None) -> VendorResolution:
+        key = (vendor_name, duns, uei)
+        with self._lock:
+            if key in self._resolved:
+                self.hits += 1
+                return self._resolved[key]
+            self.misses += 1
+        result = resolve_vendor(vendor_name, duns, uei, conn)
+        if result[0]:
+            with self._lock:
+                self._resolved[key] = result
+        return result
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "vendors": len(self._resolved),
+            "prefetched": self.prefetched,
+        }
+
+
+def resolve_vendors_batch(keys: Iterable[VendorKey], conn: psycopg2.extensions.connection) -> Dict[VendorKey, VendorResolution]:
+    """
+    Resolves many (vendor_name, duns, uei) keys with the tiers of resolve_vendor.
+
+    Keys are deduplicated, and the cache verification, DUNS/UEI and exact
+    name tiers are answered from the vendor directory where possible, then
+    run one query for every key still unresolved, instead of one query per
+    record. The local SAM extract is searched for every remaining key in
+    one query; then each key goes through tiers 4-5 on its own, and the
+    names that still need the LLM share batched Bedrock calls.
+    Returns a result for every distinct key.
+    """
+    pending = list(dict.fromkeys(keys))
+    resolved: Dict[VendorKey, VendorResolution] = {}
+    if not pending:
+        return resolved
+    started = time.perf_counter()
+    directory = get_vendor_directory(conn) or VendorDirectory()
+
+    # Tier 1: DynamoDB Cache, read in one batch and verified against RDS in one query
+    with RESOLUTION_METRICS.tier("cache", attempts=len(pending)):
+        try:
+            cached = RESOLUTION_CACHE.get_many(key[0] for key in pending)
+        except Exception as e:
+            logger.warning(f"DynamoDB cache lookup failed: {e}")
+            cached = {}
+        if cached:
+            existing = {str(item['vendor_id']) for item in cached.values()
+                        if directory.id_for_name(item.get('canonical_name')) == str(item['vendor_id'])}
+            unverified = list({str(item['vendor_id']) for item in cached.values()} - existing)
+            if unverified:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    cur.execute(
+                        "SELECT id FROM vendors WHERE id = ANY(%s::uuid[])",
+                        (unverified,)
+                    )
+                    existing.update(str(row['id']) for row in cur.fetchall())
+            for key in pending:
+                item = cached.get(key[0])
+                if item and str(item['vendor_id']) in existing:
+                    logger.info(f"RESOLVE: Cache Hit for {key[0]}")
+                    resolved[key] = (item['vendor_id'], item['canonical_name'],
+                                     "CACHE_MATCH", float(item.get('confidence', 0.9)))
+            pending = [key for key in pending if key not in resolved]
+
+    # Tier 2: DUNS/UEI exact match
+    with RESOLUTION_METRICS.tier("id", attempts=sum(1 for key in pending if key[1] or key[2])):
+        for key in pending:
+            match = directory.find_identifier(key[1], key[2]) if key[1] or key[2] else None
+            if match:
+                logger.info(f"RESOLVE: ID Match for {key[0]}")
+                resolved[key] = (match[0], match[1], "DUNS_UEI_MATCH", 1.0)
+        pending = [key for key in pending if key not in resolved]
+        duns_values = list({key[1] for key in pending if key[1]})
+        uei_values = list({key[2] for key in pending if key[2]})
+        if duns_values or uei_values:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(
+                    "SELECT id, canonical_name, duns, uei FROM vendors WHERE duns = ANY(%s) OR uei = ANY(%s)",
+                    (duns_values, uei_values)
+                )
+                rows = cur.fetchall()
+            by_duns = {row['duns']: row for row in rows if row['duns']}
+            by_uei = {row['uei']: row for row in rows if row['uei']}
+            for key in pending:
+                row = by_duns.get(key[1]) if key[1] else None
+                row = row or (by_uei.get(key[2]) if key[2] else None)
+                if row:
+                    logger.info(f"RESOLVE: ID Match for {key[0]}")
+                    resolved[key] = (row['id'], row['canonical_name'], "DUNS_UEI_MATCH", 1.0)
+            pending = [key for key in pending if key not in resolved]
+
+    # Tier 3: Canonical name exact match
+    with RESOLUTION_METRICS.tier("exact_name", attempts=len(pending)):
+        for key in pending:
+            vendor_id = directory.id_for_name(key[0])
+            if vendor_id:
+                logger.info(f"RESOLVE: Exact Name Match for {key[0]}")
+                resolved[key] = (vendor_id, key[0], "EXACT_NAME_MATCH", 1.0)
+        pending = [key for key in pending if key not in resolved]
+        names = list({key[0] for key in pending if key[0]})
+        if names:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(
+                    "SELECT id, canonical_name FROM vendors WHERE canonical_name = ANY(%s)",
+                    (names,)
+                )
+                by_name = {row['canonical_name']: row for row in cur.fetchall()}
+            for key in pending:
+                row = by_name.get(key[0])
+                if row:
+                    logger.info(f"RESOLVE: Exact Name Match for {key[0]}")
+                    resolved[key] = (row['id'], row['canonical_name'], "EXACT_NAME_MATCH", 1.0)
+            pending = [key for key in pending if key not in resolved]
+
+    # Tier 4 from the local SAM extract in one query; without an extract each
+    # key falls back to the SAM.gov API below
+    sam_entities = None
+    if pending and sam_index_loaded(conn):
+        with RESOLUTION_METRICS.tier("sam", attempts=0):
+            sam_entities = lookup_sam_entities(conn, pending)
+
+    # Tiers 4-5 (SAM, normalized, fuzzy) one key at a time
+    llm_keys = []
+    for key in pending:
+        result = _resolve_vendor_local(key[0], key[1], key[2], conn, sam_entities=sam_entities)
+        if result:
+            resolved[key] = result
+        elif not key[0]:
+            # As in _resolve_vendor_fallback: no name, no vendor to create
+            logger.warning(f"RESOLVE: No name to resolve (DUNS {key[1]}, UEI {key[2]})")
+            resolved[key] = (None, None, "LLM_RESOLUTION_FAILED", 0.0)
+        else:
+            llm_keys.append(key)
+
+    # Tier 6: every remaining name in batched Bedrock calls
+    if llm_keys:
+        for key in llm_keys:
+            logger.info(f"RESOLVE: LLM Fallback for {key[0]}")
+        with RESOLUTION_METRICS.tier("llm", attempts=len(llm_keys)):
+            standardized = call_bedrock_standardization_batch(key[0] for key in llm_keys)
+            for key in llm_keys:
+                resolved[key] = _create_llm_vendor(key[0], key[1], key[2], standardized.get(key[0], key[0]), conn)
+    RESOLUTION_METRICS.resolved([result[2] for result in resolved.values()], time.perf_counter() - started)
+    return resolved
+
+
 def update_cache(vendor_name: str, canonical_name: str, vendor_id: str, confidence: float) -> None:
-    """Updates the DynamoDB entity resolution cache."""
-    try:
-        get_cache_table().put_item(Item={
-            'vendor_name': vendor_name,
-            'canonical_name': canonical_name,
-            'vendor_id': vendor_id,
-            'confidence': str(confidence),
-            'ttl': int(time.time() + (90 * 24 * 60 * 60))  # 90 days
-        })
-    except Exception as e:
-        logger.warning(f"Failed to update DynamoDB cache: {e}")
+    """
+    Updates the entity resolution cache. The in-process entry changes now;
+    the DynamoDB write is queued until flush_cache_writes().
+    """
+    RESOLUTION_CACHE.put({
+        'vendor_name': vendor_name,
+        'canonical_name': canonical_name,
+        'vendor_id': vendor_id,
+        'confidence': str(confidence),
+        'ttl': int(time.time() + (90 * 24 * 60 * 60))  # 90 days
+    })
+
+
+def flush_cache_writes() -> None:
+    """Sends queued resolution cache writes to DynamoDB in batches."""
+    RESOLUTION_CACHE.flush()
 
 
 def _extract_canonical_name(raw: str, fallback: str) -> str:
@@ -407,13 +1299,19 @@ def call_bedrock_standardization_with_retry(messy_name: str, max_retries: int =
         ],
     })
 
+    raw = _invoke_bedrock(body, max_retries)
+    return _extract_canonical_name(raw.strip(), messy_name) if raw is not None else messy_name
+
+
+def _invoke_bedrock(body: str, max_retries: int) -> Optional[str]:
+    """The model's text response, retried with exponential backoff on throttling; None on failure."""
     for attempt in range(max_retries):
         try:
+            RESOLUTION_METRICS.external_call("bedrock")
             response = get_bedrock_client().invoke_model(
                 body=body, modelId=BEDROCK_MODEL_ID)
             response_body = json.loads(response.get("body").read())
-            raw = response_body["content"][0]["text"].strip()
-            return _extract_canonical_name(raw, messy_name)
+            return response_body["content"][0]["text"]
         except Exception as e:
             if "ThrottlingException" in str(e) or "Too many requests" in str(e):
                 # More aggressive backoff for Bedrock
@@ -424,77 +1322,418 @@ def call_bedrock_standardization_with_retry(messy_name: str, max_retries: int =
                 continue
             logger.error(f"Bedrock failed: {e}")
             break
+    return None
 
-    return messy_name
+
+def call_bedrock_standardization_batch(messy_names: Iterable[str], max_retries: int = 3) -> Dict[str, str]:
+    """
+    Standardizes many vendor names with one Bedrock call per
+    BEDROCK_BATCH_SIZE names instead of one call each.
+
+    Names go out as a numbered JSON object and must come back as a JSON
+    object with the same keys. A name the response leaves out, or a
+    response that does not parse, falls back to
+    call_bedrock_standardization_with_retry for just those names; if the
+    call itself fails the names are kept as they are, as in the single
+    call. Returns messy name -> canonical name for every distinct input.
+    """
+    names = list(dict.fromkeys(name for name in messy_names if name))
+    standardized: Dict[str, str] = {}
+    for start in range(0, len(names), BEDROCK_BATCH_SIZE):
+        chunk = names[start:start + BEDROCK_BATCH_SIZE]
+        numbered = {str(i): name for i, name in enumerate(chunk, 1)}
+        prompt = (
+            "Standardize each vendor name below to its canonical legal form. Expand abbreviations "
+            "(Corp -> Corporation, Univ -> University). Reply with ONLY a JSON object that maps "
+            "every key to the standardized name, with no explanation.\n\n"
+            f"Vendor names: {json.dumps(numbered)}"
+        )
+        body = json.dumps({
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 100 + 60 * len(chunk),
+            "messages": [
+                {"role": "user", "content": prompt},
+                # Prefill the opening brace so the reply is the JSON object itself
+                {"role": "assistant", "content": "{"},
+            ],
+        })
+        raw = _invoke_bedrock(body, max_retries)
+        if raw is None:
+            # Same outcome as a failed single call, without re-spending the throttling budget per name
+            standardized.update((name, name) for name in chunk)
+            continue
+        parsed = _parse_batch_response(raw)
+        for key, name in numbered.items():
+            value = parsed.get(key)
+            if isinstance(value, str) and value.strip():
+                standardized[name] = _extract_canonical_name(value, name)
+            else:
+                standardized[name] = call_bedrock_standardization_with_retry(name, max_retries)
+    return standardized
+
+
+def _parse_batch_response(raw: str) -> Dict[str, Any]:
+    text = raw.strip()
+    if not text.startswith("{"):
+        text = "{" + text
+    try:
+        parsed = json.loads(text[:text.rindex("}") + 1])
+    except ValueError:
+        logger.warning(f"Could not parse batched Bedrock response: {raw[:200]}")
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
 
 # -----------------------------------------------------------------------------
 # Main Handler
 # -----------------------------------------------------------------------------
 
 
-def resolve_agency(agency_name: Optional[str], agency_code: Optional[str], parent_agency_id: Optional[str] = None, conn: Optional[psycopg2.extensions.connection] = None) -> Optional[str]:
+class AgencyDirectory:
     """
-    Resolves an agency by code, creating it if it doesn't exist.
-    Supports parent/child relationships.
+    agency_code -> (id, parent_agency_id) for every known agency.
+
+    The agencies table holds a few hundred, nearly static rows, so the whole
+    table is kept in memory and refreshed every AGENCY_DIRECTORY_INTERVAL;
+    rows this process upserts are added as soon as they are written.
     """
-    if not agency_code:
-        return None
 
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            "SELECT id FROM agencies WHERE agency_code = %s LIMIT 1",
-            (agency_code,)
-        )
-        result = cur.fetchone()
-        if result:
-            return result['id']
+    def __init__(self, rows: Iterable[Tuple[str, Any, Any]] = ()):
+        self._agencies: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._lock = threading.Lock()
+        for agency_code, agency_id, parent_agency_id in rows:
+            self.add(agency_code, agency_id, parent_agency_id)
 
-        # Create new agency
-        agency_id = str(uuid.uuid4())
-        cur.execute(
+    def add(self, agency_code: str, agency_id: Any, parent_agency_id: Any = None) -> None:
+        with self._lock:
+            self._agencies[agency_code] = (
+                str(agency_id), str(parent_agency_id) if parent_agency_id else None)
+
+    def get(self, agency_code: str) -> Optional[Tuple[str, Optional[str]]]:
+        return self._agencies.get(agency_code)
+
+    def __len__(self) -> int:
+        return len(self._agencies)
+
+
+AGENCY_DIRECTORY = None
+AGENCY_DIRECTORY_EXPIRY = None
+AGENCY_DIRECTORY_INTERVAL = timedelta(minutes=15)
+_AGENCY_DIRECTORY_LOCK = threading.Lock()
+
+# (name field, code field, parent code field) of each agency on an award record
+AGENCY_FIELDS = [
+    ('Awarding Agency', 'Awarding Agency Code', None),
+    ('Awarding Sub Agency', 'Awarding Sub Agency Code', 'Awarding Agency Code'),
+    ('Funding Agency', 'Funding Agency Code', None),
+    ('Funding Sub Agency', 'Funding Sub Agency Code', 'Funding Agency Code'),
+]
+
+
+def get_agency_directory(conn: psycopg2.extensions.connection) -> AgencyDirectory:
+    global AGENCY_DIRECTORY, AGENCY_DIRECTORY_EXPIRY
+
+    now = datetime.now()
+    if AGENCY_DIRECTORY is not None and AGENCY_DIRECTORY_EXPIRY > now:
+        return AGENCY_DIRECTORY
+
+    with _AGENCY_DIRECTORY_LOCK:
+        if AGENCY_DIRECTORY is None or AGENCY_DIRECTORY_EXPIRY <= now:
+            with conn.cursor() as cur:
+                cur.execute("SELECT agency_code, id, parent_agency_id FROM agencies")
+                AGENCY_DIRECTORY = AgencyDirectory(cur.fetchall())
+            AGENCY_DIRECTORY_EXPIRY = now + AGENCY_DIRECTORY_INTERVAL
+            logger.info(f"Loaded agency directory ({len(AGENCY_DIRECTORY)} agencies)")
+        return AGENCY_DIRECTORY
+
+
+def _needs_write(known: Optional[Tuple[str, Optional[str]]], parent_agency_id: Optional[str]) -> bool:
+    """True for a new agency, or a known one whose missing parent is now known."""
+    if known is None:
+        return True
+    agency_id, known_parent = known
+    return known_parent is None and parent_agency_id is not None and parent_agency_id != agency_id
+
+
+def upsert_agencies(agencies: Iterable[Tuple[str, Optional[str], Optional[str]]], conn: psycopg2.extensions.connection) -> Dict[str, str]:
+    """
+    Writes (agency_code, agency_name, parent_agency_id) rows with one
+    INSERT ... ON CONFLICT and records them in the directory. An existing
+    parent is never replaced. Returns agency_code -> id.
+    """
+    rows = {}
+    for agency_code, agency_name, parent_agency_id in agencies:
+        # ON CONFLICT cannot touch a row twice; prefer the row that knows its parent
+        if agency_code not in rows or (parent_agency_id and not rows[agency_code][3]):
+            rows[agency_code] = (str(uuid.uuid4()), agency_code, agency_name or agency_code, parent_agency_id)
+    if not rows:
+        return {}
+
+    with conn.cursor() as cur:
+        written = execute_values(
+            cur,
             """
             INSERT INTO agencies (id, agency_code, agency_name, parent_agency_id, updated_at)
-            VALUES (%s, %s, %s, %s, NOW())
-            ON CONFLICT (agency_code) DO UPDATE SET 
+            VALUES %s
+            ON CONFLICT (agency_code) DO UPDATE SET
                 agency_name = EXCLUDED.agency_name,
                 parent_agency_id = COALESCE(agencies.parent_agency_id, EXCLUDED.parent_agency_id),
                 updated_at = NOW()
-            RETURNING id
+            RETURNING agency_code, id, parent_agency_id
             """,
-            (agency_id, agency_code, agency_name, parent_agency_id)
+            list(rows.values()),
+            template="(%s, %s, %s, %s, NOW())",
+            fetch=True
         )
-        res = cur.fetchone()
-        return res['id'] if res else agency_id
+
+    directory = get_agency_directory(conn)
+    for agency_code, agency_id, parent_agency_id in written:
+        directory.add(agency_code, agency_id, parent_agency_id)
+    return {agency_code: str(agency_id) for agency_code, agency_id, _ in written}
+
+
+def prefetch_agencies(contracts: Iterable[Dict[str, Any]], conn: psycopg2.extensions.connection) -> int:
+    """
+    Makes sure every agency the batch's records reference is in the
+    directory, so the resolve_agency calls that follow need no queries.
+    Parents go first, then sub agencies with their parent ids; usually that
+    is a single upsert, two when a new sub agency's parent is new as well.
+    Returns the number of agencies written.
+    """
+    directory = get_agency_directory(conn)
+    wanted: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+    for contract in contracts:
+        for name_field, code_field, parent_field in AGENCY_FIELDS:
+            agency_code = contract.get(code_field)
+            if agency_code and (agency_code not in wanted or not wanted[agency_code][1]):
+                parent_code = contract.get(parent_field) if parent_field else None
+                wanted[agency_code] = (contract.get(name_field), parent_code)
+
+    written = 0
+    pending = wanted
+    while pending:
+        ready, waiting = [], {}
+        for agency_code, (agency_name, parent_code) in pending.items():
+            parent = directory.get(parent_code) if parent_code else None
+            if parent_code and parent is None and parent_code in pending:
+                waiting[agency_code] = (agency_name, parent_code)
+                continue
+            parent_agency_id = parent[0] if parent else None
+            if _needs_write(directory.get(agency_code), parent_agency_id):
+                ready.append((agency_code, agency_name, parent_agency_id))
+        written += len(upsert_agencies(ready, conn))
+        if len(waiting) == len(pending):
+            break
+        pending = waiting
+    return written
+
+
+def resolve_agency(agency_name: Optional[str], agency_code: Optional[str], parent_agency_id: Optional[str] = None, conn: Optional[psycopg2.extensions.connection] = None) -> Optional[str]:
+    """
+    Resolves an agency by code from the agency directory, creating it if it
+    doesn't exist. Supports parent/child relationships.
+    """
+    if not agency_code:
+        return None
+
+    known = get_agency_directory(conn).get(agency_code)
+    if not _needs_write(known, parent_agency_id):
+        return known[0]
+    return upsert_agencies([(agency_code, agency_name, parent_agency_id)], conn)[agency_code]
+
+
+def unpack_message(body: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Returns (type, records) for an SQS message body.
+
+    Understands the scraper's packed envelopes ({"type", "records": [...]} or
+    {"type", "encoding": "gzip", "payload": ...}) as well as the older
+    single-record {"type", "data"} messages and bare contract payloads.
+    """
+    raw_payload = json.loads(body)
+    msg_type = raw_payload.get('type', 'prime')
+
+    if raw_payload.get('encoding') == 'gzip':
+        records = json.loads(gzip.decompress(
+            base64.b64decode(raw_payload['payload'])))
+    elif 'records' in raw_payload:
+        records = raw_payload['records']
+    else:
+        records = [raw_payload.get('data', raw_payload)]
+    return msg_type, records
+
+
+def contract_content_hash(contract_data: Dict[str, Any]) -> str:
+    """SHA-256 of a record's normalized JSON (sorted keys, trimmed strings, compact separators)."""
+    normalized = {
+        key: value.strip() if isinstance(value, str) else value
+        for key, value in contract_data.items()
+    }
+    encoded = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def filter_unchanged_primes(contracts: List[Dict[str, Any]], conn: psycopg2.extensions.connection) -> List[Dict[str, Any]]:
+    """
+    Drops prime awards whose payload is identical to an already processed raw_contracts row.
+
+    The scraper re-pulls a rolling window, so most awards arrive several
+    times unchanged; skipping them here avoids vendor resolution and the
+    contract upsert entirely. Duplicates within the batch are dropped too.
+    """
+    # Hash each record once; records without an Award ID are always kept
+    hashed = []
+    for contract_data in contracts:
+        usaspending_id = contract_data.get('Award ID')
+        key = (usaspending_id, contract_content_hash(contract_data)) if usaspending_id else None
+        hashed.append((contract_data, key))
+    ids = {key[0] for _, key in hashed if key}
+    if not ids:
+        return contracts
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT usaspending_id, content_hash FROM raw_contracts
+            WHERE usaspending_id = ANY(%s) AND processed = TRUE
+            """,
+            (list(ids),)
+        )
+        stored = {row[0]: row[1] for row in cur.fetchall()}
+
+    changed = []
+    seen = set()
+    for contract_data, key in hashed:
+        if key is not None:
+            if stored.get(key[0]) == key[1] or key in seen:
+                continue
+            seen.add(key)
+        changed.append(contract_data)
+    return changed
+
+
+def vendor_keys(primes: List[Dict[str, Any]], subawards: List[Dict[str, Any]]) -> List[VendorKey]:
+    """The resolve_vendor keys process_prime_award / process_sub_award will look up, in order."""
+    keys = [(c.get('Recipient Name'), c.get('Recipient DUNS'), c.get('Recipient UEI'))
+            for c in primes if c.get('Award ID')]
+    for c in subawards:
+        if c.get('Sub-Award ID'):
+            keys.append((c.get('Sub-Awardee Name'), None, c.get('Sub-Recipient UEI')))
+            keys.append((c.get('Prime Recipient Name'), None, c.get('Prime Award Recipient UEI')))
+    return keys
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Processes an SQS batch. Messages run concurrently on RESOLVER_WORKERS
+    threads, each with a pooled connection, primes before sub-awards so
+    sub-awards can link to primes from the same batch. Prime awards are
+    resolved per message and then written for the whole batch at once by
+    write_prime_awards, in one transaction; each message's sub-awards are
+    written in one transaction too. Messages whose records raised are
+    returned in batchItemFailures (the event source mapping reports batch
+    item failures), so SQS redelivers only those.
+    """
     logger.info(f"Processing batch of {len(event['Records'])} messages")
 
-    conn = get_db_connection()
-    conn.autocommit = True
-
-    processed_count = 0
+    pool = ConnectionPool(RESOLVER_WORKERS)
+    vendor_memo = VendorResolutionMemo()
+    # Message ids with a failed record, in arrival order (dict keys: thread-safe set)
+    failed: Dict[str, None] = {}
 
     try:
-        for record in event['Records']:
-            raw_payload = json.loads(record['body'])
-            msg_type = raw_payload.get('type', 'prime')
-            contract_data = raw_payload.get('data', raw_payload)
-
+        prime_messages, sub_messages = [], []
+        for i, record in enumerate(event['Records']):
+            message_id = record.get('messageId', str(i))
+            try:
+                msg_type, contracts = unpack_message(record['body'])
+            except Exception as e:
+                logger.error(f"Failed to unpack message {message_id}: {e}")
+                failed[message_id] = None
+                continue
             if msg_type == "prime":
-                processed_count += process_prime_award(contract_data, conn)
+                prime_messages.append((message_id, contracts))
             elif msg_type == "subaward":
-                processed_count += process_sub_award(contract_data, conn)
+                sub_messages.append((message_id, contracts))
+
+        primes = [contract for _, contracts in prime_messages for contract in contracts]
+        subawards = [contract for _, contracts in sub_messages for contract in contracts]
+        # The batch-wide steps only save round trips. If one fails (a bad
+        # record, a transient DB error), every message is still resolved on
+        # its own below, so only the messages at fault are retried.
+        changed_primes = primes
+        with pool.connection() as conn:
+            try:
+                changed_primes = filter_unchanged_primes(primes, conn)
+            except Exception as e:
+                logger.warning(f"Unchanged-record check failed, processing every prime award: {e}")
+            try:
+                vendor_memo.prefetch(vendor_keys(changed_primes, subawards), conn)
+                prefetch_agencies(changed_primes + subawards, conn)
+            except Exception as e:
+                logger.warning(f"Batch prefetch failed, resolving each message on its own: {e}")
+        skipped_count = len(primes) - len(changed_primes)
+        if skipped_count:
+            logger.info(f"Skipping {skipped_count} unchanged prime awards")
+        changed = {id(contract) for contract in changed_primes}
+        prime_messages = [(message_id, [c for c in contracts if id(c) in changed])
+                          for message_id, contracts in prime_messages]
+
+        # Primes first so sub-awards in the same batch can link to them.
+        # Resolution runs per message; the batch's rows are written together.
+        prepared = _map_messages(prime_messages, prepare_prime_awards, pool, vendor_memo, failed)
+        processed_count = 0
+        rows = [row for _, message_rows in prepared for row in message_rows]
+        if rows:
+            with pool.connection() as conn:
+                try:
+                    processed_count = write_prime_awards(rows, conn)
+                except Exception as e:
+                    logger.error(f"Failed to write {len(rows)} prime awards: {e}")
+                    for message_id, _ in prepared:
+                        failed[message_id] = None
+        processed_count += sum(
+            count for _, count in _map_messages(sub_messages, process_sub_awards, pool, vendor_memo, failed))
+        logger.info(f"METRICS: vendor_memo {json.dumps(vendor_memo.metrics())}")
+        if failed:
+            logger.warning(f"{len(failed)} of {len(event['Records'])} messages failed and will be retried")
 
         return {
             "statusCode": 200,
-            "body": json.dumps({"processed": processed_count})
+            "body": json.dumps({"processed": processed_count, "skipped_unchanged": skipped_count}),
+            "batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed],
         }
     finally:
-        conn.close()
+        flush_cache_writes()
+        logger.info(f"METRICS: resolution_cache {json.dumps(RESOLUTION_CACHE.metrics())}")
+        logger.info(f"METRICS: name_normalizer {json.dumps(VENDOR_NAME_NORMALIZER.metrics())}")
+        RESOLUTION_METRICS.flush()
+        pool.close_all()
+
+
+def _map_messages(messages: List[Tuple[str, List[Dict[str, Any]]]], fn: Callable[..., Any], pool: ConnectionPool, vendor_memo: VendorResolutionMemo, failed: Dict[str, None]) -> List[Tuple[str, Any]]:
+    """
+    Runs fn over each message's records, one message per task so a
+    message's records (usually one vendor) stay together. Adds the id of any
+    message whose records raised to failed; returns (message id, result) for
+    the others.
+    """
+    def run(message_id: str, contracts: List[Dict[str, Any]]) -> Optional[Tuple[str, Any]]:
+        with pool.connection() as conn:
+            try:
+                return message_id, fn(contracts, conn, vendor_memo=vendor_memo)
+            except Exception as e:
+                logger.error(f"Failed to process message {message_id}: {e}")
+                failed[message_id] = None
+                return None
+
+    messages = [(message_id, contracts) for message_id, contracts in messages if contracts]
+    if not messages:
+        return []
+    with ThreadPoolExecutor(max_workers=min(RESOLVER_WORKERS, len(messages))) as executor:
+        return [result for result in executor.map(lambda message: run(*message), messages) if result]
 
 
-def process_prime_award(contract_data: Dict[str, Any], conn: psycopg2.extensions.connection) -> int:
+def process_prime_award(contract_data: Dict[str, Any], conn: psycopg2.extensions.connection, vendor_memo: Optional[VendorResolutionMemo] = None) -> int:
     """Processes a prime award record."""
     usaspending_id = contract_data.get('Award ID')
     vendor_name = contract_data.get('Recipient Name')
@@ -509,14 +1748,18 @@ def process_prime_award(contract_data: Dict[str, Any], conn: psycopg2.extensions
     with conn.cursor() as cur:
         cur.execute(
             """
-            INSERT INTO raw_contracts (id, usaspending_id, raw_payload, ingested_at)
-            VALUES (%s, %s, %s, NOW())
+            INSERT INTO raw_contracts (id, usaspending_id, raw_payload, content_hash, ingested_at)
+            VALUES (%s, %s, %s, %s, NOW())
             ON CONFLICT (usaspending_id) DO UPDATE SET 
                 raw_payload = EXCLUDED.raw_payload,
+                content_hash = EXCLUDED.content_hash,
+                processed = FALSE,
+                processing_errors = NULL,
                 ingested_at = NOW()
             RETURNING id
             """,
-            (raw_contract_id, usaspending_id, json.dumps(contract_data))
+            (raw_contract_id, usaspending_id, json.dumps(contract_data),
+             contract_content_hash(contract_data))
         )
         res = cur.fetchone()
         if res:
@@ -551,7 +1794,8 @@ def process_prime_award(contract_data: Dict[str, Any], conn: psycopg2.extensions
     )
 
     # 3. Resolve Vendor
-    vendor_id, canonical_name, method, confidence = resolve_vendor(
+    resolve = vendor_memo.resolve if vendor_memo else resolve_vendor
+    vendor_id, canonical_name, method, confidence = resolve(
         vendor_name, duns, uei, conn)
 
     # 4. Store Contract
@@ -566,35 +1810,36 @@ def process_prime_award(contract_data: Dict[str, Any], conn: psycopg2.extensions
         formatted_desc = f"Vendor: {canonical_name} | {raw_desc}"
 
         try:
-            cur.execute(
-                """
-                INSERT INTO contracts (
-                    id, contract_id, vendor_id, agency_id, awarding_sub_agency_id,
-                    funding_agency_id, funding_sub_agency_id, raw_contract_id,
-                    description, obligated_amount, signed_date, award_type, 
-                    created_at, updated_at
-                )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-                ON CONFLICT (contract_id, signed_date) DO UPDATE SET 
-                    vendor_id = EXCLUDED.vendor_id,
-                    agency_id = EXCLUDED.agency_id,
-                    awarding_sub_agency_id = EXCLUDED.awarding_sub_agency_id,
-                    funding_agency_id = EXCLUDED.funding_agency_id,
-                    funding_sub_agency_id = EXCLUDED.funding_sub_agency_id,
-                    obligated_amount = EXCLUDED.obligated_amount,
-                    description = EXCLUDED.description,
-                    award_type = EXCLUDED.award_type,
-                    updated_at = NOW()
-                """,
-                (
-                    contract_uuid, usaspending_id, vendor_id, agency_id, sub_agency_id,
-                    funding_agency_id, funding_sub_agency_id, raw_contract_id,
-                    formatted_desc, contract_data.get('Award Amount', 0),
-                    signed_date, contract_data.get('Contract Award Type')
+            with savepoint(cur):
+                cur.execute(
+                    """
+                    INSERT INTO contracts (
+                        id, contract_id, vendor_id, agency_id, awarding_sub_agency_id,
+                        funding_agency_id, funding_sub_agency_id, raw_contract_id,
+                        description, obligated_amount, signed_date, award_type, 
+                        created_at, updated_at
+                    )
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
+                    ON CONFLICT (contract_id, signed_date) DO UPDATE SET 
+                        vendor_id = EXCLUDED.vendor_id,
+                        agency_id = EXCLUDED.agency_id,
+                        awarding_sub_agency_id = EXCLUDED.awarding_sub_agency_id,
+                        funding_agency_id = EXCLUDED.funding_agency_id,
+                        funding_sub_agency_id = EXCLUDED.funding_sub_agency_id,
+                        obligated_amount = EXCLUDED.obligated_amount,
+                        description = EXCLUDED.description,
+                        award_type = EXCLUDED.award_type,
+                        updated_at = NOW()
+                    """,
+                    (
+                        contract_uuid, usaspending_id, vendor_id, agency_id, sub_agency_id,
+                        funding_agency_id, funding_sub_agency_id, raw_contract_id,
+                        formatted_desc, contract_data.get('Award Amount', 0),
+                        signed_date, contract_data.get('Contract Award Type')
+                    )
                 )
-            )
-            cur.execute(
-                "UPDATE raw_contracts SET processed = TRUE WHERE id = %s", (raw_contract_id,))
+                cur.execute(
+                    "UPDATE raw_contracts SET processed = TRUE WHERE id = %s", (raw_contract_id,))
             return 1
         except Exception as e:
             logger.error(f"Failed to insert prime contract {
@@ -604,35 +1849,225 @@ def process_prime_award(contract_data: Dict[str, Any], conn: psycopg2.extensions
             return 0
 
 
-def process_sub_award(contract_data: Dict[str, Any], conn: psycopg2.extensions.connection) -> int:
-    """Processes a sub-award record and links it to prime awards."""
-    sub_award_id = contract_data.get('Sub-Award ID')
-    prime_id = contract_data.get('Prime Award ID')
-    sub_vendor_name = contract_data.get('Sub-Awardee Name')
-    sub_uei = contract_data.get('Sub-Recipient UEI')
-    prime_uei = contract_data.get('Prime Award Recipient UEI')
+# A prime award ready to write: one prime_award_stage row, in column order
+PrimeAwardRow = Tuple[Any, ...]
+
+# Per connection; rows are staged with COPY and merged in one statement.
+# Values taken from the record stay TEXT here and are cast by the merge, so
+# a bad one fails the merge (and then only its own row) rather than the COPY.
+_PRIME_AWARD_STAGE = """
+    CREATE TEMP TABLE IF NOT EXISTS prime_award_stage (
+        usaspending_id TEXT,
+        raw_payload TEXT,
+        content_hash TEXT,
+        vendor_id UUID,
+        agency_id UUID,
+        awarding_sub_agency_id UUID,
+        funding_agency_id UUID,
+        funding_sub_agency_id UUID,
+        description TEXT,
+        obligated_amount TEXT,
+        signed_date TEXT,
+        award_type TEXT
+    )
+"""
+
+# Lands the staged payloads in raw_contracts (already marked processed) and
+# merges their contracts rows; both or neither happen
+_PRIME_AWARD_MERGE = """
+    WITH raw AS (
+        INSERT INTO raw_contracts (id, usaspending_id, raw_payload, content_hash, processed, ingested_at)
+        SELECT gen_random_uuid(), usaspending_id, raw_payload::jsonb, content_hash, TRUE, NOW()
+        FROM prime_award_stage
+        ON CONFLICT (usaspending_id) DO UPDATE SET
+            raw_payload = EXCLUDED.raw_payload,
+            content_hash = EXCLUDED.content_hash,
+            processed = TRUE,
+            processing_errors = NULL,
+            ingested_at = NOW()
+        RETURNING usaspending_id, id
+    )
+    INSERT INTO contracts (
+        id, contract_id, vendor_id, agency_id, awarding_sub_agency_id,
+        funding_agency_id, funding_sub_agency_id, raw_contract_id,
+        description, obligated_amount, signed_date, award_type,
+        created_at, updated_at
+    )
+    SELECT
+        gen_random_uuid(), s.usaspending_id, s.vendor_id, s.agency_id, s.awarding_sub_agency_id,
+        s.funding_agency_id, s.funding_sub_agency_id, raw.id,
+        s.description, s.obligated_amount::numeric, s.signed_date::date, s.award_type,
+        NOW(), NOW()
+    FROM prime_award_stage s
+    JOIN raw USING (usaspending_id)
+    ON CONFLICT (contract_id, signed_date) DO UPDATE SET
+        vendor_id = EXCLUDED.vendor_id,
+        agency_id = EXCLUDED.agency_id,
+        awarding_sub_agency_id = EXCLUDED.awarding_sub_agency_id,
+        funding_agency_id = EXCLUDED.funding_agency_id,
+        funding_sub_agency_id = EXCLUDED.funding_sub_agency_id,
+        obligated_amount = EXCLUDED.obligated_amount,
+        description = EXCLUDED.description,
+        award_type = EXCLUDED.award_type,
+        updated_at = NOW()
+"""
+
+# Keeps the payload of a staged row whose merge failed, with the error
+_PRIME_AWARD_FAILED = """
+    INSERT INTO raw_contracts (id, usaspending_id, raw_payload, content_hash, processing_errors, ingested_at)
+    SELECT gen_random_uuid(), usaspending_id, raw_payload::jsonb, content_hash, %s, NOW()
+    FROM prime_award_stage
+    ON CONFLICT (usaspending_id) DO UPDATE SET
+        raw_payload = EXCLUDED.raw_payload,
+        content_hash = EXCLUDED.content_hash,
+        processed = FALSE,
+        processing_errors = EXCLUDED.processing_errors,
+        ingested_at = NOW()
+"""
+
+def prime_award_row(contract_data: Dict[str, Any], conn: psycopg2.extensions.connection, vendor_memo: Optional[VendorResolutionMemo] = None) -> PrimeAwardRow:
+    """Resolves a prime award record's agencies and vendor into the row write_prime_awards stages."""
+    agency_id = resolve_agency(
+        contract_data.get('Awarding Agency'), contract_data.get('Awarding Agency Code'), conn=conn)
+    sub_agency_id = resolve_agency(
+        contract_data.get('Awarding Sub Agency'), contract_data.get('Awarding Sub Agency Code'),
+        parent_agency_id=agency_id, conn=conn)
+    funding_agency_id = resolve_agency(
+        contract_data.get('Funding Agency'), contract_data.get('Funding Agency Code'), conn=conn)
+    funding_sub_agency_id = resolve_agency(
+        contract_data.get('Funding Sub Agency'), contract_data.get('Funding Sub Agency Code'),
+        parent_agency_id=funding_agency_id, conn=conn)
+
+    resolve = vendor_memo.resolve if vendor_memo else resolve_vendor
+    vendor_id, canonical_name, _, _ = resolve(
+        contract_data.get('Recipient Name'), contract_data.get('Recipient DUNS'),
+        contract_data.get('Recipient UEI'), conn)
+
+    raw_desc = contract_data.get('Description', 'No description provided')
+    return (
+        contract_data['Award ID'], json.dumps(contract_data), contract_content_hash(contract_data),
+        vendor_id, agency_id, sub_agency_id, funding_agency_id, funding_sub_agency_id,
+        f"Vendor: {canonical_name} | {raw_desc}", contract_data.get('Award Amount', 0),
+        contract_data.get('Start Date') or date.today().strftime("%Y-%m-%d"),
+        contract_data.get('Contract Award Type')
+    )
+
+
+def prepare_prime_awards(contracts: List[Dict[str, Any]], conn: psycopg2.extensions.connection, vendor_memo: Optional[VendorResolutionMemo] = None) -> List[PrimeAwardRow]:
+    """Rows for every prime award record with an Award ID; nothing is written."""
+    return [prime_award_row(contract_data, conn, vendor_memo)
+            for contract_data in contracts if contract_data.get('Award ID')]
+
+
+def _stage(cur: Any, rows: List[PrimeAwardRow]) -> None:
+    # CSV writes None (and empty strings) as an empty field, which COPY loads as NULL
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cur.execute("TRUNCATE prime_award_stage")
+    cur.copy_expert("COPY prime_award_stage FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def write_prime_awards(rows: List[PrimeAwardRow], conn: psycopg2.extensions.connection) -> int:
+    """
+    Writes prepared prime awards with set-based statements, in one transaction.
+
+    COPYs the rows into a temporary staging table and merges them into
+    raw_contracts and contracts with one statement, in place of the three
+    statements per record process_prime_award makes. If the merge fails,
+    it is rolled back to a savepoint and the rows are merged one at a time,
+    each under its own savepoint, so only the records at fault are left
+    unprocessed, each with its error in processing_errors. Returns the
+    number of records written.
+    """
+    # A repeated Award ID would make ON CONFLICT touch a row twice; the last copy wins
+    rows = list({row[0]: row for row in rows}.values())
+    if not rows:
+        return 0
+
+    with transaction(conn), conn.cursor() as cur:
+        cur.execute(_PRIME_AWARD_STAGE)
+        _stage(cur, rows)
+        try:
+            with savepoint(cur):
+                cur.execute(_PRIME_AWARD_MERGE)
+            return len(rows)
+        except Exception as e:
+            logger.warning(f"Bulk merge of {len(rows)} prime awards failed ({e}); merging them one at a time")
+
+        written = 0
+        for row in rows:
+            _stage(cur, [row])
+            try:
+                with savepoint(cur):
+                    cur.execute(_PRIME_AWARD_MERGE)
+                written += 1
+            except Exception as e:
+                logger.error(f"Failed to insert prime contract {row[0]}: {e}")
+                cur.execute(_PRIME_AWARD_FAILED, (str(e),))
+        return written
+
+
+def process_prime_awards(contracts: List[Dict[str, Any]], conn: psycopg2.extensions.connection, vendor_memo: Optional[VendorResolutionMemo] = None) -> int:
+    """Processes a batch of prime award records: prepare_prime_awards, then write_prime_awards."""
+    return write_prime_awards(prepare_prime_awards(contracts, conn, vendor_memo), conn)
+
 
-    if not sub_award_id:
+def process_sub_awards(contracts: List[Dict[str, Any]], conn: psycopg2.extensions.connection, vendor_memo: Optional[VendorResolutionMemo] = None) -> int:
+    """
+    Processes a batch of sub-award records: resolves them all, then writes
+    them in one transaction with a savepoint per record, so a record that
+    fails to insert is skipped without losing the rest.
+    """
+    rows = [sub_award_row(contract_data, conn, vendor_memo)
+            for contract_data in contracts if contract_data.get('Sub-Award ID')]
+    if not rows:
+        return 0
+    with transaction(conn), conn.cursor() as cur:
+        return sum(_write_sub_award(cur, row) for row in rows)
+
+
+def process_sub_award(contract_data: Dict[str, Any], conn: psycopg2.extensions.connection, vendor_memo: Optional[VendorResolutionMemo] = None) -> int:
+    """Processes a sub-award record and links it to prime awards."""
+    if not contract_data.get('Sub-Award ID'):
         return 0
+    row = sub_award_row(contract_data, conn, vendor_memo)
+    with conn.cursor() as cur:
+        return _write_sub_award(cur, row)
+
+
+# (sub-award id, prime award id, prime vendor id, sub vendor id, amount, description)
+SubAwardRow = Tuple[Any, ...]
+
+
+def sub_award_row(contract_data: Dict[str, Any], conn: psycopg2.extensions.connection, vendor_memo: Optional[VendorResolutionMemo] = None) -> SubAwardRow:
+    """Resolves a sub-award record's vendors and agency, without writing the sub-award."""
+    resolve = vendor_memo.resolve if vendor_memo else resolve_vendor
 
     # 1. Resolve Sub-contractor Vendor
-    sub_vendor_id, _, _, _ = resolve_vendor(
-        sub_vendor_name, uei=sub_uei, conn=conn)
+    sub_vendor_id, _, _, _ = resolve(
+        contract_data.get('Sub-Awardee Name'), uei=contract_data.get('Sub-Recipient UEI'), conn=conn)
 
     # 2. Resolve Prime Vendor
-    prime_vendor_id, _, _, _ = resolve_vendor(contract_data.get(
-        'Prime Recipient Name'), uei=prime_uei, conn=conn)
+    prime_vendor_id, _, _, _ = resolve(contract_data.get(
+        'Prime Recipient Name'), uei=contract_data.get('Prime Award Recipient UEI'), conn=conn)
 
     # 3. Resolve Agency (limited for sub-awards in USAspending API)
-    agency_id = resolve_agency(
+    resolve_agency(
         contract_data.get('Awarding Agency'),
         contract_data.get('Awarding Agency Code'),
         conn=conn
     )
 
-    # 4. Persistence
-    with conn.cursor() as cur:
-        try:
+    return (contract_data.get('Sub-Award ID'), contract_data.get('Prime Award ID'),
+            prime_vendor_id, sub_vendor_id,
+            contract_data.get('Sub-Award Amount', 0), contract_data.get('Sub-Award Description'))
+
+
+def _write_sub_award(cur: Any, row: SubAwardRow) -> int:
+    sub_award_id, prime_id, prime_vendor_id, sub_vendor_id, amount, description = row
+    try:
+        with savepoint(cur):
             # First find the prime contract record in our DB if it exists
             cur.execute(
                 "SELECT id FROM contracts WHERE contract_id = %s LIMIT 1", (prime_id,))
@@ -648,13 +2083,9 @@ def process_sub_award(contract_data: Dict[str, Any], conn: psycopg2.extensions.c
                 )
                 VALUES (%s, %s, %s, %s, %s, %s, NOW())
                 """,
-                (
-                    sub_uuid, prime_contract_uuid, prime_vendor_id, sub_vendor_id,
-                    contract_data.get('Sub-Award Amount', 0),
-                    contract_data.get('Sub-Award Description')
-                )
+                (sub_uuid, prime_contract_uuid, prime_vendor_id, sub_vendor_id, amount, description)
             )
-            return 1
-        except Exception as e:
-            logger.error(f"Failed to insert sub-award {sub_award_id}: {e}")
-            return 0
+        return 1
+    except Exception as e:
+        logger.error(f"Failed to insert sub-award {sub_award_id}: {e}")
+        return 0
@@ -0,0 +1,174 @@
+import io
+import os
+import json
+import uuid
+import zipfile
+import argparse
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import psycopg2.extensions
+from psycopg2.extras import execute_values
+
+from entity_resolver import get_db_connection, normalize_vendor_names
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Zero-based positions in the pipe-delimited SAM Entity Registration public
+# extract (V2). DUNS was retired in 2022 and its slot is blank in V2 files,
+# but older files still fill it in.
+SAM_UEI_FIELD = 0
+SAM_DUNS_FIELD = 1
+SAM_EXTRACT_CODE_FIELD = 5
+SAM_LEGAL_NAME_FIELD = 11
+# Daily (delta) files mark deleted registrations with extract code 1; every
+# other code (new, updated, active, expired) is kept, since expired entities
+# still appear on historical awards
+SAM_DELETED_CODE = "1"
+
+LOAD_BATCH_SIZE = 5000
+
+# (uei, duns, legal business name, extract code)
+SamRecord = Tuple[str, Optional[str], str, str]
+
+
+def parse_extract(lines: Iterable[str]) -> Iterator[SamRecord]:
+    """Entity records of an extract file, skipping the BOF/EOF lines and rows without a UEI or name."""
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line.endswith("!end"):
+            line = line[:-4]
+        if not line or line.startswith(("BOF ", "EOF ")):
+            continue
+        fields = line.split("|")
+        if len(fields) <= SAM_LEGAL_NAME_FIELD:
+            continue
+        uei = fields[SAM_UEI_FIELD].strip()
+        name = fields[SAM_LEGAL_NAME_FIELD].strip()
+        if uei and name:
+            yield uei, fields[SAM_DUNS_FIELD].strip() or None, name, fields[SAM_EXTRACT_CODE_FIELD].strip()
+
+
+@contextmanager
+def open_extract(path: str) -> Iterator[Iterable[str]]:
+    """Lines of a .dat extract, or of the .dat file inside the .zip SAM.gov serves."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            member = next(name for name in archive.namelist() if name.lower().endswith(".dat"))
+            with archive.open(member) as raw:
+                yield io.TextIOWrapper(raw, encoding="utf-8", errors="replace")
+    else:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            yield f
+
+
+def _apply_batch(cur: Any, load_id: str, records: List[SamRecord]) -> Tuple[int, int]:
+    # Last record wins when a file repeats a UEI; ON CONFLICT cannot touch a row twice
+    latest = {record[0]: record for record in records}
+    deleted = [uei for uei, record in latest.items() if record[3] == SAM_DELETED_CODE]
+    kept = [record for record in latest.values() if record[3] != SAM_DELETED_CODE]
+    upserts = [(uei, duns, name, norm_name or None, load_id)
+               for (uei, duns, name, _), norm_name in zip(kept, normalize_vendor_names([record[2] for record in kept]))]
+    if upserts:
+        execute_values(
+            cur,
+            """
+            INSERT INTO sam_entities (uei, duns, legal_business_name, normalized_name, load_id)
+            VALUES %s
+            ON CONFLICT (uei) DO UPDATE SET
+                duns = COALESCE(EXCLUDED.duns, sam_entities.duns),
+                legal_business_name = EXCLUDED.legal_business_name,
+                normalized_name = EXCLUDED.normalized_name,
+                load_id = EXCLUDED.load_id,
+                updated_at = NOW()
+            """,
+            upserts,
+            page_size=1000
+        )
+    if deleted:
+        cur.execute("DELETE FROM sam_entities WHERE uei = ANY(%s)", (deleted,))
+    return len(upserts), len(deleted)
+
+
+def load_sam_extract(conn: psycopg2.extensions.connection, path: str, full: bool = False, force: bool = False) -> Dict[str, Any]:
+    """
+    Applies one extract file to sam_entities in a single transaction.
+
+    Daily files are deltas: their rows are upserted and deleted
+    registrations removed. A full (monthly) file also drops every entity it
+    does not list. Files already recorded in sam_extract_loads are skipped
+    unless force is set, so a directory of daily files can be re-run safely.
+    """
+    file_name = os.path.basename(path)
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM sam_extract_loads WHERE file_name = %s", (file_name,))
+        if cur.fetchone() and not force:
+            logger.info(f"SAM extract {file_name} already loaded; skipping")
+            return {"file": file_name, "skipped": True}
+
+        load_id = str(uuid.uuid4())
+        cur.execute(
+            """
+            INSERT INTO sam_extract_loads (id, file_name, extract_type)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (file_name) DO UPDATE SET id = EXCLUDED.id, extract_type = EXCLUDED.extract_type, loaded_at = NOW()
+            """,
+            (load_id, file_name, "full" if full else "delta")
+        )
+
+        upserted = deleted = 0
+        batch: List[SamRecord] = []
+        with open_extract(path) as lines:
+            for record in parse_extract(lines):
+                batch.append(record)
+                if len(batch) >= LOAD_BATCH_SIZE:
+                    counts = _apply_batch(cur, load_id, batch)
+                    upserted, deleted = upserted + counts[0], deleted + counts[1]
+                    batch = []
+        if batch:
+            counts = _apply_batch(cur, load_id, batch)
+            upserted, deleted = upserted + counts[0], deleted + counts[1]
+
+        if full:
+            cur.execute("DELETE FROM sam_entities WHERE load_id IS DISTINCT FROM %s", (load_id,))
+            deleted += max(cur.rowcount, 0)
+
+        cur.execute(
+            "UPDATE sam_extract_loads SET rows_upserted = %s, rows_deleted = %s WHERE id = %s",
+            (upserted, deleted, load_id)
+        )
+    conn.commit()
+
+    stats = {"file": file_name, "type": "full" if full else "delta", "upserted": upserted, "deleted": deleted}
+    logger.info(f"Loaded SAM extract: {stats}")
+    return stats
+
+
+def main(argv: Optional[list] = None) -> List[Dict[str, Any]]:
+    parser = argparse.ArgumentParser(
+        description="Load SAM.gov public entity extract files into the local Tier 4 lookup table.")
+    parser.add_argument("paths", nargs="+", help="Extract files (.dat or .zip), applied in the order given")
+    parser.add_argument("--full", action="store_true",
+                        help="Treat the files as full (monthly) extracts; inferred from MONTHLY in the file name")
+    parser.add_argument("--force", action="store_true", help="Reload files that were already applied")
+    args = parser.parse_args(argv)
+
+    conn = get_db_connection()
+    try:
+        results = [
+            load_sam_extract(conn, path, full=args.full or "MONTHLY" in os.path.basename(path).upper(),
+                             force=args.force)
+            for path in args.paths
+        ]
+    finally:
+        conn.close()
+    print(json.dumps(results))
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,466 @@
+import re
+import json
+import mmap
+import uuid
+import struct
+from array import array
+from collections import Counter
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence as SequenceType, Tuple
+
+from rapidfuzz import process, fuzz
+
+# Names that get scored per lookup, at most
+MAX_CANDIDATES = 500
+# Grams found in more than this share of names (and more than
+# MIN_SKIPPED_GRAM_COUNT of them) say little about a match and are skipped,
+# unless the query has nothing rarer
+MAX_GRAM_SHARE = 0.2
+MIN_SKIPPED_GRAM_COUNT = 1000
+
+
+def name_grams(name: Optional[str]) -> List[str]:
+    """Character trigrams of the upper-cased, punctuation-free name, padded so short names still have grams."""
+    if not name:
+        return []
+    text = " " + " ".join(re.sub(r"[^A-Z0-9]+", " ", name.upper()).split()) + " "
+    if len(text) < 3:
+        return []
+    return list(dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2)))
+
+
+class NameBlockingIndex:
+    """
+    Trigram postings over the canonical vendor names, for Tier 5 fuzzy matching.
+
+    Instead of scoring a name against every vendor, extract_one scores only
+    the names that share the most trigrams with it. A WRatio score of 90 or
+    more needs most of the shorter string to appear in the longer one, so
+    real matches share many grams and land in the candidate set. Ties keep
+    the brute-force order (lowest index wins), so results match
+    process.extractOne over the full list.
+    """
+
+    def __init__(self, names: List[str], max_candidates: int = MAX_CANDIDATES, max_gram_share: float = MAX_GRAM_SHARE):
+        self.names = names
+        self.max_candidates = max_candidates
+        self.max_gram_count = max(MIN_SKIPPED_GRAM_COUNT, int(len(names) * max_gram_share))
+        self._postings: Dict[str, array] = {}
+        self._gram_counts = array("I")
+        self.add(names, start=0)
+
+    def add(self, names: Iterable[str], start: int) -> None:
+        """Indexes names that sit at positions start, start + 1, ... of self.names."""
+        for i, name in enumerate(names, start):
+            grams = name_grams(name)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                posting = self._postings.get(gram)
+                if posting is None:
+                    posting = self._postings[gram] = array("I")
+                posting.append(i)
+
+    def _gram_postings(self, gram: str) -> List[SequenceType[int]]:
+        posting = self._postings.get(gram)
+        return [posting] if posting is not None else []
+
+    def _gram_count(self, i: int) -> int:
+        return self._gram_counts[i]
+
+    def candidates(self, query: Optional[str]) -> List[int]:
+        """Indexes of the names sharing the most trigrams with query, in original order."""
+        postings = [parts for parts in map(self._gram_postings, name_grams(query)) if parts]
+        if not postings:
+            return []
+
+        def size(parts: List[SequenceType[int]]) -> int:
+            return sum(len(part) for part in parts)
+
+        selective = [parts for parts in postings if size(parts) <= self.max_gram_count]
+        counts = Counter()
+        for parts in selective or [min(postings, key=size)]:
+            for part in parts:
+                counts.update(part)
+        # Rank by grams shared (long names containing the query) and by the
+        # share of the name's own grams found (short names inside the query)
+        half = self.max_candidates // 2
+        best = {i for i, _ in counts.most_common(half)}
+        gram_count = self._gram_count
+        contained = sorted(counts, key=lambda i: counts[i] / gram_count(i), reverse=True)
+        best.update(contained[:self.max_candidates - len(best)])
+        return sorted(best)
+
+    def extract_one(self, query: Optional[str], scorer: Callable = fuzz.WRatio, score_cutoff: float = 0) -> Optional[Tuple[str, float, int]]:
+        """Same (name, score, index) result as process.extractOne(query, names, scorer=scorer) for likely matches."""
+        choices = {i: self.names[i] for i in self.candidates(query)}
+        if not choices:
+            return None
+        match = process.extractOne(query, choices, scorer=scorer, score_cutoff=score_cutoff)
+        if match is None:
+            return None
+        name, score, index = match
+        return name, score, index
+
+
+class VendorDirectory:
+    """
+    Vendor ids by canonical name, and canonical names by UEI and DUNS.
+
+    Kept next to the canonical name cache so an exact, normalized, fuzzy or
+    identifier match becomes a vendor id without another RDS query. A miss
+    only means the vendor is newer than the last refresh, not that it does
+    not exist.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, str] = {}
+        self._uei_names: Dict[str, str] = {}
+        self._duns_names: Dict[str, str] = {}
+
+    def add(self, vendor_id: Any, name: str, duns: Optional[str] = None, uei: Optional[str] = None) -> None:
+        self._ids[name] = str(vendor_id)
+        if uei:
+            self._uei_names[uei] = name
+        if duns:
+            self._duns_names[duns] = name
+
+    def id_for_name(self, name: Optional[str]) -> Optional[str]:
+        return self._ids.get(name) if name else None
+
+    def name_for_uei(self, uei: str) -> Optional[str]:
+        return self._uei_names.get(uei)
+
+    def name_for_duns(self, duns: str) -> Optional[str]:
+        return self._duns_names.get(duns)
+
+    def find_identifier(self, duns: Optional[str] = None, uei: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """(vendor id, canonical name) of the vendor with this DUNS or UEI."""
+        for name in (self.name_for_duns(duns) if duns else None, self.name_for_uei(uei) if uei else None):
+            vendor_id = self.id_for_name(name)
+            if vendor_id:
+                return vendor_id, name
+        return None
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+# -----------------------------------------------------------------------------
+# Prebuilt artifact (memory-mapped at cold start)
+# -----------------------------------------------------------------------------
+
+ARTIFACT_MAGIC = b"GGVNAMES"
+ARTIFACT_VERSION = 2
+ARTIFACT_SECTIONS = (
+    "meta", "name_offsets", "names", "name_order", "norm_offsets", "norms",
+    "norm_targets", "gram_keys", "gram_offsets", "postings", "gram_counts",
+    "ids", "uei_offsets", "ueis", "uei_targets", "duns_offsets", "dunses", "duns_targets",
+)
+# Vendor ids are stored as 16 raw UUID bytes per name; all zeros means unknown
+_NO_ID = bytes(16)
+_HEADER = struct.Struct("<8sI")
+_SECTION = struct.Struct("<QQ")
+
+
+def _offsets_and_blob(values: List[bytes]) -> Tuple[array, bytes]:
+    offsets = array("Q", [0])
+    total = 0
+    for value in values:
+        total += len(value)
+        offsets.append(total)
+    return offsets, b"".join(values)
+
+
+def _sorted_lookup(first_by_key: Dict[bytes, int]) -> Tuple[array, bytes, array]:
+    """Sorted keys (offsets, blob) and the name position each points to, for _bisect_blob."""
+    keys = sorted(first_by_key)
+    offsets, blob = _offsets_and_blob(keys)
+    return offsets, blob, array("I", (first_by_key[key] for key in keys))
+
+
+def write_artifact(path: str, names: List[str], normalize: Callable[[str], str], high_water: Optional[datetime] = None, identifiers: Optional[List[Tuple[Any, Optional[str], Optional[str]]]] = None) -> Dict[str, int]:
+    """
+    Writes the canonical names, their normalized-name map and the trigram
+    postings into one binary file that VendorNameArtifact can mmap.
+
+    All sections are flat arrays (offsets into byte blobs, sorted keys for
+    binary search), so opening the file costs the same at any vendor count.
+    high_water is the newest vendors.updated_at covered; the resolver pulls
+    only rows changed after it. identifiers holds each name's (vendor id,
+    DUNS, UEI) for the VendorDirectory; without it the directory is empty.
+    """
+    encoded = [name.encode("utf-8") for name in names]
+    name_offsets, names_blob = _offsets_and_blob(encoded)
+    name_order = array("I", sorted(range(len(encoded)), key=encoded.__getitem__))
+
+    first_by_norm: Dict[bytes, int] = {}
+    for i, name in enumerate(names):
+        norm_name = normalize(name)
+        if norm_name:
+            first_by_norm.setdefault(norm_name.encode("utf-8"), i)
+    norm_offsets, norms_blob, norm_targets = _sorted_lookup(first_by_norm)
+
+    ids = bytearray(_NO_ID * len(names))
+    first_by_uei: Dict[bytes, int] = {}
+    first_by_duns: Dict[bytes, int] = {}
+    for i, (vendor_id, duns, uei) in enumerate(identifiers or []):
+        if vendor_id:
+            ids[i * 16:i * 16 + 16] = uuid.UUID(str(vendor_id)).bytes
+        if uei:
+            first_by_uei.setdefault(uei.encode("utf-8"), i)
+        if duns:
+            first_by_duns.setdefault(duns.encode("utf-8"), i)
+    uei_offsets, ueis_blob, uei_targets = _sorted_lookup(first_by_uei)
+    duns_offsets, dunses_blob, duns_targets = _sorted_lookup(first_by_duns)
+
+    index = NameBlockingIndex(names)
+    grams = sorted(index._postings)
+    gram_offsets = array("Q", [0])
+    postings = array("I")
+    for gram in grams:
+        postings.extend(index._postings[gram])
+        gram_offsets.append(len(postings))
+
+    meta = json.dumps({
+        "version": ARTIFACT_VERSION,
+        "names": len(names),
+        "high_water": high_water.isoformat() if high_water else None,
+        "built_at": datetime.now().isoformat(),
+    }).encode("utf-8")
+    sections = {
+        "meta": meta, "name_offsets": name_offsets.tobytes(), "names": names_blob,
+        "name_order": name_order.tobytes(), "norm_offsets": norm_offsets.tobytes(),
+        "norms": norms_blob, "norm_targets": norm_targets.tobytes(),
+        "gram_keys": "".join(grams).encode("ascii"), "gram_offsets": gram_offsets.tobytes(),
+        "postings": postings.tobytes(), "gram_counts": index._gram_counts.tobytes(),
+        "ids": bytes(ids), "uei_offsets": uei_offsets.tobytes(), "ueis": ueis_blob,
+        "uei_targets": uei_targets.tobytes(), "duns_offsets": duns_offsets.tobytes(),
+        "dunses": dunses_blob, "duns_targets": duns_targets.tobytes(),
+    }
+
+    position = _HEADER.size + _SECTION.size * len(ARTIFACT_SECTIONS)
+    table, padded = [], []
+    for name in ARTIFACT_SECTIONS:
+        data = sections[name]
+        padding = -position % 8  # keep every array 8-byte aligned
+        position += padding
+        table.append(_SECTION.pack(position, len(data)))
+        padded.append(b"\0" * padding + data)
+        position += len(data)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION))
+        f.write(b"".join(table))
+        for data in padded:
+            f.write(data)
+    return {"names": len(names), "normalized": len(norm_targets), "grams": len(grams),
+            "identified": len(identifiers or []), "bytes": position}
+
+
+def _bisect_blob(offsets: memoryview, blob: memoryview, count: int, key: bytes, order: Optional[memoryview] = None) -> int:
+    """Position of key among count sorted byte strings (blob[offsets[i]:offsets[i + 1]]), or -1."""
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        i = order[mid] if order is not None else mid
+        value = blob[offsets[i]:offsets[i + 1]].tobytes()
+        if value < key:
+            lo = mid + 1
+        elif value > key:
+            hi = mid
+        else:
+            return i
+    return -1
+
+
+class MappedNames(Sequence):
+    """Read-only canonical names from an artifact, plus names appended since it was built."""
+
+    def __init__(self, offsets: memoryview, blob: memoryview, order: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+        self._order = order
+        self._base = len(offsets) - 1
+        self._added: List[str] = []
+        self._added_set = set()
+
+    def __len__(self) -> int:
+        return self._base + len(self._added)
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if i >= self._base:
+            return self._added[i - self._base]
+        if i < 0:
+            raise IndexError(i)
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __contains__(self, name: object) -> bool:
+        if not isinstance(name, str):
+            return False
+        return name in self._added_set or self.position(name) >= 0
+
+    def position(self, name: str) -> int:
+        """Index of name among the names in the artifact (not those added since), or -1."""
+        return _bisect_blob(self._offsets, self._blob, self._base, name.encode("utf-8"), self._order)
+
+    def extend(self, names: Iterable[str]) -> None:
+        for name in names:
+            self._added.append(name)
+            self._added_set.add(name)
+
+
+class MappedNormalizedNames:
+    """normalized name -> canonical name, read from an artifact with a dict for later additions."""
+
+    def __init__(self, names: MappedNames, offsets: memoryview, blob: memoryview, targets: memoryview):
+        self._names = names
+        self._offsets = offsets
+        self._blob = blob
+        self._targets = targets
+        self._added: Dict[str, str] = {}
+
+    def get(self, norm_name: str, default: Optional[str] = None) -> Optional[str]:
+        if norm_name in self._added:
+            return self._added[norm_name]
+        i = _bisect_blob(self._offsets, self._blob, len(self._targets), norm_name.encode("utf-8"))
+        return self._names[self._targets[i]] if i >= 0 else default
+
+    def __contains__(self, norm_name: object) -> bool:
+        return isinstance(norm_name, str) and self.get(norm_name) is not None
+
+    def __getitem__(self, norm_name: str) -> str:
+        name = self.get(norm_name)
+        if name is None:
+            raise KeyError(norm_name)
+        return name
+
+    def __setitem__(self, norm_name: str, name: str) -> None:
+        self._added[norm_name] = name
+
+    def __len__(self) -> int:
+        return len(self._targets) + len(self._added)
+
+
+class MappedNameIndex(NameBlockingIndex):
+    """NameBlockingIndex over an artifact's postings; names added later are indexed in memory."""
+
+    def __init__(self, names: MappedNames, gram_keys: memoryview, gram_offsets: memoryview, postings: memoryview, gram_counts: memoryview, max_candidates: int = MAX_CANDIDATES, max_gram_share: float = MAX_GRAM_SHARE):
+        self.names = names
+        self.max_candidates = max_candidates
+        self.max_gram_count = max(MIN_SKIPPED_GRAM_COUNT, int(len(names) * max_gram_share))
+        self._postings: Dict[str, array] = {}
+        self._gram_counts = array("I")
+        self._gram_keys = gram_keys
+        self._gram_offsets = gram_offsets
+        self._mapped_postings = postings
+        self._mapped_counts = gram_counts
+        self._base = len(gram_counts)
+
+    def _find_gram(self, gram: str) -> int:
+        key = gram.encode("ascii", "replace")
+        keys = self._gram_keys
+        lo, hi = 0, len(keys) // 3
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = keys[mid * 3:mid * 3 + 3].tobytes()
+            if value < key:
+                lo = mid + 1
+            elif value > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def _gram_postings(self, gram: str) -> List[SequenceType[int]]:
+        parts = []
+        i = self._find_gram(gram)
+        if i >= 0:
+            parts.append(self._mapped_postings[self._gram_offsets[i]:self._gram_offsets[i + 1]])
+        if gram in self._postings:
+            parts.append(self._postings[gram])
+        return parts
+
+    def _gram_count(self, i: int) -> int:
+        return self._mapped_counts[i] if i < self._base else self._gram_counts[i - self._base]
+
+
+class MappedVendorDirectory(VendorDirectory):
+    """VendorDirectory over an artifact's id and identifier sections, with dicts for later additions."""
+
+    def __init__(self, names: MappedNames, ids: memoryview, uei_lookup: Tuple[memoryview, memoryview, memoryview], duns_lookup: Tuple[memoryview, memoryview, memoryview]):
+        super().__init__()
+        self._names = names
+        self._mapped_ids = ids
+        self._uei_lookup = uei_lookup
+        self._duns_lookup = duns_lookup
+
+    def id_for_name(self, name: Optional[str]) -> Optional[str]:
+        if not name:
+            return None
+        if name in self._ids:
+            return self._ids[name]
+        i = self._names.position(name)
+        if i < 0:
+            return None
+        raw = self._mapped_ids[i * 16:i * 16 + 16].tobytes()
+        return str(uuid.UUID(bytes=raw)) if raw != _NO_ID else None
+
+    def _mapped_name(self, lookup: Tuple[memoryview, memoryview, memoryview], key: str) -> Optional[str]:
+        offsets, blob, targets = lookup
+        i = _bisect_blob(offsets, blob, len(targets), key.encode("utf-8"))
+        return self._names[targets[i]] if i >= 0 else None
+
+    def name_for_uei(self, uei: str) -> Optional[str]:
+        return self._uei_names.get(uei) or self._mapped_name(self._uei_lookup, uei)
+
+    def name_for_duns(self, duns: str) -> Optional[str]:
+        return self._duns_names.get(duns) or self._mapped_name(self._duns_lookup, duns)
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self.id_for_name(name) is not None
+
+    def __len__(self) -> int:
+        return len(self._mapped_ids) // 16 + len(self._ids)
+
+
+class VendorNameArtifact:
+    """
+    A write_artifact file opened with mmap.
+
+    names, normalized, index and directory stand in for the resolver's
+    canonical name list, normalized-name dict, NameBlockingIndex and
+    VendorDirectory. Pages are read from
+    disk only when touched, so startup time and resident memory barely
+    depend on the number of vendors.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version = _HEADER.unpack_from(view, 0)
+        if magic != ARTIFACT_MAGIC or version != ARTIFACT_VERSION:
+            raise ValueError(f"{path} is not a version {ARTIFACT_VERSION} vendor name artifact")
+
+        sections = {}
+        for n, name in enumerate(ARTIFACT_SECTIONS):
+            offset, length = _SECTION.unpack_from(view, _HEADER.size + n * _SECTION.size)
+            sections[name] = view[offset:offset + length]
+
+        self.meta = json.loads(sections["meta"].tobytes())
+        self.high_water = datetime.fromisoformat(self.meta["high_water"]) if self.meta["high_water"] else None
+        self.names = MappedNames(sections["name_offsets"].cast("Q"), sections["names"],
+                                 sections["name_order"].cast("I"))
+        self.normalized = MappedNormalizedNames(self.names, sections["norm_offsets"].cast("Q"),
+                                                sections["norms"], sections["norm_targets"].cast("I"))
+        self.index = MappedNameIndex(self.names, sections["gram_keys"], sections["gram_offsets"].cast("Q"),
+                                     sections["postings"].cast("I"), sections["gram_counts"].cast("I"))
+        self.directory = MappedVendorDirectory(
+            self.names, sections["ids"],
+            (sections["uei_offsets"].cast("Q"), sections["ueis"], sections["uei_targets"].cast("I")),
+            (sections["duns_offsets"].cast("Q"), sections["dunses"], sections["duns_targets"].cast("I")))
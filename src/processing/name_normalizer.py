@@ -0,0 +1,90 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+# Legal-form words dropped from vendor names. Changing these (or adding
+# abbreviations) changes every normalized name, so the vendor name artifact
+# and sam_entities.normalized_name must be rebuilt with the same table.
+DEFAULT_SUFFIXES = ("CORP", "CORPORATION", "INC", "INCORPORATED", "LLC", "LTD", "LIMITED", "CO", "COMPANY", "PLC")
+PUNCTUATION = ".,/#!$%^&*;:{}=-_~()"
+MEMO_SIZE = 65536
+
+# Joins a batch into one string; whitespace, so it never ends up inside a word
+_BATCH_SEPARATOR = "\n"
+
+
+def _words_pattern(words: Iterable[str]) -> Optional["re.Pattern[str]"]:
+    words = sorted({word.upper() for word in words if word}, key=len, reverse=True)
+    if not words:
+        return None
+    return re.compile(r"\b(?:" + "|".join(re.escape(word) for word in words) + r")\b")
+
+
+class NameNormalizer:
+    """
+    Upper-cases a vendor name, turns punctuation into spaces, expands
+    abbreviations, drops legal-form suffixes and collapses whitespace.
+
+    The rules are compiled once. normalize() memoizes up to memo_size names
+    (incoming names repeat across batches). normalize_many() is for cache
+    builds, where every name is new: it upper-cases and strips punctuation
+    from the whole list at once, then looks each word up in a table instead
+    of running the suffix pattern per name.
+    """
+
+    def __init__(self, suffixes: Sequence[str] = DEFAULT_SUFFIXES, abbreviations: Optional[Mapping[str, str]] = None, memo_size: int = MEMO_SIZE):
+        self.suffixes = tuple(suffixes)
+        self.abbreviations = {short.upper(): long.upper() for short, long in (abbreviations or {}).items()}
+        self._punctuation = re.compile("[" + re.escape(PUNCTUATION) + "]")
+        self._punctuation_table = str.maketrans(dict.fromkeys(PUNCTUATION, " "))
+        self._abbreviation = _words_pattern(self.abbreviations)
+        self._suffix = _words_pattern(self.suffixes)
+        # Words the rules change, and what they become: a whitespace-separated
+        # word matches a pattern only as a whole, so one lookup stands in for both
+        self._word_table: Dict[str, Tuple[str, ...]] = {
+            word: tuple(self._apply_patterns(word).split())
+            for word in {word.upper() for word in self.suffixes} | set(self.abbreviations)
+        }
+        self._memo = lru_cache(maxsize=memo_size)(self._normalize)
+
+    def _apply_patterns(self, text: str) -> str:
+        if self._abbreviation:
+            text = self._abbreviation.sub(lambda m: self.abbreviations[m.group()], text)
+        if self._suffix:
+            text = self._suffix.sub("", text)
+        return text
+
+    def _normalize(self, name: Optional[str]) -> str:
+        if not name:
+            return ""
+        return " ".join(self._apply_patterns(self._punctuation.sub(" ", name.upper())).split())
+
+    def _normalize_words(self, text: str) -> str:
+        words: List[str] = []
+        for word in text.split():
+            replacement = self._word_table.get(word)
+            if replacement is not None:
+                words.extend(replacement)
+            elif word.isalnum():
+                words.append(word)
+            else:
+                # Apostrophes and the like make word boundaries inside a word
+                words.extend(self._apply_patterns(word).split())
+        return " ".join(words)
+
+    def normalize(self, name: Optional[str]) -> str:
+        return self._memo(name)
+
+    def normalize_many(self, names: Sequence[Optional[str]]) -> List[str]:
+        """Normalizes names in order, bypassing the memo."""
+        if not names:
+            return []
+        text = _BATCH_SEPARATOR.join([name or "" for name in names])
+        if text.count(_BATCH_SEPARATOR) != len(names) - 1:
+            return [self._normalize(name) for name in names]
+        text = text.upper().translate(self._punctuation_table)
+        return [self._normalize_words(part) for part in text.split(_BATCH_SEPARATOR)]
+
+    def metrics(self) -> Dict[str, int]:
+        info = self._memo.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
@@ -7,14 +7,22 @@ from psycopg2.extras import RealDictCursor
 # Correct imports for Lambda environment
 from entity_resolver import (
     get_db_connection, 
-    process_prime_award, 
-    process_sub_award
+    process_prime_awards,
+    process_sub_award,
+    vendor_keys,
+    flush_cache_writes,
+    prefetch_agencies,
+    VendorResolutionMemo,
+    RESOLUTION_METRICS
 )
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Records whose vendors are resolved together with resolve_vendors_batch
+RESOLVE_CHUNK_SIZE = 500
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Reprocesses all archived contracts from raw_contracts table.
@@ -23,6 +31,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     limit = event.get('limit', 5000)
     
     conn = get_db_connection()
+    # Resolution commits the vendors and agencies it creates as it goes;
+    # process_prime_awards writes each chunk in a single transaction
     conn.autocommit = True
 
     processed_count = 0
@@ -41,15 +51,18 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             raw_records = cur.fetchall()
             logger.info(f"Reprocessing {len(raw_records)} prime records...")
             
-            for record in raw_records:
-                payload = record['raw_payload']
+            vendor_memo = VendorResolutionMemo()
+            for chunk_start in range(0, len(raw_records), RESOLVE_CHUNK_SIZE):
                 # The payload in raw_contracts is the "data" portion of our new SQS message
                 # or the old direct payload. process_prime_award handles it.
-                success = process_prime_award(payload, conn)
-                processed_count += success
-                
-                if processed_count % 100 == 0:
-                    logger.info(f"Progress: {processed_count} prime contracts reprocessed.")
+                payloads = [record['raw_payload'] for record in
+                            raw_records[chunk_start:chunk_start + RESOLVE_CHUNK_SIZE]]
+                vendor_memo.prefetch(vendor_keys(payloads, []), conn)
+                prefetch_agencies(payloads, conn)
+
+                processed_count += process_prime_awards(payloads, conn, vendor_memo=vendor_memo)
+                logger.info(f"Progress: {processed_count} prime contracts reprocessed.")
+            logger.info(f"METRICS: vendor_memo {json.dumps(vendor_memo.metrics())}")
 
             # 2. Note on Sub-Awards: 
             # In our current setup, sub-awards were NOT being archived in raw_contracts 
@@ -63,4 +76,6 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             "body": json.dumps({"reprocessed_prime": processed_count})
         }
     finally:
+        flush_cache_writes()
+        RESOLUTION_METRICS.flush()
         conn.close()
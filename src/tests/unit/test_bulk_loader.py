@@ -0,0 +1,159 @@
+import csv
+import gzip
+import io
+import json
+import zipfile
+import pytest
+from src.ingestion.bulk_loader import (
+    iter_bulk_records, iter_bulk_pages, load_bulk_files, export_bulk_files
+)
+
+PRIME_HEADER = [
+    "contract_award_unique_key", "award_id_piid", "total_obligated_amount",
+    "awarding_agency_code", "awarding_agency_name", "awarding_sub_agency_code",
+    "awarding_sub_agency_name", "funding_agency_code", "funding_agency_name",
+    "funding_sub_agency_code", "funding_sub_agency_name", "recipient_uei",
+    "recipient_duns", "recipient_name", "period_of_performance_start_date",
+    "period_of_performance_current_end_date", "award_type", "idv_type",
+    "prime_award_base_transaction_description",
+]
+
+SUB_HEADER = [
+    "prime_award_unique_key", "prime_award_piid", "prime_awardee_uei", "prime_awardee_name",
+    "prime_award_awarding_agency_code", "prime_award_awarding_agency_name",
+    "prime_award_awarding_sub_agency_code", "prime_award_awarding_sub_agency_name",
+    "subaward_number", "subaward_amount", "subaward_action_date", "subawardee_uei",
+    "subawardee_duns", "subawardee_name", "subaward_description",
+]
+
+
+def _csv_bytes(header, rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=header)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _prime_row(i, **overrides):
+    row = {
+        "contract_award_unique_key": f"CONT_AWD_{i}", "award_id_piid": f"PIID{i}",
+        "total_obligated_amount": "1500.25", "awarding_agency_code": "097",
+        "awarding_agency_name": "Department of Defense", "awarding_sub_agency_code": "5700",
+        "awarding_sub_agency_name": "Department of the Air Force", "funding_agency_code": "097",
+        "funding_agency_name": "Department of Defense", "funding_sub_agency_code": "5700",
+        "funding_sub_agency_name": "Department of the Air Force", "recipient_uei": f"UEI{i}",
+        "recipient_duns": "", "recipient_name": f"VENDOR {i} LLC",
+        "period_of_performance_start_date": "2020-01-15",
+        "period_of_performance_current_end_date": "2021-01-14",
+        "award_type": "DEFINITIVE CONTRACT", "idv_type": "",
+        "prime_award_base_transaction_description": "WIDGETS",
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def bulk_zip(tmp_path):
+    path = tmp_path / "FY2020_All_Contracts_Full.zip"
+    subs = [{
+        "prime_award_unique_key": "CONT_AWD_0", "prime_award_piid": "PIID0",
+        "prime_awardee_uei": "UEI0", "prime_awardee_name": "VENDOR 0 LLC",
+        "prime_award_awarding_agency_code": "097",
+        "prime_award_awarding_agency_name": "Department of Defense",
+        "prime_award_awarding_sub_agency_code": "5700",
+        "prime_award_awarding_sub_agency_name": "Department of the Air Force",
+        "subaward_number": "SUB-1", "subaward_amount": "200", "subaward_action_date": "2020-03-01",
+        "subawardee_uei": "SUBUEI", "subawardee_duns": "123", "subawardee_name": "SUB CO",
+        "subaward_description": "PARTS",
+    }]
+    primes = [_prime_row(i) for i in range(250)]
+    primes.append(_prime_row(250, award_id_piid="", award_type="", idv_type="IDV"))  # no id: skipped
+    primes.append(_prime_row(251, award_type="", idv_type="BPA"))
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("Contracts_PrimeAwardSummaries_1.csv", _csv_bytes(PRIME_HEADER, primes))
+        archive.writestr("Contracts_Subawards_1.csv", _csv_bytes(SUB_HEADER, subs))
+        archive.writestr("README.txt", "ignored")
+    return str(path)
+
+
+def test_iter_bulk_records_maps_to_api_shape(bulk_zip):
+    records = list(iter_bulk_records(bulk_zip))
+
+    primes = [r for t, r in records if t == "prime"]
+    subs = [r for t, r in records if t == "subaward"]
+    assert len(primes) == 251
+    assert primes[0] == {
+        "Award ID": "PIID0", "Recipient Name": "VENDOR 0 LLC", "Award Amount": 1500.25,
+        "Awarding Agency": "Department of Defense", "Awarding Agency Code": "097",
+        "Awarding Sub Agency": "Department of the Air Force", "Awarding Sub Agency Code": "5700",
+        "Funding Agency": "Department of Defense", "Funding Agency Code": "097",
+        "Funding Sub Agency": "Department of the Air Force", "Funding Sub Agency Code": "5700",
+        "Start Date": "2020-01-15", "End Date": "2021-01-14",
+        "Contract Award Type": "DEFINITIVE CONTRACT", "Recipient UEI": "UEI0",
+        "Recipient DUNS": None, "Description": "WIDGETS",
+    }
+    assert primes[-1]["Contract Award Type"] == "BPA"
+    assert subs == [{
+        "Sub-Award ID": "SUB-1", "Sub-Awardee Name": "SUB CO", "Sub-Award Amount": 200.0,
+        "Sub-Award Date": "2020-03-01", "Sub-Award Description": "PARTS",
+        "Sub-Recipient UEI": "SUBUEI", "Sub-Recipient DUNS": "123", "Prime Award ID": "PIID0",
+        "Prime Recipient Name": "VENDOR 0 LLC", "Prime Award Recipient UEI": "UEI0",
+        "Awarding Agency": "Department of Defense", "Awarding Agency Code": "097",
+        "Awarding Sub Agency": "Department of the Air Force", "Awarding Sub Agency Code": "5700",
+    }]
+
+
+def test_iter_bulk_records_reads_plain_csv(tmp_path):
+    path = tmp_path / "primes.csv"
+    path.write_bytes(_csv_bytes(PRIME_HEADER, [_prime_row(1)]))
+
+    assert [r["Award ID"] for _, r in iter_bulk_records(str(path))] == ["PIID1"]
+
+
+def test_iter_bulk_records_is_lazy(bulk_zip):
+    records = iter_bulk_records(bulk_zip)
+    first_type, first = next(records)
+    assert first_type == "prime"
+    assert first["Award ID"] == "PIID0"
+    records.close()
+
+
+def test_iter_bulk_pages_groups_by_type(bulk_zip):
+    pages = list(iter_bulk_pages(bulk_zip, page_size=100))
+
+    assert [(t, len(p)) for t, p in pages] == [("prime", 100), ("prime", 100), ("prime", 51), ("subaward", 1)]
+
+
+def test_iter_bulk_pages_skips_other_types(bulk_zip):
+    pages = list(iter_bulk_pages(bulk_zip, only_type="subaward"))
+
+    assert [(t, len(p)) for t, p in pages] == [("subaward", 1)]
+
+
+def test_load_bulk_files_feeds_pipeline(mocker, bulk_zip):
+    mock_ingest = mocker.patch('src.ingestion.bulk_loader.ingest_stream',
+                               side_effect=lambda pages, archive, data_type: sum(len(p) for p in pages))
+    mock_archive = mocker.patch('src.ingestion.bulk_loader.ArchiveWriter')
+
+    counts = load_bulk_files([bulk_zip])
+
+    assert counts == {"prime": 251, "subaward": 1}
+    # One stream per type, so pages are grouped and packed across the file
+    assert [c.args[2] for c in mock_ingest.call_args_list] == ["prime", "subaward"]
+    prefixes = sorted(c.args[0] for c in mock_archive.call_args_list)
+    assert prefixes == ["bulk/FY2020_All_Contracts_Full/prime", "bulk/FY2020_All_Contracts_Full/subaward"]
+    assert mock_archive.return_value.close.call_count == 2
+
+
+def test_export_bulk_files_offline(tmp_path, bulk_zip):
+    output = tmp_path / "out.ndjson.gz"
+
+    counts = export_bulk_files([bulk_zip], str(output))
+
+    assert counts == {"prime": 251, "subaward": 1}
+    with gzip.open(output, "rt") as f:
+        lines = [json.loads(line) for line in f]
+    assert lines[0] == {"type": "prime", "data": next(iter_bulk_records(bulk_zip))[1]}
+    assert lines[-1]["type"] == "subaward"
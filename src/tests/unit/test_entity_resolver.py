@@ -1,9 +1,12 @@
 import json
 import os
 import uuid
+import boto3
 import pytest
+from moto import mock_aws
 from unittest.mock import MagicMock, patch
-from src.processing.entity_resolver import resolve_vendor, get_sam_entity
+import src.processing.entity_resolver as er
+from src.processing.entity_resolver import resolve_vendor, get_sam_entity, ResolutionCache, ResolutionMetrics
 
 
 @pytest.fixture
@@ -13,6 +16,28 @@ def mock_conn():
     return conn, cur
 
 
+@pytest.fixture(autouse=True)
+def fresh_resolution_state(mocker):
+    mocker.patch.object(er, 'RESOLUTION_CACHE', ResolutionCache())
+    mocker.patch.object(er, 'RESOLUTION_METRICS', ResolutionMetrics())
+
+
+@pytest.fixture
+def cache_table(mocker):
+    """A local DynamoDB (moto) entity cache table behind get_cache_table."""
+    with mock_aws():
+        resource = boto3.resource('dynamodb', region_name='us-east-1')
+        table = resource.create_table(
+            TableName='entity-cache-test',
+            KeySchema=[{'AttributeName': 'vendor_name', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'vendor_name', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST',
+        )
+        mocker.patch.object(er, 'dynamodb', resource)
+        mocker.patch.object(er, 'cache_table', table)
+        yield table
+
+
 def test_get_sam_entity_success(mocker):
     # Mock secrets and requests
     mock_get_secret = mocker.patch('src.processing.entity_resolver.get_secret')
@@ -166,3 +191,458 @@ def test_resolve_vendor_fuzzy_match(mocker, mock_conn):
     
     # Total 3 DB calls (ID check, Name check, Matched name lookup)
     assert cur.fetchone.call_count == 3
+
+
+def test_contract_content_hash_ignores_key_order_and_padding():
+    from src.processing.entity_resolver import contract_content_hash
+    a = {'Award ID': 'A1', 'Recipient Name': 'ACME ', 'Award Amount': 10}
+    b = {'Award Amount': 10, 'Recipient Name': 'ACME', 'Award ID': 'A1'}
+    c = {'Award Amount': 11, 'Recipient Name': 'ACME', 'Award ID': 'A1'}
+
+    assert contract_content_hash(a) == contract_content_hash(b)
+    assert contract_content_hash(a) != contract_content_hash(c)
+
+
+def test_filter_unchanged_primes_drops_processed_duplicates(mocker, mock_conn):
+    from src.processing.entity_resolver import filter_unchanged_primes, contract_content_hash
+    conn, cur = mock_conn
+    unchanged = {'Award ID': 'A1', 'Award Amount': 10}
+    changed = {'Award ID': 'A2', 'Award Amount': 99}
+    new = {'Award ID': 'A3', 'Award Amount': 5}
+    cur.fetchall.return_value = [
+        ('A1', contract_content_hash(unchanged)),
+        ('A2', contract_content_hash({'Award ID': 'A2', 'Award Amount': 20})),
+    ]
+
+    hash_spy = mocker.patch('src.processing.entity_resolver.contract_content_hash',
+                            side_effect=contract_content_hash)
+
+    result = filter_unchanged_primes([unchanged, changed, new, dict(new)], conn)
+
+    assert result == [changed, new]
+    # Each record is hashed once
+    assert hash_spy.call_count == 4
+    # One lookup for the whole batch
+    assert cur.execute.call_count == 1
+    sql, params = cur.execute.call_args.args
+    assert 'ANY(%s)' in sql
+    assert sorted(params[0]) == ['A1', 'A2', 'A3']
+
+
+def test_resolve_vendors_batch_runs_each_tier_once(mocker, mock_conn, cache_table):
+    from src.processing.entity_resolver import resolve_vendors_batch
+    conn, cur = mock_conn
+    cache_table.put_item(Item={'vendor_name': 'Cached', 'vendor_id': 'uuid-cache',
+                               'canonical_name': 'CACHED CORP', 'confidence': '0.9'})
+    batch_get = mocker.spy(er.dynamodb, 'batch_get_item')
+    mock_local = mocker.patch('src.processing.entity_resolver._resolve_vendor_local', return_value=None)
+    mocker.patch('src.processing.entity_resolver.sam_index_loaded', return_value=False)
+    mock_llm = mocker.patch('src.processing.entity_resolver.call_bedrock_standardization_batch',
+                            return_value={'Unknown': 'NEW CORP'})
+    mock_create = mocker.patch('src.processing.entity_resolver._create_llm_vendor',
+                               return_value=('uuid-llm', 'NEW CORP', 'LLM_RESOLUTION', 0.95))
+    mocker.patch('src.processing.entity_resolver.get_vendor_directory', return_value=None)
+    cur.fetchall.side_effect = [
+        [{'id': 'uuid-cache'}],
+        [{'id': 'uuid-uei', 'canonical_name': 'UEI CORP', 'duns': None, 'uei': 'UEI1'}],
+        [{'id': 'uuid-name', 'canonical_name': 'NAMED CORP'}],
+    ]
+    keys = [('Cached', None, None), ('Messy', None, 'UEI1'), ('NAMED CORP', None, None),
+            ('Messy', None, 'UEI1'), ('Unknown', None, None), ('Cached', None, None)]
+
+    resolved = resolve_vendors_batch(keys, conn)
+
+    assert resolved == {
+        ('Cached', None, None): ('uuid-cache', 'CACHED CORP', 'CACHE_MATCH', 0.9),
+        ('Messy', None, 'UEI1'): ('uuid-uei', 'UEI CORP', 'DUNS_UEI_MATCH', 1.0),
+        ('NAMED CORP', None, None): ('uuid-name', 'NAMED CORP', 'EXACT_NAME_MATCH', 1.0),
+        ('Unknown', None, None): ('uuid-llm', 'NEW CORP', 'LLM_RESOLUTION', 0.95),
+    }
+    # One cache read for all distinct names, one query per tier, fallback only for the leftover key
+    assert batch_get.call_count == 1
+    assert len(batch_get.call_args.kwargs['RequestItems']['entity-cache-test']['Keys']) == 4
+    assert cur.execute.call_count == 3
+    assert all('ANY(' in c.args[0] for c in cur.execute.call_args_list)
+    assert cur.execute.call_args_list[1].args[1] == ([], ['UEI1'])
+    assert sorted(cur.execute.call_args_list[2].args[1][0]) == ['NAMED CORP', 'Unknown']
+    mock_local.assert_called_once_with('Unknown', None, None, conn, sam_entities=None)
+    assert list(mock_llm.call_args.args[0]) == ['Unknown']
+    mock_create.assert_called_once_with('Unknown', None, None, 'NEW CORP', conn)
+
+
+def test_resolve_vendors_batch_ignores_stale_cache_entries(mocker, mock_conn):
+    from src.processing.entity_resolver import resolve_vendors_batch
+    conn, cur = mock_conn
+    mocker.patch('src.processing.entity_resolver.get_cache_table',
+                 return_value=MagicMock(**{'get_item.return_value': {
+                     'Item': {'vendor_id': 'uuid-deleted', 'canonical_name': 'GONE CORP'}}}))
+    mocker.patch('src.processing.entity_resolver._resolve_vendor_local', return_value=None)
+    mocker.patch('src.processing.entity_resolver.call_bedrock_standardization_batch',
+                 return_value={'Gone': 'GONE CORP'})
+    mocker.patch('src.processing.entity_resolver._create_llm_vendor',
+                 return_value=(None, 'GONE CORP', 'LLM_RESOLUTION_FAILED', 0.0))
+    mocker.patch('src.processing.entity_resolver.get_vendor_directory', return_value=None)
+    cur.fetchall.side_effect = [[], []]
+
+    resolved = resolve_vendors_batch([('Gone', None, None)], conn)
+
+    assert resolved[('Gone', None, None)][2] == 'LLM_RESOLUTION_FAILED'
+    assert resolve_vendors_batch([], conn) == {}
+
+
+def test_resolve_vendors_batch_never_creates_nameless_vendors(mocker, mock_conn):
+    from src.processing.entity_resolver import resolve_vendors_batch
+    conn, cur = mock_conn
+    mocker.patch('src.processing.entity_resolver.sam_index_loaded', return_value=False)
+    mocker.patch('src.processing.entity_resolver.get_cache_table',
+                 return_value=MagicMock(**{'get_item.return_value': {}}))
+    mocker.patch('src.processing.entity_resolver._resolve_vendor_local', return_value=None)
+    mock_llm = mocker.patch('src.processing.entity_resolver.call_bedrock_standardization_batch',
+                            return_value={'Unknown': 'NEW CORP'})
+    mock_create = mocker.patch('src.processing.entity_resolver._create_llm_vendor',
+                               return_value=('uuid-llm', 'NEW CORP', 'LLM_RESOLUTION', 0.95))
+    mocker.patch('src.processing.entity_resolver.get_vendor_directory', return_value=None)
+    cur.fetchall.side_effect = [[], []]
+
+    resolved = resolve_vendors_batch([(None, 'DUNS1', None), ('', None, None), ('Unknown', None, None)], conn)
+
+    assert resolved[(None, 'DUNS1', None)] == (None, None, 'LLM_RESOLUTION_FAILED', 0.0)
+    assert resolved[('', None, None)] == (None, None, 'LLM_RESOLUTION_FAILED', 0.0)
+    assert list(mock_llm.call_args.args[0]) == ['Unknown']
+    mock_create.assert_called_once_with('Unknown', None, None, 'NEW CORP', conn)
+
+
+def test_resolve_vendor_fallback_skips_llm_without_a_name(mocker, mock_conn):
+    from src.processing.entity_resolver import _resolve_vendor_fallback
+    conn, _ = mock_conn
+    mocker.patch('src.processing.entity_resolver._resolve_vendor_local', return_value=None)
+    mock_llm = mocker.patch('src.processing.entity_resolver.call_bedrock_standardization_with_retry')
+
+    assert _resolve_vendor_fallback(None, 'DUNS1', None, conn) == (None, None, 'LLM_RESOLUTION_FAILED', 0.0)
+    mock_llm.assert_not_called()
+
+
+def test_refresh_canonical_names_cache_applies_deltas(mocker, mock_conn):
+    import src.processing.entity_resolver as er
+    from datetime import datetime, timedelta
+    conn, cur = mock_conn
+    mocker.patch.object(er, 'CANONICAL_NAMES_CACHE', None)
+    mocker.patch.object(er, 'CACHE_EXPIRY', None)
+    mock_now = mocker.patch.object(er, 'datetime', wraps=datetime)
+    base = datetime(2024, 1, 1, 12, 0)
+    mark = datetime(2024, 1, 1, 11, 0)
+
+    # Full load
+    mock_now.now.return_value = base
+    cur.fetchall.return_value = [("uuid-acme", "ACME CORPORATION", None, None, mark),
+                                 ("uuid-globex", "GLOBEX LLC", None, None, mark - timedelta(days=1))]
+    names, normalized = er.refresh_canonical_names_cache(conn)
+    assert names == ["ACME CORPORATION", "GLOBEX LLC"]
+    assert cur.execute.call_args.args == ("SELECT id, canonical_name, duns, uei, updated_at FROM vendors",)
+
+    # Within the delta interval nothing is queried
+    mock_now.now.return_value = base + timedelta(minutes=1)
+    er.refresh_canonical_names_cache(conn)
+    assert cur.execute.call_count == 1
+
+    # Delta: only changed vendors, new names appended to every structure
+    mock_now.now.return_value = base + timedelta(minutes=10)
+    newer = mark + timedelta(minutes=30)
+    cur.fetchall.return_value = [("uuid-acme", "ACME CORPORATION", None, "ACMEUEI00001", mark),
+                                 ("uuid-initech", "INITECH INC", None, None, newer)]
+    names, normalized = er.refresh_canonical_names_cache(conn)
+    sql, params = cur.execute.call_args.args
+    assert "WHERE updated_at > %s" in sql
+    assert params == (mark - er.CACHE_DELTA_OVERLAP,)
+    assert names == ["ACME CORPORATION", "GLOBEX LLC", "INITECH INC"]
+    assert normalized["INITECH"] == "INITECH INC"
+    assert er.FUZZY_INDEX.extract_one("Initech Incorporated")[0] == "INITECH INC"
+    assert er.CACHE_HIGH_WATER == newer
+    # Changed identifiers of a known vendor reach the directory too
+    assert er.VENDOR_DIRECTORY.find_identifier(uei="ACMEUEI00001") == ("uuid-acme", "ACME CORPORATION")
+
+    # Full reload once the long interval passes
+    mock_now.now.return_value = base + er.CACHE_FULL_RELOAD_INTERVAL + timedelta(minutes=1)
+    cur.fetchall.return_value = [("uuid-initech", "INITECH INC", None, None, newer)]
+    names, _ = er.refresh_canonical_names_cache(conn)
+    assert names == ["INITECH INC"]
+    assert cur.execute.call_args.args == ("SELECT id, canonical_name, duns, uei, updated_at FROM vendors",)
+    assert er.VENDOR_DIRECTORY.id_for_name("ACME CORPORATION") is None
+
+
+@pytest.fixture
+def loaded_directory(mocker, mock_conn):
+    import src.processing.entity_resolver as er
+    from datetime import datetime
+    conn, cur = mock_conn
+    mocker.patch.object(er, 'CANONICAL_NAMES_CACHE', None)
+    mocker.patch.object(er, 'VENDOR_DIRECTORY', None)
+    mocker.patch.object(er, 'CACHE_EXPIRY', None)
+    mocker.patch.object(er, 'VENDOR_INDEX_S3_URI', None)
+    mocker.patch.object(er, 'VENDOR_INDEX_PATH', '/nonexistent/vendor_names.idx')
+    mocker.patch('src.processing.entity_resolver.get_cache_table',
+                 return_value=MagicMock(**{'get_item.return_value': {}}))
+    mocker.patch('src.processing.entity_resolver.get_sam_entity', return_value=None)
+    mocker.patch('src.processing.entity_resolver.update_cache')
+    cur.fetchall.return_value = [
+        ("uuid-acme", "ACME CORPORATION", "123456789", "ACMEUEI00001", datetime(2024, 1, 1)),
+        ("uuid-globex", "GLOBEX LLC", None, None, datetime(2024, 1, 2)),
+    ]
+    er.refresh_canonical_names_cache(conn)
+    cur.execute.reset_mock()
+    cur.fetchone.return_value = None
+    return conn, cur
+
+
+def test_vendor_directory_answers_matches_without_queries(loaded_directory):
+    conn, cur = loaded_directory
+
+    assert resolve_vendor("Acme Corp", uei="ACMEUEI00001", conn=conn)[:3] == \
+        ("uuid-acme", "ACME CORPORATION", "DUNS_UEI_MATCH")
+    assert resolve_vendor("Whatever", duns="123456789", conn=conn)[0] == "uuid-acme"
+    assert resolve_vendor("GLOBEX LLC", conn=conn)[:3] == ("uuid-globex", "GLOBEX LLC", "EXACT_NAME_MATCH")
+    assert cur.execute.call_count == 0
+
+    # Normalized and fuzzy matches only cost the exact-name miss, not an id lookup
+    assert resolve_vendor("Globex LLC.", conn=conn)[:3] == ("uuid-globex", "GLOBEX LLC", "NORMALIZED_EXACT_MATCH")
+    assert resolve_vendor("ACME CORPORATOIN", conn=conn)[:3] == ("uuid-acme", "ACME CORPORATION", "FUZZY_MATCH")
+    assert cur.execute.call_count == 2
+    assert all("canonical_name = %s" in c.args[0] for c in cur.execute.call_args_list)
+
+
+def test_vendor_directory_learns_vendors_this_process_creates(mocker, loaded_directory):
+    import src.processing.entity_resolver as er
+    conn, cur = loaded_directory
+    mocker.patch('src.processing.entity_resolver.call_bedrock_standardization_with_retry',
+                 return_value='INITECH INCORPORATED')
+    cur.fetchone.side_effect = [None, None, {'id': 'uuid-initech'}]
+
+    assert resolve_vendor("Initech", conn=conn)[:3] == ("uuid-initech", "INITECH INCORPORATED", "LLM_RESOLUTION")
+    cur.execute.reset_mock()
+
+    assert resolve_vendor("INITECH INCORPORATED", conn=conn)[2] == "EXACT_NAME_MATCH"
+    assert er.FUZZY_INDEX.extract_one("Initech Incorporatd")[0] == "INITECH INCORPORATED"
+    assert cur.execute.call_count == 0
+
+
+def test_resolve_vendors_batch_uses_vendor_directory(loaded_directory):
+    from src.processing.entity_resolver import resolve_vendors_batch
+    conn, cur = loaded_directory
+
+    resolved = resolve_vendors_batch([("Acme", "123456789", None), ("GLOBEX LLC", None, None)], conn)
+
+    assert resolved == {
+        ("Acme", "123456789", None): ("uuid-acme", "ACME CORPORATION", "DUNS_UEI_MATCH", 1.0),
+        ("GLOBEX LLC", None, None): ("uuid-globex", "GLOBEX LLC", "EXACT_NAME_MATCH", 1.0),
+    }
+    assert cur.execute.call_count == 0
+
+
+def test_resolution_cache_serves_repeats_in_process(mocker, cache_table):
+    cache_table.put_item(Item={'vendor_name': 'Acme', 'vendor_id': 'uuid-acme',
+                               'canonical_name': 'ACME CORPORATION', 'confidence': '0.9'})
+    get_item = mocker.spy(cache_table, 'get_item')
+    batch_get = mocker.spy(er.dynamodb, 'batch_get_item')
+    cache = ResolutionCache(max_size=10, ttl_seconds=60)
+
+    assert cache.get('Acme')['vendor_id'] == 'uuid-acme'
+    assert cache.get('Acme')['vendor_id'] == 'uuid-acme'
+    assert cache.get('Nobody') is None
+    assert cache.get('Nobody') is None
+    # Names already seen, hits or misses, are not fetched again
+    assert cache.get_many(['Acme', 'Nobody']) == {'Acme': cache.get('Acme')}
+    assert get_item.call_count == 2
+    assert batch_get.call_count == 0
+    assert cache.metrics()['hits'] == 5
+
+    # Expired entries go back to DynamoDB
+    mocker.patch('src.processing.entity_resolver.time.monotonic', return_value=10 ** 9)
+    cache.get('Acme')
+    assert get_item.call_count == 3
+
+
+def test_resolution_cache_is_bounded_lru():
+    cache = ResolutionCache(max_size=2, ttl_seconds=60)
+    for name in ('A', 'B'):
+        cache._store(name, {'vendor_name': name})
+    cache._lookup('A')
+    cache._store('C', {'vendor_name': 'C'})
+
+    assert list(cache._entries) == ['A', 'C']
+
+
+def test_resolution_cache_batches_reads_and_writes(mocker, cache_table):
+    names = [f'Vendor {i}' for i in range(250)]
+    with cache_table.batch_writer() as batch:
+        for i, name in enumerate(names[:120]):
+            batch.put_item(Item={'vendor_name': name, 'vendor_id': f'uuid-{i}', 'canonical_name': name.upper()})
+    batch_get = mocker.spy(er.dynamodb, 'batch_get_item')
+    cache = ResolutionCache()
+
+    items = cache.get_many(names + names[:10])
+
+    assert len(items) == 120 and items['Vendor 7']['vendor_id'] == 'uuid-7'
+    assert batch_get.call_count == 3  # 100 keys per request
+
+    # Writes are queued, deduplicated per name and sent on flush
+    batch_writer = mocker.spy(cache_table, 'batch_writer')
+    for confidence in ('0.9', '0.95'):
+        cache.put({'vendor_name': 'Vendor 200', 'vendor_id': 'uuid-200',
+                   'canonical_name': 'VENDOR 200', 'confidence': confidence})
+    assert cache.get_many(['Vendor 200'])['Vendor 200']['confidence'] == '0.95'
+    assert 'Item' not in cache_table.get_item(Key={'vendor_name': 'Vendor 200'})
+    cache.flush()
+    cache.flush()
+    assert batch_writer.call_count == 1
+    assert cache_table.get_item(Key={'vendor_name': 'Vendor 200'})['Item']['confidence'] == '0.95'
+    assert cache.metrics()['dynamodb_writes'] == 1
+
+
+def test_resolution_cache_retries_unprocessed_keys(mocker, cache_table):
+    cache_table.put_item(Item={'vendor_name': 'B', 'vendor_id': 'uuid-b', 'canonical_name': 'B'})
+    mocker.patch('src.processing.entity_resolver.time.sleep')
+    real_batch_get = er.dynamodb.batch_get_item
+    responses = [{'Responses': {'entity-cache-test': []},
+                  'UnprocessedKeys': {'entity-cache-test': {'Keys': [{'vendor_name': 'B'}]}}}]
+    mocker.patch.object(er.dynamodb, 'batch_get_item',
+                        side_effect=lambda **kw: responses.pop() if responses else real_batch_get(**kw))
+    cache = ResolutionCache()
+
+    assert cache.get_many(['A', 'B']) == {'B': cache_table.get_item(Key={'vendor_name': 'B'})['Item']}
+    assert er.dynamodb.batch_get_item.call_count == 2
+
+
+def test_update_cache_is_written_when_handler_finishes(mocker, cache_table):
+    from src.processing.entity_resolver import update_cache, lambda_handler
+    mocker.patch('src.processing.entity_resolver.get_db_connection')
+    mocker.patch('src.processing.entity_resolver.filter_unchanged_primes',
+                 side_effect=lambda primes, conn: primes)
+    mocker.patch('src.processing.entity_resolver.resolve_vendors_batch', return_value={})
+    mocker.patch('src.processing.entity_resolver.prepare_prime_awards',
+                 side_effect=lambda *a, **kw: update_cache('Acme', 'ACME CORPORATION', 'uuid-acme', 0.95) or [])
+
+    flush_metrics = mocker.patch.object(er.RESOLUTION_METRICS, 'flush')
+
+    lambda_handler({'Records': [{'body': json.dumps({'type': 'prime', 'data': {'Award ID': 'A1'}})}]}, None)
+
+    item = cache_table.get_item(Key={'vendor_name': 'Acme'})['Item']
+    assert item['vendor_id'] == 'uuid-acme' and item['confidence'] == '0.95'
+    flush_metrics.assert_called_once()
+
+
+def _bedrock_reply(text):
+    body = MagicMock()
+    body.read.return_value = json.dumps({'content': [{'text': text}]}).encode()
+    return {'body': body}
+
+
+def test_bedrock_batch_standardizes_many_names_in_one_call(mocker):
+    from src.processing.entity_resolver import call_bedrock_standardization_batch
+    client = mocker.patch('src.processing.entity_resolver.get_bedrock_client').return_value
+    client.invoke_model.return_value = _bedrock_reply(
+        '"1": "Acme Corporation", "2": "Globex Limited Liability Company", "3": "Initech Incorporated"}')
+
+    result = call_bedrock_standardization_batch(['acme corp', 'globex llc', 'acme corp', 'initech inc'])
+
+    assert result == {'acme corp': 'Acme Corporation', 'globex llc': 'Globex Limited Liability Company',
+                      'initech inc': 'Initech Incorporated'}
+    assert client.invoke_model.call_count == 1
+    request = json.loads(client.invoke_model.call_args.kwargs['body'])
+    assert '{"1": "acme corp", "2": "globex llc", "3": "initech inc"}' in request['messages'][0]['content']
+    assert request['messages'][1]['content'] == '{'
+
+
+def test_bedrock_batch_falls_back_per_item(mocker):
+    from src.processing.entity_resolver import call_bedrock_standardization_batch
+    mocker.patch.object(er, 'BEDROCK_BATCH_SIZE', 2)
+    client = mocker.patch('src.processing.entity_resolver.get_bedrock_client').return_value
+    client.invoke_model.side_effect = [
+        _bedrock_reply('"1": "Acme Corporation"}'),  # leaves out "2"
+        _bedrock_reply('Sorry, I cannot help with that'),  # not JSON
+    ]
+    single = mocker.patch('src.processing.entity_resolver.call_bedrock_standardization_with_retry',
+                          side_effect=lambda name, max_retries=3: name.upper())
+
+    result = call_bedrock_standardization_batch(['acme corp', 'globex llc', 'initech inc'])
+
+    assert result == {'acme corp': 'Acme Corporation', 'globex llc': 'GLOBEX LLC', 'initech inc': 'INITECH INC'}
+    assert [c.args[0] for c in single.call_args_list] == ['globex llc', 'initech inc']
+
+    # A failed call keeps the names, like the single-name call, without retrying each one
+    client.invoke_model.side_effect = RuntimeError("AccessDenied")
+    single.reset_mock()
+    assert call_bedrock_standardization_batch(['umbrella co']) == {'umbrella co': 'umbrella co'}
+    single.assert_not_called()
+
+
+def test_resolve_vendors_batch_sends_tier6_names_together(mocker, loaded_directory):
+    from src.processing.entity_resolver import resolve_vendors_batch
+    conn, cur = loaded_directory
+    mocker.patch('src.processing.entity_resolver.get_sam_entity', return_value=None)
+    client = mocker.patch('src.processing.entity_resolver.get_bedrock_client').return_value
+    client.invoke_model.return_value = _bedrock_reply('"1": "INITECH INCORPORATED", "2": "UMBRELLA CORPORATION"}')
+    cur.fetchall.return_value = []
+    cur.fetchone.side_effect = [None, {'id': 'uuid-initech'}, None, {'id': 'uuid-umbrella'}]
+
+    resolved = resolve_vendors_batch([('Initech', None, None), ('Umbrella', None, None),
+                                      ('GLOBEX LLC', None, None)], conn)
+
+    assert resolved[('Initech', None, None)] == ('uuid-initech', 'INITECH INCORPORATED', 'LLM_RESOLUTION', 0.95)
+    assert resolved[('Umbrella', None, None)] == ('uuid-umbrella', 'UMBRELLA CORPORATION', 'LLM_RESOLUTION', 0.95)
+    assert client.invoke_model.call_count == 1
+    metrics = er.RESOLUTION_METRICS.snapshot()
+    assert metrics['tiers']['llm'] == {'attempts': 2, 'hits': 2, 'hit_rate': 1.0,
+                                       'latency_ms': metrics['tiers']['llm']['latency_ms']}
+    assert metrics['external_calls']['bedrock'] == 1
+
+
+def test_resolution_metrics_record_each_tier(loaded_directory):
+    conn, _ = loaded_directory
+
+    resolve_vendor("Acme Corp", uei="ACMEUEI00001", conn=conn)
+    resolve_vendor("GLOBEX LLC", conn=conn)
+    resolve_vendor("Globex LLC.", conn=conn)
+    resolve_vendor("ACME CORPORATOIN", conn=conn)
+
+    metrics = er.RESOLUTION_METRICS.snapshot()
+    assert metrics['resolutions'] == 4
+    assert metrics['methods'] == {'DUNS_UEI_MATCH': 1, 'EXACT_NAME_MATCH': 1,
+                                  'NORMALIZED_EXACT_MATCH': 1, 'FUZZY_MATCH': 1}
+    assert {name: (tier['attempts'], tier['hits']) for name, tier in metrics['tiers'].items()} == {
+        'cache': (4, 0), 'id': (1, 1), 'exact_name': (3, 1), 'sam': (2, 0), 'normalized': (2, 1), 'fuzzy': (1, 1)}
+    assert metrics['tiers']['exact_name']['hit_rate'] == 0.333
+    assert all(tier['latency_ms'] >= 0 for tier in metrics['tiers'].values())
+    # One DynamoDB read per new name; the in-process cache answers repeats
+    assert metrics['external_calls'] == {'dynamodb': 4}
+
+
+def test_resolution_metrics_flush_once_as_embedded_metrics(loaded_directory, caplog):
+    from src.processing.entity_resolver import resolve_vendors_batch
+    conn, _ = loaded_directory
+    resolve_vendors_batch([("Acme", "123456789", None), ("GLOBEX LLC", None, None), ("Acme", "123456789", None)], conn)
+
+    caplog.clear()
+    er.metrics_logger.addHandler(caplog.handler)
+    try:
+        documents = er.RESOLUTION_METRICS.flush()
+    finally:
+        er.metrics_logger.removeHandler(caplog.handler)
+
+    # One bare JSON document per log event, kept out of the root logger
+    assert [json.loads(r.getMessage()) for r in caplog.records] == documents
+    assert {r.name for r in caplog.records} == {'govgraph.metrics'}
+    assert er.metrics_logger.handlers[0].format(caplog.records[0]) == caplog.records[0].getMessage()
+    overall, tiers, services = documents[0], documents[1:-1], documents[-1]
+    assert overall['Resolutions'] == 2
+    assert overall['Methods'] == {'DUNS_UEI_MATCH': 1, 'EXACT_NAME_MATCH': 1}
+    assert {doc['Tier']: (doc['Attempts'], doc['Hits']) for doc in tiers} == {
+        'cache': (2, 0), 'id': (1, 1), 'exact_name': (1, 1)}
+    assert services['Service'] == 'dynamodb' and services['Calls'] == 1
+    directive = tiers[0]['_aws']['CloudWatchMetrics'][0]
+    assert directive['Namespace'] == er.RESOLUTION_METRICS_NAMESPACE
+    assert directive['Dimensions'] == [['Tier']]
+    assert {m['Name'] for m in directive['Metrics']} == {'Attempts', 'Hits', 'LatencyMs'}
+
+    # Totals start over, and an idle invocation prints nothing
+    assert er.RESOLUTION_METRICS.snapshot()['resolutions'] == 0
+    assert er.RESOLUTION_METRICS.flush() == []
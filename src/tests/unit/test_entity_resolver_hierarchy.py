@@ -1,6 +1,10 @@
+import base64
+import gzip
 import json
+import threading
+import time
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import ANY, MagicMock, patch
 from src.processing.entity_resolver import lambda_handler
 
 @pytest.fixture
@@ -10,14 +14,27 @@ def mock_db_stuff(mocker):
     mocker.patch('src.processing.entity_resolver.get_db_connection', return_value=mock_conn)
     # Mock get_secret to avoid actual AWS call
     mocker.patch('src.processing.entity_resolver.get_secret', return_value={'username': 'user', 'password': 'pw'})
+    mocker.patch('src.processing.entity_resolver.resolve_vendors_batch', return_value={})
     return mock_conn
 
-def test_lambda_handler_routes_prime_and_sub(mocker, mock_db_stuff):
+def _count_records(contracts, conn, vendor_memo=None):
+    return len(contracts)
+
+@pytest.fixture
+def mock_prime_stages(mocker):
+    """prepare_prime_awards passes records through as rows; write_prime_awards counts them."""
+    prepare = mocker.patch('src.processing.entity_resolver.prepare_prime_awards',
+                           side_effect=lambda contracts, conn, vendor_memo=None: list(contracts))
+    write = mocker.patch('src.processing.entity_resolver.write_prime_awards',
+                         side_effect=lambda rows, conn: len(rows))
+    return prepare, write
+
+def test_lambda_handler_routes_prime_and_sub(mocker, mock_db_stuff, mock_prime_stages):
     mock_conn = mock_db_stuff
     
     # Mock the processors
-    mock_prime = mocker.patch('src.processing.entity_resolver.process_prime_award', return_value=1)
-    mock_sub = mocker.patch('src.processing.entity_resolver.process_sub_award', return_value=1)
+    mock_prime, mock_write = mock_prime_stages
+    mock_sub = mocker.patch('src.processing.entity_resolver.process_sub_awards', return_value=1)
     
     # Create a dummy event with one prime and one subaward
     event = {
@@ -44,8 +61,213 @@ def test_lambda_handler_routes_prime_and_sub(mocker, mock_db_stuff):
     assert mock_sub.call_count == 1
     
     # Verify data passed to processors
-    mock_prime.assert_called_with({'Award ID': 'PRIME1', 'Recipient Name': 'PRIME CORP'}, mock_conn)
-    mock_sub.assert_called_with({'Sub-Award ID': 'SUB1', 'Sub-Awardee Name': 'SUB CORP'}, mock_conn)
+    mock_prime.assert_called_with([{'Award ID': 'PRIME1', 'Recipient Name': 'PRIME CORP'}], mock_conn,
+                                  vendor_memo=ANY)
+    mock_write.assert_called_once_with([{'Award ID': 'PRIME1', 'Recipient Name': 'PRIME CORP'}], mock_conn)
+    mock_sub.assert_called_with([{'Sub-Award ID': 'SUB1', 'Sub-Awardee Name': 'SUB CORP'}], mock_conn,
+                                vendor_memo=ANY)
+    # One memo shared by the whole batch
+    assert mock_prime.call_args.kwargs['vendor_memo'] is mock_sub.call_args.kwargs['vendor_memo']
+
+def test_lambda_handler_unpacks_multi_record_messages(mocker, mock_db_stuff, mock_prime_stages):
+    mock_prime, mock_write = mock_prime_stages
+    mock_sub = mocker.patch('src.processing.entity_resolver.process_sub_awards', side_effect=_count_records)
+    records = [{'Award ID': f'PRIME{i}'} for i in range(3)]
+    compressed = [{'Award ID': f'GZIP{i}'} for i in range(3)]
+    packed = base64.b64encode(gzip.compress(json.dumps(compressed).encode())).decode()
+
+    event = {
+        'Records': [
+            {'body': json.dumps({'type': 'prime', 'count': 3, 'records': records})},
+            {'body': json.dumps({'type': 'prime', 'count': 3, 'encoding': 'gzip', 'payload': packed})},
+            {'body': json.dumps({'type': 'subaward', 'data': {'Sub-Award ID': 'SUB1'}})},
+        ]
+    }
+
+    response = lambda_handler(event, None)
+
+    assert json.loads(response['body'])['processed'] == 7
+    assert mock_sub.call_count == 1
+    # One batch per message; messages run concurrently, so in either order
+    batches = sorted([c['Award ID'] for c in call.args[0]] for call in mock_prime.call_args_list)
+    assert batches == [['GZIP0', 'GZIP1', 'GZIP2'], ['PRIME0', 'PRIME1', 'PRIME2']]
+    # ...and the whole batch is written at once
+    assert mock_write.call_count == 1 and len(mock_write.call_args.args[0]) == 6
+
+def test_lambda_handler_skips_unchanged_primes(mocker, mock_db_stuff, mock_prime_stages):
+    mock_prime, _ = mock_prime_stages
+    mocker.patch('src.processing.entity_resolver.filter_unchanged_primes',
+                 side_effect=lambda contracts, conn: contracts[1:])
+    records = [{'Award ID': 'SEEN'}, {'Award ID': 'NEW'}]
+
+    response = lambda_handler({'Records': [{'body': json.dumps({'type': 'prime', 'records': records})}]}, None)
+
+    body = json.loads(response['body'])
+    assert body == {'processed': 1, 'skipped_unchanged': 1}
+    mock_prime.assert_called_once_with([{'Award ID': 'NEW'}], mock_db_stuff, vendor_memo=ANY)
+
+def test_vendor_memo_resolves_repeated_vendors_once(mocker, mock_db_stuff):
+    mock_resolve = mocker.patch('src.processing.entity_resolver.resolve_vendor',
+                                side_effect=lambda name, duns, uei, conn: (f'id-{name}', name, 'EXACT', 1.0)
+                                if name != 'UNKNOWN' else (None, name, 'LLM_RESOLUTION_FAILED', 0.0))
+    from src.processing.entity_resolver import VendorResolutionMemo
+    memo = VendorResolutionMemo()
+
+    for name in ['ACME', 'ACME', 'GLOBEX', 'ACME', 'UNKNOWN', 'UNKNOWN']:
+        memo.resolve(name, conn=mock_db_stuff)
+    assert memo.resolve('ACME', uei='U1', conn=mock_db_stuff)[0] == 'id-ACME'
+
+    # Failures are retried; a different UEI is a different key
+    assert mock_resolve.call_count == 5
+    assert memo.metrics() == {'hits': 2, 'misses': 5, 'hit_rate': 0.286, 'vendors': 3, 'prefetched': 0}
+
+def test_lambda_handler_prefetches_batch_vendors(mocker, mock_db_stuff, mock_prime_stages):
+    mocker.patch('src.processing.entity_resolver.process_sub_awards', side_effect=_count_records)
+    mock_batch = mocker.patch('src.processing.entity_resolver.resolve_vendors_batch',
+                              return_value={('ACME', None, 'U1'): ('v-1', 'ACME', 'EXACT_NAME_MATCH', 1.0)})
+    primes = [{'Award ID': f'P{i}', 'Recipient Name': 'ACME', 'Recipient UEI': 'U1'} for i in range(3)]
+    subs = [{'Sub-Award ID': 'S1', 'Sub-Awardee Name': 'PARTS', 'Prime Recipient Name': 'ACME',
+             'Prime Award Recipient UEI': 'U1'}]
+    event = {'Records': [{'body': json.dumps({'type': 'prime', 'records': primes})},
+                         {'body': json.dumps({'type': 'subaward', 'records': subs})}]}
+
+    lambda_handler(event, None)
+
+    # One batched resolution for the distinct vendors of the whole batch
+    mock_batch.assert_called_once()
+    assert mock_batch.call_args.args[0] == [('ACME', None, 'U1'), ('PARTS', None, None)]
+
+def test_lambda_handler_survives_a_failed_batch_prefetch(mocker, mock_db_stuff, mock_prime_stages):
+    mocker.patch('src.processing.entity_resolver.resolve_vendors_batch',
+                 side_effect=RuntimeError('invalid input syntax for type uuid: "not-a-uuid"'))
+    mocker.patch('src.processing.entity_resolver.filter_unchanged_primes', side_effect=RuntimeError("connection reset"))
+    def prepare(contracts, conn, vendor_memo=None):
+        if any(c['Award ID'] == 'BAD' for c in contracts):
+            raise RuntimeError("duplicate key value violates unique constraint")
+        return contracts
+    mock_prime, _ = mock_prime_stages
+    mock_prime.side_effect = prepare
+    event = {'Records': [
+        {'messageId': 'm-ok', 'body': json.dumps({'type': 'prime', 'records': [{'Award ID': 'A1'}, {'Award ID': 'A2'}]})},
+        {'messageId': 'm-bad', 'body': json.dumps({'type': 'prime', 'records': [{'Award ID': 'BAD'}]})},
+    ]}
+
+    response = lambda_handler(event, None)
+
+    # Every prime is treated as changed and resolved per message
+    assert json.loads(response['body']) == {'processed': 2, 'skipped_unchanged': 0}
+    assert response['batchItemFailures'] == [{'itemIdentifier': 'm-bad'}]
+
+def test_lambda_handler_reports_failed_messages_only(mocker, mock_db_stuff, mock_prime_stages):
+    def prepare(contracts, conn, vendor_memo=None):
+        if any(c['Award ID'] == 'BAD' for c in contracts):
+            raise RuntimeError("deadlock detected")
+        return contracts
+    mock_prime, mock_write = mock_prime_stages
+    mock_prime.side_effect = prepare
+    mocker.patch('src.processing.entity_resolver.process_sub_awards', side_effect=_count_records)
+    event = {'Records': [
+        {'messageId': 'm-ok', 'body': json.dumps({'type': 'prime', 'records': [{'Award ID': 'A1'}]})},
+        {'messageId': 'm-bad', 'body': json.dumps({'type': 'prime', 'records': [{'Award ID': 'BAD'},
+                                                                                 {'Award ID': 'A2'}]})},
+        {'messageId': 'm-garbled', 'body': '{not json'},
+        {'messageId': 'm-sub', 'body': json.dumps({'type': 'subaward', 'data': {'Sub-Award ID': 'S1'}})},
+    ]}
+
+    response = lambda_handler(event, None)
+
+    assert sorted(f['itemIdentifier'] for f in response['batchItemFailures']) == ['m-bad', 'm-garbled']
+    # Every other message still ran; only the good message's rows were written
+    assert json.loads(response['body'])['processed'] == 2
+    assert mock_write.call_args.args[0] == [{'Award ID': 'A1'}]
+
+def test_lambda_handler_fails_every_prime_message_when_the_write_raises(mocker, mock_db_stuff, mock_prime_stages):
+    _, mock_write = mock_prime_stages
+    mock_write.side_effect = RuntimeError("connection reset")
+    mocker.patch('src.processing.entity_resolver.process_sub_awards', side_effect=_count_records)
+    event = {'Records': [
+        {'messageId': 'p1', 'body': json.dumps({'type': 'prime', 'data': {'Award ID': 'A1'}})},
+        {'messageId': 'p2', 'body': json.dumps({'type': 'prime', 'data': {'Award ID': 'A2'}})},
+        {'messageId': 's1', 'body': json.dumps({'type': 'subaward', 'data': {'Sub-Award ID': 'S1'}})},
+    ]}
+
+    response = lambda_handler(event, None)
+
+    assert sorted(f['itemIdentifier'] for f in response['batchItemFailures']) == ['p1', 'p2']
+    assert json.loads(response['body'])['processed'] == 1
+
+def test_lambda_handler_processes_messages_concurrently(mocker, mock_db_stuff, mock_prime_stages):
+    import threading
+    from src.processing import entity_resolver as er
+    mocker.patch.object(er, 'RESOLVER_WORKERS', 3)
+    barrier = threading.Barrier(3, timeout=5)
+    threads = set()
+
+    def prepare(contracts, conn, vendor_memo=None):
+        threads.add(threading.get_ident())
+        barrier.wait()  # only returns once three messages are in flight at the same time
+        return contracts
+    mock_prime_stages[0].side_effect = prepare
+    event = {'Records': [{'messageId': f'm{i}', 'body': json.dumps({'type': 'prime', 'data': {'Award ID': f'A{i}'}})}
+                         for i in range(6)]}
+
+    response = lambda_handler(event, None)
+
+    assert json.loads(response['body'])['processed'] == 6
+    assert response['batchItemFailures'] == []
+    assert len(threads) == 3
+
+def test_connection_pool_reuses_and_bounds_connections(mocker):
+    from src.processing.entity_resolver import ConnectionPool
+    opened = []
+    def connect():
+        conn = MagicMock(closed=0)
+        opened.append(conn)
+        return conn
+    mocker.patch('src.processing.entity_resolver.get_db_connection', side_effect=connect)
+    pool = ConnectionPool(2)
+
+    with pool.connection() as first:
+        with pool.connection() as second:
+            assert first is not second
+    with pool.connection() as again:
+        assert again in (first, second)
+        again.closed = 1  # broken while in use: dropped, not handed out again
+    with pool.connection() as third:
+        assert third is not again
+        with pool.connection() as replacement:
+            # The dropped connection's slot is refilled with a fresh one
+            assert replacement not in (first, second)
+    assert len(opened) == 3
+    assert all(conn.autocommit is True for conn in opened)
+
+    pool.close_all()
+    for conn in opened:
+        if conn is not again:
+            conn.close.assert_called_once()
+
+def test_connection_pool_wakes_waiters_when_a_connection_is_dropped(mocker):
+    from src.processing.entity_resolver import ConnectionPool
+    mocker.patch('src.processing.entity_resolver.get_db_connection',
+                 side_effect=lambda: MagicMock(closed=0))
+    pool = ConnectionPool(1)
+    got = []
+
+    def borrow():
+        with pool.connection() as conn:
+            got.append(conn)
+
+    with pool.connection() as broken:
+        waiter = threading.Thread(target=borrow)
+        waiter.start()
+        time.sleep(0.05)
+        assert got == []
+        broken.closed = 1
+    waiter.join(timeout=2)
+
+    # The waiter opened a replacement in the freed slot instead of hanging
+    assert not waiter.is_alive()
+    assert got and got[0] is not broken
 
 def test_process_prime_award_agency_hierarchy(mocker, mock_db_stuff):
     mock_conn = mock_db_stuff
@@ -79,3 +301,277 @@ def test_process_prime_award_agency_hierarchy(mocker, mock_db_stuff):
     mock_resolve_agency.assert_any_call('DEPT OF X', 'X00', conn=mock_conn)
     # Second call: Awarding Sub Tier (should pass parent_agency_id)
     mock_resolve_agency.assert_any_call('BUREAU OF Y', 'Y11', parent_agency_id='agency-uuid', conn=mock_conn)
+
+@pytest.fixture
+def agency_db(mocker):
+    """A connection whose agencies table holds X00; upserts echo their rows back as written."""
+    from src.processing import entity_resolver as er
+    mocker.patch.object(er, 'AGENCY_DIRECTORY', None)
+    mocker.patch.object(er, 'AGENCY_DIRECTORY_EXPIRY', None)
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [('X00', 'x00-uuid', None)]
+    upsert = mocker.patch('src.processing.entity_resolver.execute_values',
+                          side_effect=lambda cur, sql, rows, **kw: [(r[1], r[0], r[3]) for r in rows])
+    return conn, cur, upsert
+
+def test_prefetch_agencies_writes_a_batch_with_one_upsert_per_level(mocker, agency_db):
+    from src.processing.entity_resolver import prefetch_agencies, process_prime_award
+    conn, cur, upsert = agency_db
+    contracts = [{
+        'Award ID': f'AWD{i}',
+        'Awarding Agency': 'DEPT OF X', 'Awarding Agency Code': 'X00',
+        'Awarding Sub Agency': 'BUREAU OF Y', 'Awarding Sub Agency Code': 'Y11',
+        'Funding Agency': 'DEPT OF F', 'Funding Agency Code': 'F00',
+        'Funding Sub Agency': 'OFFICE OF G', 'Funding Sub Agency Code': 'G22',
+    } for i in range(10)]
+
+    assert prefetch_agencies(contracts, conn) == 3
+
+    # Y11's parent is already known; G22 waits for its new parent F00
+    first, second = [c.args[2] for c in upsert.call_args_list]
+    assert [(r[1], r[3]) for r in first] == [('Y11', 'x00-uuid'), ('F00', None)]
+    f00_id = first[1][0]
+    assert [(r[1], r[3]) for r in second] == [('G22', f00_id)]
+    assert cur.execute.call_count == 1  # the directory load
+
+    # Every resolve_agency of the batch is now served from memory
+    mocker.patch('src.processing.entity_resolver.resolve_vendor', return_value=('v-uuid', 'V', 'EXACT', 1.0))
+    for contract in contracts:
+        process_prime_award(contract, conn)
+    assert upsert.call_count == 2
+    insert = next(c.args[1] for c in cur.execute.call_args_list if 'INSERT INTO contracts' in c.args[0])
+    assert insert[3:7] == ('x00-uuid', first[0][0], f00_id, second[0][0])
+
+def test_resolve_agency_hits_directory_and_upserts_misses(agency_db):
+    from src.processing.entity_resolver import resolve_agency
+    conn, cur, upsert = agency_db
+
+    assert resolve_agency('DEPT OF X', 'X00', conn=conn) == 'x00-uuid'
+    assert resolve_agency('DEPT OF X', None, conn=conn) is None
+    upsert.assert_not_called()
+
+    new_id = resolve_agency('BUREAU OF Z', 'Z33', parent_agency_id='x00-uuid', conn=conn)
+    assert upsert.call_args.args[2] == [(new_id, 'Z33', 'BUREAU OF Z', 'x00-uuid')]
+    assert resolve_agency('BUREAU OF Z', 'Z33', parent_agency_id='x00-uuid', conn=conn) == new_id
+    assert upsert.call_count == 1
+
+    # A known agency without a parent gets one once it is seen as a sub agency
+    resolve_agency('DEPT OF X', 'X00', parent_agency_id='top-uuid', conn=conn)
+    assert upsert.call_count == 2
+    assert cur.execute.call_count == 1
+
+def test_prepare_prime_awards_resolves_rows_without_writing(mocker):
+    from src.processing.entity_resolver import prepare_prime_awards
+    conn = MagicMock()
+    mocker.patch('src.processing.entity_resolver.resolve_agency',
+                 side_effect=lambda name, code, parent_agency_id=None, conn=None: code and f'{code}-uuid')
+    mocker.patch('src.processing.entity_resolver.resolve_vendor', return_value=('v-uuid', 'ACME CORP', 'EXACT', 1.0))
+    contract = {'Award ID': 'AWD1', 'Recipient Name': 'Acme', 'Awarding Agency Code': 'X00',
+                'Awarding Sub Agency Code': 'Y11', 'Award Amount': 10.5, 'Start Date': '2024-03-01',
+                'Description': 'Widgets'}
+
+    rows = prepare_prime_awards([contract, {'Recipient Name': 'No Award ID'}], conn)
+
+    assert rows == [('AWD1', json.dumps(contract), ANY, 'v-uuid', 'X00-uuid', 'Y11-uuid', None, None,
+                     'Vendor: ACME CORP | Widgets', 10.5, '2024-03-01', None)]
+    conn.cursor.assert_not_called()
+
+def _staged_rows(cur):
+    import csv, io
+    return [list(csv.reader(io.StringIO(c.args[1].getvalue()))) for c in cur.copy_expert.call_args_list]
+
+def test_write_prime_awards_stages_and_merges_once():
+    from src.processing.entity_resolver import write_prime_awards
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    rows = [('AWD1', '{"a": "x,\\n\\"y\\""}', 'h1', 'v-uuid', None, None, None, None, 'Vendor: V | d', 1.5,
+             '2024-01-01', None),
+            ('AWD2', '{}', 'h2', 'v-uuid', None, None, None, None, 'Vendor: V | d', 2, '2024-01-02', 'BPA'),
+            ('AWD1', '{}', 'h3', 'v-uuid', None, None, None, None, 'Vendor: V | newer', 3, '2024-01-01', None)]
+
+    assert write_prime_awards(rows, conn) == 2
+
+    statements = [c.args[0] for c in cur.execute.call_args_list]
+    assert sum('INSERT INTO contracts' in sql for sql in statements) == 1
+    # One COPY with the last copy of a repeated Award ID; None loads as NULL (an empty CSV field)
+    [staged] = _staged_rows(cur)
+    assert [r[0] for r in staged] == ['AWD1', 'AWD2']
+    assert staged[0][8] == 'Vendor: V | newer' and staged[0][4] == '' and staged[1][11] == 'BPA'
+    assert write_prime_awards([], conn) == 0
+
+def test_write_prime_awards_falls_back_to_single_rows_on_merge_failure():
+    from src.processing.entity_resolver import write_prime_awards
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    merges = iter([RuntimeError('invalid input syntax for type numeric: "n/a"'), None,
+                   RuntimeError('invalid input syntax for type numeric: "n/a"')])
+
+    def execute(sql, params=None):
+        if 'INSERT INTO contracts' in sql:
+            error = next(merges)
+            if error:
+                raise error
+    cur.execute.side_effect = execute
+    rows = [('GOOD', '{}', 'h1', None, None, None, None, None, 'd', 1, '2024-01-01', None),
+            ('BAD', '{}', 'h2', None, None, None, None, None, 'd', 'n/a', '2024-01-01', None)]
+
+    assert write_prime_awards(rows, conn) == 1
+
+    # Restaged one row at a time; the failing row's payload is kept with its error
+    assert [[r[0] for r in staged] for staged in _staged_rows(cur)] == [['GOOD', 'BAD'], ['GOOD'], ['BAD']]
+    sql, params = cur.execute.call_args.args
+    assert 'processing_errors' in sql and params == ('invalid input syntax for type numeric: "n/a"',)
+
+
+def _transactional_conn():
+    conn = MagicMock()
+    conn.autocommit = True
+    conn.closed = 0
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.connection = conn
+    return conn, cur
+
+def test_write_prime_awards_runs_in_one_transaction_with_savepoints():
+    from src.processing.entity_resolver import write_prime_awards
+    conn, cur = _transactional_conn()
+
+    def execute(sql, params=None):
+        if 'INSERT INTO contracts' in sql and conn.bad_row_staged:
+            raise RuntimeError('invalid input syntax for type numeric: "n/a"')
+    cur.copy_expert.side_effect = lambda sql, buffer: setattr(conn, 'bad_row_staged', 'BAD' in buffer.getvalue())
+    cur.execute.side_effect = execute
+    rows = [('GOOD', '{}', 'h1', None, None, None, None, None, 'd', 1, '2024-01-01', None),
+            ('BAD', '{}', 'h2', None, None, None, None, None, 'd', 'n/a', '2024-01-01', None)]
+
+    assert write_prime_awards(rows, conn) == 1
+
+    statements = [c.args[0].split()[0] if 'SAVEPOINT' not in c.args[0] else c.args[0]
+                  for c in cur.execute.call_args_list]
+    assert statements == [
+        'CREATE', 'TRUNCATE', 'SAVEPOINT record', 'WITH', 'ROLLBACK TO SAVEPOINT record',
+        'TRUNCATE', 'SAVEPOINT record', 'WITH', 'RELEASE SAVEPOINT record',
+        'TRUNCATE', 'SAVEPOINT record', 'WITH', 'ROLLBACK TO SAVEPOINT record', 'INSERT']
+    # One commit for the batch, and the connection is back in autocommit
+    conn.commit.assert_called_once()
+    conn.rollback.assert_not_called()
+    assert conn.autocommit is True
+
+def test_transaction_rolls_back_and_restores_autocommit():
+    from src.processing.entity_resolver import transaction
+    conn, _ = _transactional_conn()
+
+    with pytest.raises(RuntimeError):
+        with transaction(conn):
+            assert conn.autocommit is False
+            raise RuntimeError("connection lost")
+
+    conn.rollback.assert_called_once()
+    conn.commit.assert_not_called()
+    assert conn.autocommit is True
+    # A connection already in a transaction is left to its owner
+    conn.autocommit = False
+    with transaction(conn):
+        pass
+    conn.commit.assert_not_called()
+
+def test_process_sub_awards_skips_failed_inserts_in_one_transaction(mocker):
+    from src.processing.entity_resolver import process_sub_awards
+    conn, cur = _transactional_conn()
+    mocker.patch('src.processing.entity_resolver.resolve_vendor', return_value=('v-uuid', 'V', 'EXACT', 1.0))
+    mocker.patch('src.processing.entity_resolver.resolve_agency', return_value='a-uuid')
+    cur.fetchone.return_value = ('prime-uuid',)
+
+    def execute(sql, params=None):
+        if 'INSERT INTO subcontracts' in sql and params[5] == 'bad':
+            raise RuntimeError('value too long')
+    cur.execute.side_effect = execute
+    subs = [{'Sub-Award ID': f'SUB{i}', 'Prime Award ID': 'AWD1', 'Sub-Award Description': description}
+            for i, description in enumerate(['ok', 'bad', 'ok'])] + [{'Prime Award ID': 'AWD1'}]
+
+    assert process_sub_awards(subs, conn) == 2
+
+    statements = [c.args[0] for c in cur.execute.call_args_list]
+    assert statements.count('SAVEPOINT record') == 3
+    assert statements.count('ROLLBACK TO SAVEPOINT record') == 1
+    assert statements.count('RELEASE SAVEPOINT record') == 2
+    conn.commit.assert_called_once()
+
+
+BENCH_DATABASE_URL = __import__('os').environ.get('BENCH_DATABASE_URL')
+requires_database = pytest.mark.skipif(not BENCH_DATABASE_URL, reason="BENCH_DATABASE_URL not set")
+
+@requires_database
+def test_bulk_writes_land_rows_and_keep_per_record_errors():
+    import uuid
+    import psycopg2
+    from src.benchmarks.bench_writes import prepare_database, synthetic_awards
+    from src.processing.entity_resolver import prepare_prime_awards, write_prime_awards
+    conn = psycopg2.connect(BENCH_DATABASE_URL)
+    conn.autocommit = True
+    try:
+        vendor_ids = prepare_database(conn, 20)
+        awards = synthetic_awards(30, list(vendor_ids), f"TEST-{uuid.uuid4().hex[:8]}")
+        awards[7]['Award Amount'] = 'n/a'
+        with patch('src.processing.entity_resolver.resolve_vendor',
+                   side_effect=lambda name, duns=None, uei=None, conn=None: (vendor_ids[name], name, 'EXACT', 1.0)):
+            rows = prepare_prime_awards(awards, conn)
+
+        assert write_prime_awards(rows, conn) == 29
+
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT r.usaspending_id, r.processed, r.processing_errors, c.vendor_id::text
+                FROM raw_contracts r LEFT JOIN contracts c ON c.raw_contract_id = r.id
+                WHERE r.usaspending_id = ANY(%s)
+                """,
+                ([a['Award ID'] for a in awards],))
+            landed = {row[0]: row[1:] for row in cur.fetchall()}
+        assert len(landed) == 30
+        bad = landed.pop(awards[7]['Award ID'])
+        assert bad[0] is False and 'numeric' in bad[1] and bad[2] is None
+        assert all(processed and error is None and vendor for processed, error, vendor in landed.values())
+    finally:
+        conn.close()
+
+@requires_database
+def test_bulk_write_benchmark_beats_per_record_path():
+    from src.benchmarks.bench_writes import run_benchmark
+    report = run_benchmark(BENCH_DATABASE_URL, record_count=2000)
+
+    assert [r['written'] for r in report['results']] == [2000, 2000]
+    # The 10x target is for RDS, where each of the per-record path's three
+    # statements per award pays a network round trip. Over a local socket
+    # those round trips are nearly free, and runs measure 6-12x. Merging
+    # row by row (the fallback path) is no faster than per-record, so 5x
+    # still catches that regression without flaking on a noisy runner.
+    assert report['speedup'] >= 5
+
+@requires_database
+def test_bulk_sub_awards_roll_back_only_the_failing_record():
+    import uuid
+    import psycopg2
+    from src.benchmarks.bench_writes import prepare_database
+    from src.processing.entity_resolver import process_sub_awards
+    conn = psycopg2.connect(BENCH_DATABASE_URL)
+    conn.autocommit = True
+    try:
+        vendor_ids = prepare_database(conn, 5)
+        vendor = next(iter(vendor_ids))
+        marker = f"TEST-{uuid.uuid4().hex[:8]}"
+        subs = [{'Sub-Award ID': f'{marker}-{i}', 'Prime Award ID': 'NONE', 'Sub-Awardee Name': vendor,
+                 'Prime Recipient Name': vendor, 'Sub-Award Amount': amount, 'Sub-Award Description': marker}
+                for i, amount in enumerate([100, 'n/a', 300])]
+        with patch('src.processing.entity_resolver.resolve_vendor',
+                   side_effect=lambda name, duns=None, uei=None, conn=None: (vendor_ids[name], name, 'EXACT', 1.0)), \
+                patch('src.processing.entity_resolver.resolve_agency', return_value=None):
+            assert process_sub_awards(subs, conn) == 2
+
+        assert conn.autocommit is True
+        with conn.cursor() as cur:
+            cur.execute("SELECT subcontract_amount FROM subcontracts WHERE subcontract_description = %s "
+                        "ORDER BY subcontract_amount", (marker,))
+            assert [int(row[0]) for row in cur.fetchall()] == [100, 300]
+    finally:
+        conn.close()
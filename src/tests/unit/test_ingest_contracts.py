@@ -1,6 +1,25 @@
+import gzip
+import json
+import os
+import threading
+import time
 import unittest
 from unittest.mock import patch, MagicMock
-from src.ingestion.scraper import fetch_contracts
+
+import boto3
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from src.ingestion.scraper import (
+    fetch_contracts, iter_contract_pages, RateLimiter, ArchiveWriter,
+    IngestionCheckpoint, lambda_handler, split_date_range, run_backfill,
+    iter_archive_records, pack_messages, send_to_queue, AdaptiveRateController,
+    fetch_page, get_session, ingest_stream, vendor_affinity_key, IngestionInterrupted
+)
+from src.ingestion import scraper
+from src.processing import entity_resolver
+from src.processing.entity_resolver import unpack_message
+from src.benchmarks.replay_server import ReplayServer
 
 
 class TestIngestContracts(unittest.TestCase):
@@ -61,5 +80,704 @@ class TestIngestContracts(unittest.TestCase):
         self.assertEqual(kwargs['json']['spending_level'], "subawards")
 
 
+class TestConcurrentFetch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ReplayServer(synthetic_pages=8, latency=0.1).start()
+        cls.base_url = cls.server.base_url
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def _timed_fetch(self, max_workers):
+        with patch('src.ingestion.scraper.API_BASE_URL', self.base_url):
+            started = time.perf_counter()
+            results = fetch_contracts(
+                "2023-01-01", "2023-01-02", max_workers=max_workers,
+                rate_limiter=RateLimiter(interval=0))
+            return results, time.perf_counter() - started
+
+    def test_concurrent_matches_serial_and_is_faster(self):
+        serial, serial_elapsed = self._timed_fetch(max_workers=1)
+        concurrent, concurrent_elapsed = self._timed_fetch(max_workers=4)
+
+        self.assertEqual(len(serial), 800)
+        self.assertEqual(concurrent, serial)
+        self.assertLess(concurrent_elapsed, serial_elapsed * 0.6)
+
+    @patch('requests.Session.post')
+    def test_concurrent_raises_at_failed_page(self, mock_post):
+        def respond(url, headers=None, json=None, timeout=None):
+            response = MagicMock()
+            response.status_code = 500 if json['page'] == 3 else 200
+            response.json.return_value = {
+                "page_metadata": {"hasNext": True},
+                "results": [{"Award ID": str(json['page'])}]
+            }
+            return response
+        mock_post.side_effect = respond
+
+        pages = iter_contract_pages(
+            "2023-01-01", "2023-01-02", max_workers=3, rate_limiter=RateLimiter(interval=0))
+        received = []
+        with self.assertRaises(RuntimeError):
+            for page in pages:
+                received.extend(r["Award ID"] for r in page)
+
+        # Pages before the failure are delivered, nothing after it
+        self.assertEqual(received, ["1", "2"])
+
+    def test_rate_limiter_spaces_shared_requests(self):
+        limiter = RateLimiter(interval=0.05)
+        stamps = []
+        lock = threading.Lock()
+
+        def worker():
+            limiter.acquire()
+            with lock:
+                stamps.append(time.monotonic())
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stamps.sort()
+        gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+        self.assertTrue(all(gap >= 0.04 for gap in gaps))
+
+
+class S3StandInMixin:
+    """Runs each test against an in-process S3 (moto) with an empty archive bucket."""
+    bucket = "govgraph-raw-test"
+
+    def setUp(self):
+        super().setUp()
+        self.aws = mock_aws()
+        self.aws.start()
+        self.s3 = boto3.client('s3', region_name='us-east-1')
+        self.s3.create_bucket(Bucket=self.bucket)
+        for target, value in (('s3_client', self.s3), ('S3_BUCKET', self.bucket)):
+            patcher = patch(f'src.ingestion.scraper.{target}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.aws.stop)
+
+    def read_manifest(self, prefix):
+        return json.loads(self.s3.get_object(Bucket=self.bucket, Key=f"{prefix}/manifest.json")['Body'].read())
+
+
+class TestStreamingPipeline(S3StandInMixin, unittest.TestCase):
+
+    def test_archive_round_trips_through_chunks_and_manifest(self):
+        records = [{"Award ID": str(i), "Recipient Name": f"VENDOR {i % 7}"} for i in range(25)]
+        archive = ArchiveWriter("2023-01-01_to_2023-01-02/prime")
+        with patch('src.ingestion.scraper.ARCHIVE_CHUNK_RECORDS', 10):
+            for i in range(0, len(records), 4):
+                archive.write(records[i:i + 4])
+            key = archive.close()
+
+        self.assertEqual(key, "2023-01-01_to_2023-01-02/prime/manifest.json")
+        manifest = self.read_manifest("2023-01-01_to_2023-01-02/prime")
+        self.assertEqual(manifest["format"], "ndjson+gzip")
+        self.assertEqual(manifest["record_count"], 25)
+        self.assertEqual([c["records"] for c in manifest["chunks"]], [10, 10, 5])
+
+        chunk = self.s3.get_object(Bucket=self.bucket, Key=manifest["chunks"][0]["key"])['Body'].read()
+        lines = gzip.decompress(chunk).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], records[:10])
+
+        self.assertEqual(list(iter_archive_records("2023-01-01_to_2023-01-02/prime")), records)
+
+    @patch('src.ingestion.scraper.ARCHIVE_PART_SIZE', 5 * 1024 * 1024)
+    def test_archive_uploads_large_chunks_in_multipart_parts(self):
+        # Incompressible payloads so the compressed stream crosses the part size
+        page = [{"Award ID": str(i), "Description": os.urandom(2048).hex()} for i in range(500)]
+        archive = ArchiveWriter("window/prime")
+        for _ in range(6):
+            archive.write(page)
+            # Nothing beyond the current part is held in memory
+            self.assertLess(len(archive._buffer), 5 * 1024 * 1024)
+        archive.close()
+
+        manifest = self.read_manifest("window/prime")
+        self.assertEqual(manifest["record_count"], 3000)
+        self.assertGreater(manifest["chunks"][0]["bytes"], 5 * 1024 * 1024)
+        head = self.s3.head_object(Bucket=self.bucket, Key=manifest["chunks"][0]["key"])
+        # Multipart ETags carry a "-<part count>" suffix
+        self.assertIn("-", head['ETag'])
+        self.assertEqual(sum(1 for _ in iter_archive_records("window/prime")), 3000)
+
+    @patch('src.ingestion.scraper.ARCHIVE_PART_SIZE', 5 * 1024 * 1024)
+    def test_failed_chunk_upload_aborts_the_multipart_upload(self):
+        page = [{"Award ID": str(i), "Description": os.urandom(2048).hex()} for i in range(3000)]
+        archive = ArchiveWriter("window/prime")
+        archive.write(page)
+        self.assertIsNotNone(archive._upload_id)
+
+        failure = ClientError({"Error": {"Code": "InternalError"}}, "CompleteMultipartUpload")
+        with patch.object(self.s3, 'complete_multipart_upload', side_effect=failure):
+            with self.assertRaises(ClientError):
+                archive.seal()
+
+        self.assertNotIn('Uploads', self.s3.list_multipart_uploads(Bucket=self.bucket))
+        # Nothing was sealed, so no page of the dropped chunk can be checkpointed
+        self.assertEqual(archive.sealed_count, 0)
+        self.assertIsNone(archive.close())
+
+    def test_resumed_archive_appends_to_existing_manifest(self):
+        first = ArchiveWriter("window/prime")
+        first.write([{"Award ID": "1"}])
+        first.close()
+
+        resumed = ArchiveWriter("window/prime", resume=True)
+        resumed.write([{"Award ID": "2"}])
+        resumed.close()
+
+        manifest = self.read_manifest("window/prime")
+        self.assertEqual([c["key"] for c in manifest["chunks"]],
+                         ["window/prime/part-00000.ndjson.gz", "window/prime/part-00001.ndjson.gz"])
+        self.assertEqual([r["Award ID"] for r in iter_archive_records("window/prime")], ["1", "2"])
+
+    def test_reads_legacy_json_archives(self):
+        self.s3.put_object(Bucket=self.bucket, Key="old/prime/contracts.json",
+                           Body=json.dumps([{"Award ID": "legacy"}]))
+        self.assertEqual(list(iter_archive_records("old/prime")), [{"Award ID": "legacy"}])
+
+    @patch('src.ingestion.scraper.SQS_AFFINITY_RECORDS', 100)
+    @patch('src.ingestion.scraper.ARCHIVE_CHUNK_RECORDS', 250)
+    @patch('src.ingestion.scraper.send_to_queue')
+    def test_ingest_stream_checkpoints_only_archived_pages(self, mock_send):
+        archive = ArchiveWriter("window/prime")
+        checkpoint = MagicMock()
+        archived_at_checkpoint = {}
+
+        def page_done(stream, page, record_count):
+            archived_at_checkpoint[page] = self.read_manifest("window/prime")["record_count"]
+        checkpoint.page_done.side_effect = page_done
+
+        def pages():
+            for p in range(5):
+                yield [{"Award ID": f"{p}-{i}"} for i in range(100)]
+                if p == 3:
+                    # Page 3 was sent but is still in the open chunk
+                    self.assertEqual(sorted(archived_at_checkpoint), [1, 2])
+
+        ingest_stream(pages(), archive, "prime", checkpoint, "prime_contracts")
+
+        # The open chunk is sealed when the stream ends
+        self.assertEqual(sorted(archived_at_checkpoint), [1, 2, 3, 4, 5])
+        for page, archived in archived_at_checkpoint.items():
+            self.assertGreaterEqual(archived, page * 100)
+        checkpoint.stream_done.assert_called_once_with("prime_contracts")
+
+    def test_archive_writer_skips_empty_archive(self):
+        self.assertIsNone(ArchiveWriter("window/prime").close())
+        self.assertNotIn('Contents', self.s3.list_objects_v2(Bucket=self.bucket))
+
+    @patch('src.ingestion.scraper.DB_SECRET_ARN', None)
+    @patch('src.ingestion.scraper.send_to_queue')
+    @patch('src.ingestion.scraper.iter_contract_pages')
+    def test_lambda_handler_enqueues_each_stream(self, mock_pages, mock_send):
+        def pages(start_date, end_date, spending_level, award_type_codes, **kwargs):
+            prefix = "IDV" if award_type_codes[0].startswith("IDV") else spending_level
+            return iter([[{"Award ID": f"{prefix}-1"}], [{"Award ID": f"{prefix}-2"}]])
+        mock_pages.side_effect = pages
+
+        result = lambda_handler({'date': '2023-01-01'}, None)
+
+        self.assertIn("Primes: 4, Subs: 2", result['body'])
+        # Small streams are buffered into one vendor-grouped send each
+        self.assertEqual(mock_send.call_count, 3)
+        for args, kwargs in mock_send.call_args_list:
+            self.assertEqual(len(args[0]), 2)
+
+        self.assertEqual(len(list(iter_archive_records("2023-01-01_to_2023-01-01/prime"))), 4)
+        self.assertEqual(len(list(iter_archive_records("2023-01-01_to_2023-01-01/subaward"))), 2)
+
+
+class TestCheckpointedRuns(S3StandInMixin, unittest.TestCase):
+
+    def _mock_conn(self, existing_run=None):
+        conn = MagicMock()
+        cur = conn.cursor.return_value.__enter__.return_value
+        cur.fetchone.return_value = existing_run
+        return conn, cur
+
+    def test_start_records_new_run(self):
+        conn, cur = self._mock_conn()
+
+        checkpoint = IngestionCheckpoint.start(conn, "2023-01-01", "2023-01-03")
+
+        self.assertEqual(checkpoint.attempt, 1)
+        self.assertEqual(checkpoint.next_page("prime_contracts"), 1)
+        insert_sql, params = cur.execute.call_args_list[-1].args
+        self.assertIn("INSERT INTO etl_runs", insert_sql)
+        self.assertEqual(params[1], "usaspending_ingest")
+
+    def test_start_resumes_unfinished_run(self):
+        metadata = {"start_date": "2023-01-01", "end_date": "2023-01-03", "attempts": 1,
+                    "streams": {"prime_contracts": {"last_page": 4, "records": 400, "complete": False},
+                                "sub_awards": {"last_page": 2, "records": 150, "complete": True}}}
+        conn, cur = self._mock_conn(existing_run=("run-1", metadata))
+
+        checkpoint = IngestionCheckpoint.start(conn, "2023-01-01", "2023-01-03")
+
+        self.assertEqual(checkpoint.run_id, "run-1")
+        self.assertEqual(checkpoint.attempt, 2)
+        self.assertEqual(checkpoint.next_page("prime_contracts"), 5)
+        self.assertEqual(checkpoint.next_page("prime_idvs"), 1)
+        self.assertTrue(checkpoint.is_complete("sub_awards"))
+
+    def test_page_done_persists_metadata(self):
+        conn, cur = self._mock_conn()
+        checkpoint = IngestionCheckpoint(conn, "run-1", {"attempts": 1, "streams": {}})
+
+        checkpoint.page_done("prime_idvs", 7, 100)
+
+        sql, params = cur.execute.call_args.args
+        self.assertIn("UPDATE etl_runs SET metadata", sql)
+        saved = json.loads(params[0])
+        self.assertEqual(saved["streams"]["prime_idvs"], {"last_page": 7, "records": 100, "complete": False})
+        self.assertEqual(params[1], 100)
+
+    @patch('src.ingestion.scraper.send_to_queue')
+    @patch('src.ingestion.scraper.iter_contract_pages')
+    @patch('src.ingestion.scraper.get_db_connection')
+    def test_lambda_handler_resumes_and_records_failure(self, mock_db, mock_pages, mock_send):
+        metadata = {"start_date": "2023-01-01", "end_date": "2023-01-01", "attempts": 1,
+                    "streams": {"prime_contracts": {"last_page": 3, "records": 300, "complete": False},
+                                "prime_idvs": {"last_page": 1, "records": 10, "complete": True}}}
+        conn, cur = self._mock_conn(existing_run=("run-1", metadata))
+        mock_db.return_value = conn
+        # Archive written by the first attempt
+        earlier = ArchiveWriter("2023-01-01_to_2023-01-01/prime")
+        earlier.write([{"Award ID": "from-attempt-1"}])
+        earlier.close()
+
+        def pages(start_date, end_date, spending_level, award_type_codes, start_page, **kwargs):
+            def generate():
+                yield [{"Award ID": f"{spending_level}-{start_page}"}]
+                if spending_level == "subawards":
+                    raise RuntimeError("USAspending returned 503")
+            return generate()
+        mock_pages.side_effect = pages
+
+        with patch('src.ingestion.scraper.DB_SECRET_ARN', 'arn:db'):
+            with self.assertRaises(RuntimeError):
+                lambda_handler({'date': '2023-01-01'}, None)
+
+        start_pages = {c.kwargs['spending_level'] + str(c.kwargs['award_type_codes'][0]): c.kwargs['start_page']
+                       for c in mock_pages.call_args_list}
+        # IDVs were complete, contracts resume after page 3, sub-awards start fresh
+        self.assertEqual(start_pages, {"awardsA": 4, "subawardsA": 1})
+
+        final_sql, final_params = cur.execute.call_args_list[-1].args
+        self.assertIn("completed_at = NOW()", final_sql)
+        self.assertEqual(final_params[0], "failed")
+        saved = json.loads(final_params[3])
+        self.assertEqual(saved["streams"]["prime_contracts"]["last_page"], 4)
+        self.assertEqual(saved["streams"]["sub_awards"]["last_page"], 1)
+        self.assertFalse(saved["streams"]["sub_awards"]["complete"])
+
+        # The resumed attempt appends to the first attempt's archive
+        archived = [r["Award ID"] for r in iter_archive_records("2023-01-01_to_2023-01-01/prime")]
+        self.assertEqual(archived, ["from-attempt-1", "awards-4"])
+        conn.close.assert_called_once()
+
+    @patch('src.ingestion.scraper.iter_contract_pages')
+    @patch('src.ingestion.scraper.get_db_connection')
+    def test_unreadable_manifest_on_resume_records_failure(self, mock_db, mock_pages):
+        metadata = {"start_date": "2023-01-01", "end_date": "2023-01-01", "attempts": 1, "streams": {}}
+        conn, cur = self._mock_conn(existing_run=("run-1", metadata))
+        mock_db.return_value = conn
+        denied = ClientError({"Error": {"Code": "AccessDenied"}}, "GetObject")
+
+        with patch('src.ingestion.scraper.DB_SECRET_ARN', 'arn:db'), \
+                patch('src.ingestion.scraper.read_archive_manifest', side_effect=denied):
+            with self.assertRaises(ClientError):
+                lambda_handler({'date': '2023-01-01'}, None)
+
+        mock_pages.assert_not_called()
+        final_sql, final_params = cur.execute.call_args_list[-1].args
+        self.assertIn("completed_at = NOW()", final_sql)
+        self.assertEqual(final_params[0], "failed")
+        conn.close.assert_called_once()
+
+
+class TestBackfill(unittest.TestCase):
+
+    def test_split_date_range_weeks(self):
+        self.assertEqual(split_date_range("2024-01-01", "2024-01-17", "week"), [
+            ("2024-01-01", "2024-01-07"),
+            ("2024-01-08", "2024-01-14"),
+            ("2024-01-15", "2024-01-17"),
+        ])
+
+    def test_split_date_range_days(self):
+        self.assertEqual(split_date_range("2024-02-28", "2024-03-01", "day"), [
+            ("2024-02-28", "2024-02-28"),
+            ("2024-02-29", "2024-02-29"),
+            ("2024-03-01", "2024-03-01"),
+        ])
+
+    @patch('src.ingestion.scraper.completed_windows')
+    @patch('src.ingestion.scraper.ingest_window')
+    def test_run_backfill_skips_completed_and_reports_failures(self, mock_ingest, mock_done):
+        mock_done.return_value = {("2024-01-01", "2024-01-07")}
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def ingest(start_date, end_date, rate_limiter=None, context=None):
+            with lock:
+                active.append(start_date)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.remove(start_date)
+            if start_date == "2024-01-15":
+                raise RuntimeError("boom")
+            return {}
+        mock_ingest.side_effect = ingest
+
+        result = run_backfill("2024-01-01", "2024-02-04", shard="week", parallelism=2)
+
+        body = json.loads(result['body'])
+        self.assertEqual(body['shards_total'], 5)
+        self.assertEqual(body['shards_completed'], 4)
+        self.assertEqual(body['shards_failed'], ["2024-01-15_to_2024-01-21"])
+        started = sorted(c.args[0] for c in mock_ingest.call_args_list)
+        self.assertNotIn("2024-01-01", started)
+        self.assertLessEqual(max(peak), 2)
+        # Every shard shares one rate budget
+        limiters = {id(c.kwargs['rate_limiter']) for c in mock_ingest.call_args_list}
+        self.assertEqual(len(limiters), 1)
+
+    @patch('src.ingestion.scraper.get_lambda_client')
+    @patch('src.ingestion.scraper.completed_windows', return_value=set())
+    @patch('src.ingestion.scraper.ingest_window', return_value={})
+    def test_lambda_backfill_stops_near_timeout_and_reinvokes(self, mock_ingest, mock_done, mock_lambda):
+        context = MagicMock()
+        context.function_name = "gov-graph-ingestion"
+        # Enough time for the first shard only
+        context.get_remaining_time_in_millis.side_effect = [300000, 60000, 60000]
+        event = {"backfill": {"start_date": "2024-01-01", "end_date": "2024-01-03",
+                              "shard": "day", "parallelism": 1}}
+
+        result = lambda_handler(event, context)
+
+        body = json.loads(result['body'])
+        self.assertEqual(body['shards_completed'], 1)
+        self.assertEqual(body['shards_pending'], 2)
+        invoke = mock_lambda.return_value.invoke.call_args.kwargs
+        self.assertEqual(invoke['InvocationType'], 'Event')
+        self.assertEqual(json.loads(invoke['Payload']), event)
+
+    @patch('src.ingestion.scraper.get_lambda_client')
+    @patch('src.ingestion.scraper.completed_windows', return_value=set())
+    @patch('src.ingestion.scraper.ingest_window')
+    def test_backfill_reinvokes_after_a_shard_runs_out_of_time(self, mock_ingest, mock_done, mock_lambda):
+        mock_ingest.side_effect = IngestionInterrupted("prime_contracts stopped before page 40")
+        context = MagicMock()
+        context.function_name = "gov-graph-ingestion"
+        context.get_remaining_time_in_millis.return_value = 300000
+        event = {"backfill": {"start_date": "2024-01-01", "end_date": "2024-01-07", "shard": "week"}}
+
+        result = lambda_handler(event, context)
+
+        body = json.loads(result['body'])
+        self.assertEqual(body['shards_completed'], 0)
+        self.assertEqual(body['shards_failed'], [])
+        self.assertEqual(body['shards_pending'], 1)
+        self.assertIs(mock_ingest.call_args.kwargs['context'], context)
+        mock_lambda.return_value.invoke.assert_called_once()
+
+    @patch('src.ingestion.scraper.send_to_queue')
+    def test_ingest_stream_checkpoints_and_stops_when_time_runs_low(self, mock_send):
+        context = MagicMock()
+        context.get_remaining_time_in_millis.side_effect = [300000, 300000, 60000]
+        checkpoint = MagicMock()
+        fetched = []
+
+        def pages():
+            for p in range(1, 6):
+                fetched.append(p)
+                yield [{"Award ID": str(p)}]
+
+        with self.assertRaises(IngestionInterrupted):
+            ingest_stream(pages(), _archive_stub(), "prime", checkpoint, "prime_contracts", context=context)
+
+        self.assertEqual(fetched, [1, 2, 3])
+        self.assertEqual([c.args[1] for c in checkpoint.page_done.call_args_list], [1, 2, 3])
+        checkpoint.stream_done.assert_not_called()
+
+
+class TestPackedMessages(unittest.TestCase):
+
+    def _contracts(self, n, description_size=50):
+        return [{"Award ID": str(i), "Description": "x" * description_size} for i in range(n)]
+
+    def test_pack_respects_record_cap_and_round_trips(self):
+        contracts = self._contracts(120)
+
+        bodies = pack_messages(contracts, "prime", max_records=50, compress=False)
+
+        self.assertEqual(len(bodies), 3)
+        unpacked = []
+        for body in bodies:
+            msg_type, records = unpack_message(body)
+            self.assertEqual(msg_type, "prime")
+            unpacked.extend(records)
+        self.assertEqual(unpacked, contracts)
+
+    def test_pack_respects_size_limit(self):
+        contracts = self._contracts(40, description_size=20000)
+
+        bodies = pack_messages(contracts, "subaward", max_records=100, compress=False)
+
+        self.assertGreater(len(bodies), 1)
+        self.assertTrue(all(len(body) <= 262144 for body in bodies))
+        self.assertEqual(sum(len(unpack_message(b)[1]) for b in bodies), 40)
+
+    def test_compressed_envelope_round_trips(self):
+        contracts = self._contracts(1000, description_size=500)
+
+        bodies = pack_messages(contracts, "prime", max_records=1000, compress=True)
+        plain = pack_messages(contracts, "prime", max_records=1000, compress=False)
+
+        self.assertLess(len(bodies), len(plain))
+        self.assertEqual(json.loads(bodies[0])["encoding"], "gzip")
+        self.assertEqual([r for b in bodies for r in unpack_message(b)[1]], contracts)
+
+    def test_unpack_accepts_single_record_messages(self):
+        legacy = json.dumps({"type": "subaward", "data": {"Sub-Award ID": "S1"}})
+        self.assertEqual(unpack_message(legacy), ("subaward", [{"Sub-Award ID": "S1"}]))
+        bare = json.dumps({"Award ID": "A1"})
+        self.assertEqual(unpack_message(bare), ("prime", [{"Award ID": "A1"}]))
+
+    @patch('src.ingestion.scraper.SQS_COMPRESS_MESSAGES', False)
+    @patch('src.ingestion.scraper.sqs_client')
+    def test_send_to_queue_batches_packed_messages(self, mock_sqs):
+        mock_sqs.send_message_batch.return_value = {}
+        contracts = self._contracts(1200)
+
+        with patch('src.ingestion.scraper.SQS_RECORDS_PER_MESSAGE', 50):
+            send_to_queue(contracts, data_type="prime")
+
+        # 24 messages of 50 records in 3 SendMessageBatch calls, instead of 120
+        self.assertEqual(mock_sqs.send_message_batch.call_count, 3)
+        entries = [e for c in mock_sqs.send_message_batch.call_args_list for e in c.kwargs['Entries']]
+        self.assertEqual(len(entries), 24)
+        for c in mock_sqs.send_message_batch.call_args_list:
+            self.assertLessEqual(sum(len(e['MessageBody']) for e in c.kwargs['Entries']), 262144)
+
+    @patch('src.ingestion.scraper.sqs_client')
+    def test_send_to_queue_raises_on_failed_entries(self, mock_sqs):
+        mock_sqs.send_message_batch.return_value = {'Failed': [{'Id': '0'}]}
+        with self.assertRaises(RuntimeError):
+            send_to_queue(self._contracts(3))
+
+
+def _archive_stub():
+    """A stand-in ArchiveWriter whose seal() makes every written record durable."""
+    archive = MagicMock(sealed_count=0, record_count=0)
+
+    def write(records):
+        archive.record_count += len(records)
+        return archive.record_count
+
+    def seal():
+        archive.sealed_count = archive.record_count
+    archive.write.side_effect = write
+    archive.seal.side_effect = seal
+    return archive
+
+
+class TestVendorAffinity(unittest.TestCase):
+
+    def test_normalization_matches_resolver(self):
+        names = ["Acme Corp.", "ACME CORPORATION", "Smith & Sons, L.L.C.", "Foo-Bar (USA) Inc",
+                 "  lots   of   space co ", "Company Holdings PLC", "", None, "Ünïcode GmbH"]
+        for name in names:
+            self.assertEqual(scraper.normalize_vendor_name(name),
+                             entity_resolver.normalize_vendor_name(name))
+
+    def test_affinity_key_clusters_spelling_variants(self):
+        self.assertEqual(vendor_affinity_key({"Recipient Name": "Acme Corp."}),
+                         vendor_affinity_key({"Recipient Name": "ACME CORPORATION"}))
+        self.assertEqual(vendor_affinity_key({"Recipient Name": None, "Recipient UEI": "U1"}), ("U1", ""))
+        sub = {"Sub-Awardee Name": "Parts Inc", "Prime Recipient Name": "Acme Corp"}
+        self.assertEqual(vendor_affinity_key(sub, "subaward"), ("PARTS", "ACME"))
+
+    @patch('src.ingestion.scraper.send_to_queue')
+    def test_ingest_stream_buffers_pages_and_checkpoints_after_send(self, mock_send):
+        checkpoint = MagicMock()
+        pages = [[{"Award ID": f"{p}-{i}"} for i in range(100)] for p in range(5)]
+
+        with patch('src.ingestion.scraper.SQS_AFFINITY_RECORDS', 300):
+            count = ingest_stream(iter(pages), _archive_stub(), "prime", checkpoint, "prime_contracts")
+
+        self.assertEqual(count, 500)
+        self.assertEqual([len(c.args[0]) for c in mock_send.call_args_list], [300, 200])
+        self.assertEqual([c.args[1] for c in checkpoint.page_done.call_args_list], [1, 2, 3, 4, 5])
+
+    @patch('src.ingestion.scraper.send_to_queue')
+    def test_ingest_stream_sends_buffered_pages_when_fetch_fails(self, mock_send):
+        def pages():
+            yield [{"Award ID": "A"}]
+            raise RuntimeError("USAspending returned 503")
+        checkpoint = MagicMock()
+
+        with self.assertRaises(RuntimeError):
+            ingest_stream(pages(), _archive_stub(), "prime", checkpoint, "prime_contracts")
+
+        mock_send.assert_called_once()
+        checkpoint.page_done.assert_called_once_with("prime_contracts", 1, 1)
+        checkpoint.stream_done.assert_not_called()
+
+    @patch('src.ingestion.scraper.SQS_COMPRESS_MESSAGES', False)
+    @patch('src.ingestion.scraper.sqs_client')
+    def test_grouping_raises_resolver_memo_hit_rate(self, mock_sqs):
+        mock_sqs.send_message_batch.return_value = {}
+        # 20 vendors with 10 awards each under two spellings, in arrival order
+        contracts = [{"Award ID": f"A{i}", "Recipient Name": f"Vendor {i % 20}" + (" Inc" if i % 3 else "")}
+                     for i in range(200)]
+
+        def hit_rate(bodies):
+            hits = lookups = 0
+            # One message per resolver invocation
+            for body in bodies:
+                memo = entity_resolver.VendorResolutionMemo()
+                with patch.object(entity_resolver, 'resolve_vendor', return_value=('id', 'name', 'EXACT', 1.0)):
+                    for record in unpack_message(body)[1]:
+                        memo.resolve(record["Recipient Name"])
+                hits += memo.hits
+                lookups += memo.hits + memo.misses
+            return hits / lookups
+
+        with patch('src.ingestion.scraper.SQS_RECORDS_PER_MESSAGE', 20):
+            arrival_order = pack_messages(contracts, "prime")
+            send_to_queue(contracts)
+        grouped = [e['MessageBody'] for c in mock_sqs.send_message_batch.call_args_list
+                   for e in c.kwargs['Entries']]
+
+        self.assertEqual(len(grouped), len(arrival_order))
+        self.assertEqual(hit_rate(arrival_order), 0.0)
+        # Only the first lookup of each (vendor, spelling) misses
+        self.assertEqual(hit_rate(grouped), 0.8)
+
+
+class TestAdaptiveRateController(unittest.TestCase):
+
+    def _controller(self, **kwargs):
+        options = dict(initial_rate=2.0, initial_concurrency=2, cooldown=0)
+        options.update(kwargs)
+        return AdaptiveRateController(**options)
+
+    def _request(self, controller, status=200, latency=0.1):
+        controller.acquire()
+        controller.release(status, latency)
+
+    def test_additive_increase_on_fast_successes(self):
+        controller = self._controller(initial_rate=100.0, rate_step=1.0, max_rate=200.0)
+        for _ in range(10):
+            self._request(controller)
+
+        metrics = controller.metrics()
+        self.assertAlmostEqual(metrics['rate'], 110.0)
+        self.assertGreater(metrics['concurrency'], 2)
+        self.assertEqual(metrics['requests'], 10)
+        self.assertEqual(metrics['backoffs'], 0)
+
+    def test_multiplicative_decrease_on_throttle_and_errors(self):
+        controller = self._controller(initial_rate=100.0, initial_concurrency=8)
+        self._request(controller, status=429)
+        self.assertAlmostEqual(controller.rate, 50.0)
+        self._request(controller, status=503)
+        self.assertAlmostEqual(controller.rate, 25.0)
+        self._request(controller, status=None)
+
+        metrics = controller.metrics()
+        self.assertAlmostEqual(metrics['rate'], 12.5)
+        self.assertEqual(metrics['concurrency'], 1)
+        self.assertEqual(metrics['throttled'], 1)
+        self.assertEqual(metrics['errors'], 2)
+        self.assertEqual([e['reason'] for e in metrics['backoff_events']],
+                         ['throttled', 'http_503', 'connection_error'])
+
+    def test_rising_latency_backs_off(self):
+        controller = self._controller(initial_rate=100.0)
+        for _ in range(5):
+            self._request(controller, latency=0.2)
+        rate_before = controller.rate
+
+        self._request(controller, latency=1.0)
+
+        self.assertAlmostEqual(controller.rate, rate_before / 2)
+        self.assertEqual(controller.metrics()['slow'], 1)
+
+    def test_rate_recovers_after_a_lasting_latency_shift(self):
+        controller = self._controller(initial_rate=400.0, min_rate=25.0, max_rate=1000.0, rate_step=10.0)
+        for _ in range(20):
+            self._request(controller, latency=0.1)
+
+        # The API's normal latency quadruples for good
+        slow_responses = 0
+        for _ in range(200):
+            slow_before = controller.metrics()['slow']
+            self._request(controller, latency=0.4)
+            slow_responses += controller.metrics()['slow'] - slow_before
+        metrics = controller.metrics()
+
+        # The baseline caught up, so later responses count as fast again
+        self.assertGreater(metrics['latency_baseline'], 0.2)
+        self.assertLess(slow_responses, 40)
+        self.assertGreater(metrics['rate'], 400.0)
+        self.assertGreater(metrics['concurrency'], 1)
+
+    def test_cooldown_counts_a_burst_once(self):
+        controller = self._controller(initial_rate=100.0, cooldown=60)
+        for _ in range(3):
+            self._request(controller, status=429)
+        self.assertAlmostEqual(controller.rate, 50.0)
+        self.assertEqual(controller.metrics()['backoffs'], 1)
+
+    def test_concurrency_limit_blocks_extra_requests(self):
+        controller = self._controller(initial_rate=1000.0, initial_concurrency=1)
+        controller.acquire()
+        entered = threading.Event()
+
+        def second():
+            controller.acquire()
+            entered.set()
+            controller.release(200, 0.01)
+
+        worker = threading.Thread(target=second)
+        worker.start()
+        self.assertFalse(entered.wait(0.1))
+        controller.release(200, 0.01)
+        self.assertTrue(entered.wait(1))
+        worker.join()
+
+    @patch('requests.Session.post')
+    def test_fetch_page_retries_throttled_responses_through_controller(self, mock_post):
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "0"})
+        ok = MagicMock(status_code=200)
+        ok.json.return_value = {"results": [{"Award ID": "1"}]}
+        mock_post.side_effect = [throttled, ok]
+        controller = self._controller(initial_rate=1000.0)
+
+        data = fetch_page(get_session(), {"spending_level": "awards"}, 1, controller)
+
+        self.assertEqual(data["results"], [{"Award ID": "1"}])
+        metrics = controller.metrics()
+        self.assertEqual(metrics['requests'], 2)
+        self.assertEqual(metrics['throttled'], 1)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,227 @@
+import uuid
+from unittest.mock import MagicMock
+
+from rapidfuzz import process, fuzz
+
+from src.processing.name_index import NameBlockingIndex, name_grams
+from src.benchmarks.bench_fuzzy import run_benchmark, synthetic_names
+
+
+def test_name_grams_are_normalized_and_padded():
+    assert name_grams("Acme, Inc.") == name_grams("ACME INC")
+    assert name_grams("AB") == [" AB", "AB "]
+    assert name_grams("") == []
+    assert name_grams(None) == []
+
+
+def test_candidates_are_a_small_ordered_subset():
+    names = synthetic_names(2000)
+    index = NameBlockingIndex(names, max_candidates=50)
+
+    candidates = index.candidates(names[10].lower())
+
+    assert 10 in candidates
+    assert len(candidates) <= 50
+    assert candidates == sorted(candidates)
+    assert index.candidates("") == []
+    assert index.extract_one("###") is None
+
+
+def test_extract_one_matches_full_scan():
+    names = ["TARGET CORPORATION", "TARGETED SOLUTIONS LLC", "ACME WIDGETS INC", "ACME"]
+    index = NameBlockingIndex(names)
+
+    for query in ["Targit Corp", "acme widgets", "ACME WIDGETS INTERNATIONAL", "ZZZZ"]:
+        brute = process.extractOne(query, names, scorer=fuzz.WRatio)
+        blocked = index.extract_one(query, scorer=fuzz.WRatio)
+        if brute[1] >= 90:
+            assert blocked == brute
+    assert index.extract_one("Targit Corp", score_cutoff=99) is None
+
+
+def test_benchmark_agrees_with_brute_force():
+    result = run_benchmark(vendor_count=5000, query_count=150)
+
+    assert result["matches"] > 50
+    assert result["mismatches"] == 0
+    assert result["avg_candidates"] < result["vendors"] / 5
+
+
+def test_refresh_builds_index_used_by_fuzzy_tier(mocker):
+    import src.processing.entity_resolver as er
+    er.CANONICAL_NAMES_CACHE = None
+    er.CACHE_EXPIRY = None
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [("uuid-1", "TARGET CORPORATION", None, None, None),
+                                 ("uuid-2", "ACME WIDGETS INC", None, None, None)]
+
+    names, _ = er.refresh_canonical_names_cache(conn)
+
+    assert er.FUZZY_INDEX.names is names
+    assert er.FUZZY_INDEX.extract_one("Targit Corporation")[0] == "TARGET CORPORATION"
+    er.CANONICAL_NAMES_CACHE = None
+    er.CACHE_EXPIRY = None
+
+
+def _normalize(name):
+    from src.processing.entity_resolver import normalize_vendor_name
+    return normalize_vendor_name(name)
+
+
+def test_artifact_round_trips_names_normalized_map_and_index(tmp_path):
+    from src.processing.name_index import write_artifact, VendorNameArtifact
+    from datetime import datetime, timezone
+    names = synthetic_names(3000) + ["Zyxw Corp", "ZYXW CORPORATION", "Ünïcode Vendor"]
+    path = str(tmp_path / "vendor_names.idx")
+    high_water = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+
+    stats = write_artifact(path, names, _normalize, high_water)
+    artifact = VendorNameArtifact(path)
+
+    assert stats["names"] == len(names)
+    assert artifact.high_water == high_water
+    assert list(artifact.names) == names
+    assert artifact.names[-1] == "Ünïcode Vendor"
+    assert "Ünïcode Vendor" in artifact.names and "Not A Vendor" not in artifact.names
+    # First canonical name wins for a shared normalized form, as in the in-memory cache
+    assert artifact.normalized["ZYXW"] == "Zyxw Corp"
+    assert "NOT A VENDOR" not in artifact.normalized
+    in_memory = NameBlockingIndex(names)
+    for query in ["zyxw corp", names[5].lower(), names[100] + " INC", "Zzzz Qqqq"]:
+        assert artifact.index.candidates(query) == in_memory.candidates(query)
+        assert artifact.index.extract_one(query) == in_memory.extract_one(query)
+
+
+def test_artifact_accepts_names_added_after_build(tmp_path):
+    from src.processing.name_index import write_artifact, VendorNameArtifact
+    names = ["TARGET CORPORATION", "ACME WIDGETS INC"]
+    path = str(tmp_path / "vendor_names.idx")
+    write_artifact(path, names, _normalize)
+    artifact = VendorNameArtifact(path)
+
+    artifact.names.extend(["INITECH INC"])
+    artifact.index.add(["INITECH INC"], start=2)
+    artifact.normalized["INITECH"] = "INITECH INC"
+
+    assert len(artifact.names) == 3 and artifact.names[2] == "INITECH INC"
+    assert "INITECH INC" in artifact.names
+    assert artifact.normalized["INITECH"] == "INITECH INC"
+    assert artifact.index.extract_one("Initech Incorporated")[0] == "INITECH INC"
+    assert artifact.high_water is None
+
+
+def test_artifact_open_cost_does_not_grow_with_vendor_count(tmp_path):
+    import tracemalloc
+    from src.processing.name_index import write_artifact, VendorNameArtifact
+    peaks = []
+    for count in (1000, 20000):
+        path = str(tmp_path / f"vendors_{count}.idx")
+        write_artifact(path, synthetic_names(count), _normalize)
+        tracemalloc.start()
+        artifact = VendorNameArtifact(path)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert artifact.index.extract_one(artifact.names[7])[0] == artifact.names[7]
+
+    assert peaks[1] < 64 * 1024
+    assert peaks[1] < peaks[0] * 1.5
+
+
+def test_artifact_directory_maps_names_and_identifiers(tmp_path):
+    from src.processing.name_index import write_artifact, VendorNameArtifact
+    names = synthetic_names(500)
+    ids = [str(uuid.uuid4()) for _ in names]
+    identifiers = [(vendor_id, f"{i:09d}" if i % 2 else None, f"UEI{i:09d}" if i % 3 else None)
+                   for i, vendor_id in enumerate(ids)]
+    path = str(tmp_path / "vendor_names.idx")
+    write_artifact(path, names, _normalize, identifiers=identifiers)
+    directory = VendorNameArtifact(path).directory
+
+    assert directory.id_for_name(names[42]) == ids[42]
+    assert directory.find_identifier(duns="000000007") == (ids[7], names[7])
+    assert directory.find_identifier(uei="UEI000000010") == (ids[10], names[10])
+    assert directory.find_identifier(duns="999999999", uei="UEI999999999") is None
+    assert directory.id_for_name("Not A Vendor") is None
+
+    # Names written by this process after the build
+    directory.add("uuid-new", "INITECH INC", None, "INITECHUEI01")
+    directory.add("uuid-moved", names[10], None, "UEI000000010")
+    assert directory.find_identifier(uei="INITECHUEI01") == ("uuid-new", "INITECH INC")
+    assert directory.id_for_name(names[10]) == "uuid-moved"
+
+    # Artifacts built without identifiers have an empty directory
+    write_artifact(path + ".bare", names, _normalize)
+    assert VendorNameArtifact(path + ".bare").directory.id_for_name(names[42]) is None
+
+
+def test_artifact_rejects_other_files(tmp_path):
+    import pytest
+    from src.processing.name_index import VendorNameArtifact
+    path = tmp_path / "not_an_index"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        VendorNameArtifact(str(path))
+
+
+def test_build_job_writes_artifact_from_vendors_table(mocker, tmp_path):
+    from datetime import datetime
+    from src.processing.build_name_index import build_vendor_name_artifact
+    from src.processing.name_index import VendorNameArtifact
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    acme_id, globex_id = str(uuid.uuid4()), str(uuid.uuid4())
+    cur.fetchall.return_value = [(acme_id, "ACME CORPORATION", "123456789", None, datetime(2024, 1, 2)),
+                                 (globex_id, "GLOBEX LLC", None, "GLOBEXUEI001", datetime(2024, 1, 3))]
+    path = str(tmp_path / "vendor_names.idx")
+
+    stats = build_vendor_name_artifact(conn, path)
+
+    assert stats["high_water"] == "2024-01-03T00:00:00"
+    artifact = VendorNameArtifact(path)
+    assert list(artifact.names) == ["ACME CORPORATION", "GLOBEX LLC"]
+    assert artifact.normalized["GLOBEX"] == "GLOBEX LLC"
+    assert artifact.directory.id_for_name("GLOBEX LLC") == globex_id
+    assert artifact.directory.find_identifier(duns="123456789") == (acme_id, "ACME CORPORATION")
+    assert artifact.directory.find_identifier(uei="GLOBEXUEI001") == (globex_id, "GLOBEX LLC")
+
+
+def test_resolver_starts_from_artifact_and_applies_delta(mocker, tmp_path):
+    from datetime import datetime
+    import src.processing.entity_resolver as er
+    from src.processing.name_index import write_artifact
+    path = str(tmp_path / "vendor_names.idx")
+    built = datetime(2024, 1, 3)
+    write_artifact(path, ["ACME CORPORATION", "GLOBEX LLC"], er.normalize_vendor_name, built)
+    mocker.patch.object(er, 'VENDOR_INDEX_PATH', path)
+    mocker.patch.object(er, 'VENDOR_INDEX_S3_URI', None)
+    mocker.patch.object(er, 'CANONICAL_NAMES_CACHE', None)
+    mocker.patch.object(er, 'CACHE_EXPIRY', None)
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = [("uuid-initech", "INITECH INC", None, "INITECHUEI01", datetime(2024, 1, 4))]
+
+    names, normalized = er.refresh_canonical_names_cache(conn)
+
+    # No full table read: only the delta since the artifact was built
+    sql, params = cur.execute.call_args.args
+    assert cur.execute.call_count == 1
+    assert "WHERE updated_at > %s" in sql
+    assert params == (built - er.CACHE_DELTA_OVERLAP,)
+    assert list(names) == ["ACME CORPORATION", "GLOBEX LLC", "INITECH INC"]
+    assert normalized["ACME"] == "ACME CORPORATION"
+    assert normalized["INITECH"] == "INITECH INC"
+    assert er.FUZZY_INDEX.names is names
+    assert er.FUZZY_INDEX.extract_one("Globex L.L.C.")[0] == "GLOBEX LLC"
+    assert er.VENDOR_DIRECTORY.find_identifier(uei="INITECHUEI01") == ("uuid-initech", "INITECH INC")
+    mocker.patch.object(er, 'CANONICAL_NAMES_CACHE', None)
+
+
+def test_resolver_falls_back_to_table_without_artifact(mocker, tmp_path):
+    import src.processing.entity_resolver as er
+    mocker.patch.object(er, 'VENDOR_INDEX_PATH', str(tmp_path / "missing.idx"))
+    mocker.patch.object(er, 'VENDOR_INDEX_S3_URI', 's3://bucket/vendor_names.idx')
+    mocker.patch('src.processing.entity_resolver.boto3.client').return_value.download_file.side_effect = \
+        RuntimeError("NoSuchKey")
+
+    assert er.load_vendor_name_artifact() is None
@@ -0,0 +1,59 @@
+from src.processing.name_normalizer import NameNormalizer
+from src.benchmarks.bench_normalize import regex_per_call, run_benchmark
+
+NAMES = ["Acme Corp.", "ACME CORPORATION", "Smith & Sons, L.L.C.", "Foo-Bar (USA) Inc", "  lots   of   space co ",
+         "Company Holdings PLC", "", None, "Ünïcode GmbH", "O'BRIEN & CO", "CO'S INC", "INC'CO+LLC", "CO-OP",
+         "tab\tseparated\x1cco", "multi\nline inc", "ﬁne co"]
+
+
+def test_normalize_matches_previous_rules():
+    normalizer = NameNormalizer()
+
+    for name in NAMES:
+        assert normalizer.normalize(name) == regex_per_call(name), name
+    assert normalizer.normalize_many(NAMES) == [regex_per_call(name) for name in NAMES]
+    assert normalizer.normalize_many([]) == []
+
+
+def test_normalize_many_falls_back_when_a_name_holds_the_separator():
+    normalizer = NameNormalizer()
+    names = ["first\nsecond co", "Acme Corp."]
+
+    assert normalizer.normalize_many(names) == ["FIRST SECOND", "ACME"]
+    # Bypasses the memo
+    assert normalizer.metrics() == {"hits": 0, "misses": 0, "size": 0}
+
+
+def test_configured_suffixes_and_abbreviations():
+    normalizer = NameNormalizer(suffixes=["LLC", "GmbH"], abbreviations={"intl": "International", "Svcs": "Services",
+                                                                         "corpn": "LLC"})
+    names = ["Acme Intl Svcs, GmbH", "Globex Corp", "Initech Corpn", "INTL'S CO"]
+
+    expected = ["ACME INTERNATIONAL SERVICES", "GLOBEX CORP", "INITECH", "INTERNATIONAL'S CO"]
+    assert [normalizer.normalize(name) for name in names] == expected
+    assert normalizer.normalize_many(names) == expected
+
+
+def test_memo_is_bounded():
+    normalizer = NameNormalizer(memo_size=2)
+
+    for name in ["A Inc", "B Inc", "A Inc", "C Inc", "B Inc"]:
+        normalizer.normalize(name)
+
+    assert normalizer.metrics() == {"hits": 1, "misses": 4, "size": 2}
+
+
+def test_benchmark_modes_agree():
+    report = run_benchmark(name_count=5000, incoming_count=2000)
+
+    assert report["mismatches"] == 0
+    assert [r["mode"] for r in report["results"]] == ["regex_per_call", "compiled", "batch", "memoized"]
+    assert report["memo"]["hits"] > report["memo"]["misses"]
+
+
+def test_resolver_uses_shared_normalizer():
+    import src.processing.entity_resolver as er
+
+    assert er.normalize_vendor_name("Globex, LLC.") == "GLOBEX"
+    assert er.normalize_vendor_names(["Globex, L.L.C.", None]) == ["GLOBEX L L C", ""]
+    assert er.VENDOR_NAME_NORMALIZER.metrics()["size"] > 0
@@ -0,0 +1,78 @@
+import os
+import json
+from unittest.mock import patch
+
+import pytest
+
+from src.ingestion.scraper import (
+    fetch_contracts, build_search_payload, recording_path, AdaptiveRateController, RateLimiter
+)
+from src.benchmarks.replay_server import ReplayServer
+from src.benchmarks.bench_scraper import run_benchmarks
+
+
+def _fetch(base_url, **kwargs):
+    with patch('src.ingestion.scraper.API_BASE_URL', base_url):
+        return fetch_contracts("2024-01-01", "2024-01-02", **kwargs)
+
+
+def test_recorded_run_replays_identically(tmp_path):
+    record_dir = str(tmp_path / "recordings")
+
+    # Record against a synthetic upstream, then replay with the upstream gone
+    with ReplayServer(synthetic_pages=3) as upstream:
+        with patch('src.ingestion.scraper.RECORD_DIR', record_dir):
+            recorded = _fetch(upstream.base_url, rate_limiter=RateLimiter(interval=0))
+
+    payload = build_search_payload("2024-01-01", "2024-01-02")
+    assert os.path.exists(recording_path(record_dir, payload, 3))
+    assert not os.path.exists(recording_path(record_dir, payload, 4))
+    with open(os.path.join(os.path.dirname(recording_path(record_dir, payload, 1)), "search.json")) as f:
+        assert json.load(f)["spending_level"] == "awards"
+
+    with ReplayServer(record_dir=record_dir) as replay:
+        replayed = _fetch(replay.base_url, max_workers=4, rate_limiter=RateLimiter(interval=0))
+        assert replay.stats["served"] >= 3
+
+    assert len(recorded) == 300
+    assert replayed == recorded
+
+
+def test_unrecorded_search_falls_back_to_synthetic_pages(tmp_path):
+    with ReplayServer(record_dir=str(tmp_path), synthetic_pages=2, page_size=5) as replay:
+        results = _fetch(replay.base_url, spending_level="subawards", rate_limiter=RateLimiter(interval=0))
+
+    assert len(results) == 10
+    assert results[0]["Sub-Award ID"] == "SUB-1-0"
+
+
+@patch('src.ingestion.scraper.time.sleep')
+def test_injected_throttling_is_retried_and_counted(mock_sleep):
+    limiter = AdaptiveRateController(initial_rate=1000.0, max_rate=1000.0)
+    with ReplayServer(synthetic_pages=10, throttle_rate=0.2, error_rate=0.1, seed=7) as replay:
+        results = _fetch(replay.base_url, rate_limiter=limiter)
+        stats = dict(replay.stats)
+
+    assert len(results) == 1000
+    assert stats["throttled"] > 0 and stats["errors"] > 0
+    metrics = limiter.metrics()
+    assert metrics["throttled"] == stats["throttled"]
+    assert metrics["errors"] == stats["errors"]
+    assert metrics["backoffs"] >= 1
+
+
+def test_benchmark_reports_every_mode():
+    results = run_benchmarks(["--synthetic-pages", "4", "--latency", "0.01"])
+
+    assert [r["mode"] for r in results] == ["serial", "concurrent", "streaming", "adaptive"]
+    for r in results:
+        assert r["records"] == 400
+        assert r["pages"] == 4
+        assert r["records_per_sec"] > 0
+        assert r["peak_memory_mb"] >= 0
+    assert "final_rate" in results[-1]
+
+
+def test_benchmark_reports_failed_server_start():
+    with pytest.raises(RuntimeError):
+        run_benchmarks(["--port", "not-a-port"])
@@ -19,7 +19,11 @@ def test_lambda_handler_reprocesses_correctly(mocker, mock_conn):
     ]
     
     mocker.patch('src.processing.reprocess_lambda.get_db_connection', return_value=conn)
-    mock_process_prime = mocker.patch('src.processing.reprocess_lambda.process_prime_award', return_value=1)
+    mock_process_prime = mocker.patch('src.processing.reprocess_lambda.process_prime_awards',
+                                      side_effect=lambda payloads, conn, vendor_memo: len(payloads))
+    mock_agencies = mocker.patch('src.processing.reprocess_lambda.prefetch_agencies')
+    mock_memo = mocker.patch('src.processing.reprocess_lambda.VendorResolutionMemo').return_value
+    mock_memo.metrics.return_value = {}
     
     event = {'limit': 10}
     result = lambda_handler(event, None)
@@ -28,4 +32,26 @@ def test_lambda_handler_reprocesses_correctly(mocker, mock_conn):
     body = json.loads(result['body'])
     assert body['reprocessed_prime'] == 2
     
-    assert mock_process_prime.call_count == 2
+    assert mock_process_prime.call_count == 1
+    mock_memo.prefetch.assert_called_once_with([(None, None, None), (None, None, None)], conn)
+    mock_process_prime.assert_called_with([{'Award ID': 'AWARD1'}, {'Award ID': 'AWARD2'}], conn, vendor_memo=mock_memo)
+    mock_agencies.assert_called_once_with([{'Award ID': 'AWARD1'}, {'Award ID': 'AWARD2'}], conn)
+
+
+def test_lambda_handler_resolves_vendors_per_chunk(mocker, mock_conn):
+    conn, cur = mock_conn
+    cur.fetchall.return_value = [
+        {'raw_payload': {'Award ID': f'AWARD{i}', 'Recipient Name': f'VENDOR {i % 2}'}} for i in range(5)
+    ]
+    mocker.patch('src.processing.reprocess_lambda.get_db_connection', return_value=conn)
+    mock_process_prime = mocker.patch('src.processing.reprocess_lambda.process_prime_awards', return_value=2)
+    mocker.patch('src.processing.reprocess_lambda.RESOLVE_CHUNK_SIZE', 2)
+    mock_agencies = mocker.patch('src.processing.reprocess_lambda.prefetch_agencies')
+    mock_memo = mocker.patch('src.processing.reprocess_lambda.VendorResolutionMemo').return_value
+    mock_memo.metrics.return_value = {}
+
+    lambda_handler({'limit': 10}, None)
+
+    assert [len(c.args[0]) for c in mock_memo.prefetch.call_args_list] == [2, 2, 1]
+    assert [len(c.args[0]) for c in mock_agencies.call_args_list] == [2, 2, 1]
+    assert [len(c.args[0]) for c in mock_process_prime.call_args_list] == [2, 2, 1]
@@ -0,0 +1,203 @@
+import zipfile
+from unittest.mock import MagicMock
+
+import pytest
+
+import src.processing.entity_resolver as er
+from src.processing.load_sam_extract import parse_extract, open_extract, load_sam_extract
+
+
+def _row(uei, name, code="A", duns=""):
+    fields = [""] * 20
+    fields[0], fields[1], fields[5], fields[11] = uei, duns, code, name
+    return "|".join(fields) + "!end\n"
+
+
+EXTRACT = (
+    "BOF PUBLIC V2 00000000 20240501 0000004 0000001\n"
+    + _row("UEIACME00001", "ACME CORPORATION")
+    + _row("UEIGLOBEX001", "Globex, LLC", code="E", duns="123456789")
+    + _row("", "NO UEI INC")
+    + "short|line\n"
+    + _row("UEIINITECH01", "INITECH INC", code="1")
+    + _row("UEIACME00001", "ACME CORPORATION INTERNATIONAL", code="3")
+    + "EOF PUBLIC V2 00000000 20240501 0000004 0000001\n"
+)
+
+
+@pytest.fixture
+def mock_conn():
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    return conn, cur
+
+
+def test_parse_extract_reads_entity_rows():
+    records = list(parse_extract(EXTRACT.splitlines(keepends=True)))
+
+    assert records == [
+        ("UEIACME00001", None, "ACME CORPORATION", "A"),
+        ("UEIGLOBEX001", "123456789", "Globex, LLC", "E"),
+        ("UEIINITECH01", None, "INITECH INC", "1"),
+        ("UEIACME00001", None, "ACME CORPORATION INTERNATIONAL", "3"),
+    ]
+
+
+def test_open_extract_reads_the_dat_inside_a_zip(tmp_path):
+    path = tmp_path / "SAM_PUBLIC_UTF-8_DAILY_V2_20240502.ZIP"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("SAM_PUBLIC_UTF-8_DAILY_V2_20240502.dat", EXTRACT)
+
+    with open_extract(str(path)) as lines:
+        assert len(list(parse_extract(lines))) == 4
+
+
+def test_load_applies_delta_file(mocker, mock_conn, tmp_path):
+    conn, cur = mock_conn
+    cur.fetchone.return_value = None
+    mock_values = mocker.patch('src.processing.load_sam_extract.execute_values')
+    path = tmp_path / "SAM_PUBLIC_DAILY_V2_20240502.dat"
+    path.write_text(EXTRACT)
+
+    stats = load_sam_extract(conn, str(path))
+
+    assert stats == {"file": path.name, "type": "delta", "upserted": 2, "deleted": 1}
+    rows = mock_values.call_args.args[2]
+    # One row per UEI, the later record winning, with the normalized name for Tier 4 lookups
+    assert [row[:4] for row in rows] == [
+        ("UEIACME00001", None, "ACME CORPORATION INTERNATIONAL", "ACME INTERNATIONAL"),
+        ("UEIGLOBEX001", "123456789", "Globex, LLC", "GLOBEX"),
+    ]
+    statements = [c.args[0] for c in cur.execute.call_args_list]
+    assert any("DELETE FROM sam_entities WHERE uei = ANY" in sql for sql in statements)
+    assert not any("load_id IS DISTINCT FROM" in sql for sql in statements)
+    conn.commit.assert_called_once()
+
+
+def test_full_load_drops_entities_missing_from_the_file(mocker, mock_conn, tmp_path):
+    conn, cur = mock_conn
+    cur.fetchone.return_value = None
+    cur.rowcount = 7
+    mocker.patch('src.processing.load_sam_extract.execute_values')
+    path = tmp_path / "SAM_PUBLIC_MONTHLY_V2_20240501.dat"
+    path.write_text(EXTRACT)
+
+    stats = load_sam_extract(conn, str(path), full=True)
+
+    assert stats["type"] == "full"
+    assert any("load_id IS DISTINCT FROM" in c.args[0] for c in cur.execute.call_args_list)
+
+
+def test_load_skips_files_already_applied(mocker, mock_conn, tmp_path):
+    conn, cur = mock_conn
+    cur.fetchone.return_value = (1,)
+    mock_values = mocker.patch('src.processing.load_sam_extract.execute_values')
+    path = tmp_path / "SAM_PUBLIC_DAILY_V2_20240502.dat"
+    path.write_text(EXTRACT)
+
+    assert load_sam_extract(conn, str(path))["skipped"] is True
+    mock_values.assert_not_called()
+
+
+@pytest.fixture
+def mock_sam_api(mocker):
+    mocker.patch.object(er, 'SAM_INDEX_LOADED', None)
+    mocker.patch.object(er, 'SAM_INDEX_EXPIRY', None)
+    return mocker.patch('src.processing.entity_resolver.requests.get')
+
+
+def test_tier4_uses_local_extract_without_http(mock_sam_api, mock_conn):
+    conn, cur = mock_conn
+    cur.fetchone.side_effect = [(True,), {'uei': 'UEIGLOBEX001', 'duns': None, 'legal_business_name': 'GLOBEX LLC'},
+                                None]
+
+    assert er.get_sam_entity(vendor_name="Globex, LLC", conn=conn) == {
+        "canonical_name": "GLOBEX LLC", "uei": "UEIGLOBEX001", "duns": None, "confidence": 1.0}
+    assert er.get_sam_entity(uei="UEIMISSING01", vendor_name="Globex LLC", conn=conn) is None
+
+    mock_sam_api.assert_not_called()
+    sql, params = cur.execute.call_args_list[1].args
+    assert "normalized_name = %s" in sql and params[1] == "GLOBEX"
+    # A UEI is matched on its own, never by name
+    sql, params = cur.execute.call_args_list[2].args
+    assert "normalized_name" not in sql and params[0] == "UEIMISSING01"
+    # The loaded-extract check is cached
+    assert cur.execute.call_count == 3
+
+
+def test_tier4_falls_back_to_api_without_an_extract(mock_sam_api, mocker, mock_conn):
+    conn, cur = mock_conn
+    cur.fetchone.return_value = (False,)
+    mocker.patch('src.processing.entity_resolver.get_secret', return_value={'api_key': 'fake-key'})
+    mocker.patch.object(er, 'SAM_API_KEY_SECRET_ARN', "arn:aws:secrets:123")
+    mock_sam_api.return_value.status_code = 200
+    mock_sam_api.return_value.json.return_value = {'entityData': [{'entityRegistration': {
+        'legalBusinessName': 'ACME CORP', 'ueiSAM': 'UEI123456789', 'duns': None}}]}
+
+    result = er.get_sam_entity(uei="UEI123456789", conn=conn)
+
+    assert result["canonical_name"] == "ACME CORP"
+    assert mock_sam_api.call_args.kwargs['params']['ueiSAM'] == "UEI123456789"
+
+
+def test_lookup_sam_entities_matches_a_batch_in_one_query(mock_conn):
+    conn, cur = mock_conn
+    cur.fetchall.return_value = [
+        {'uei': 'UEIACME00001', 'duns': None, 'legal_business_name': 'ACME CORPORATION', 'normalized_name': 'ACME'},
+        {'uei': 'UEIGLOBEX001', 'duns': '123456789', 'legal_business_name': 'GLOBEX LLC', 'normalized_name': 'GLOBEX'},
+        {'uei': 'UEIGLOBEX000', 'duns': None, 'legal_business_name': 'GLOBEX INC', 'normalized_name': 'GLOBEX'},
+    ]
+    keys = [("Acme Corp", None, "UEIACME00001"), ("Globex, LLC", "123456789", None),
+            ("Globex Inc", None, None), ("Acme Corp", None, "UEIMISSING01"), ("Initech", None, None)]
+
+    found = er.lookup_sam_entities(conn, keys)
+
+    assert {key: entity and entity["uei"] for key, entity in found.items()} == {
+        ("Acme Corp", None, "UEIACME00001"): "UEIACME00001",
+        # The DUNS match wins over a name-only match, as in lookup_sam_entity
+        ("Globex, LLC", "123456789", None): "UEIGLOBEX001",
+        ("Globex Inc", None, None): "UEIGLOBEX000",
+        # A UEI is matched on its own, never by name
+        ("Acme Corp", None, "UEIMISSING01"): None,
+        ("Initech", None, None): None,
+    }
+    assert cur.execute.call_count == 1
+    sql, (ueis, duns_values, names) = cur.execute.call_args.args
+    assert "uei = ANY(%s) OR duns = ANY(%s) OR normalized_name = ANY(%s)" in sql
+    assert sorted(ueis) == ["UEIACME00001", "UEIMISSING01"]
+    assert duns_values == ["123456789"]
+    assert sorted(names) == ["GLOBEX", "INITECH"]
+
+
+def test_resolve_vendors_batch_looks_up_sam_once_for_all_keys(mocker, mock_conn):
+    conn, _ = mock_conn
+    mocker.patch('src.processing.entity_resolver.get_cache_table',
+                 return_value=MagicMock(**{'get_item.return_value': {}}))
+    mocker.patch('src.processing.entity_resolver.get_vendor_directory', return_value=None)
+    mocker.patch('src.processing.entity_resolver.sam_index_loaded', return_value=True)
+    mock_single = mocker.patch('src.processing.entity_resolver.lookup_sam_entity')
+    entity = {"canonical_name": "ACME CORPORATION", "uei": "UEIACME00001", "duns": None, "confidence": 1.0}
+    mock_batch = mocker.patch('src.processing.entity_resolver.lookup_sam_entities',
+                              return_value={("Acme", None, None): entity, ("Initech", None, None): None})
+    mock_local = mocker.patch('src.processing.entity_resolver._resolve_vendor_local',
+                              return_value=('uuid-acme', 'ACME CORPORATION', 'SAM_API_MATCH', 1.0))
+    conn.cursor.return_value.__enter__.return_value.fetchall.return_value = []
+
+    er.resolve_vendors_batch([("Acme", None, None), ("Initech", None, None)], conn)
+
+    mock_batch.assert_called_once_with(conn, [("Acme", None, None), ("Initech", None, None)])
+    assert all(c.kwargs['sam_entities'] is mock_batch.return_value for c in mock_local.call_args_list)
+    mock_single.assert_not_called()
+
+
+def test_tier4_uses_batched_sam_lookup_when_given(mock_sam_api, mocker, mock_conn):
+    conn, cur = mock_conn
+    mocker.patch.object(er, 'VENDOR_DIRECTORY', None)
+    mock_get = mocker.patch('src.processing.entity_resolver.get_sam_entity')
+    cur.fetchone.return_value = {'id': 'uuid-acme'}
+    entity = {"canonical_name": "ACME CORPORATION", "uei": "UEIACME00001", "duns": None, "confidence": 1.0}
+
+    result = er._resolve_vendor_local("Acme", None, None, conn, sam_entities={("Acme", None, None): entity})
+
+    assert result == ('uuid-acme', 'ACME CORPORATION', 'SAM_API_MATCH', 1.0)
+    mock_get.assert_not_called()